@@ -0,0 +1,189 @@
+import hashlib
+import json
+import threading
+from typing import List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from config import Config
+from fusion import chunk_key
+from index_manifest import IndexManifest
+from llm_cache import normalize_query
+from sqlite_cache import SQLiteCache
+from tracing import record
+
+class AnswerCache:
+    """
+    Cache of final answers, invalidated whenever the index is re-indexed.
+
+    An answer is stored under (normalized query, method, retrieved chunk-ID set,
+    index version). A pointer from (normalized query, method, index version) to the
+    chunk-ID set lets a repeated question be answered before retrieval runs. Bumping
+    the manifest version makes every older entry unreachable; LRU eviction then
+    reclaims the space. The version is re-read from the manifest file when it
+    changes, so a re-index by another process invalidates this process's lookups.
+
+    In semantic mode a query that misses is embedded and matched against the
+    queries answered since the last re-index, reusing the answer of the closest
+    one when its cosine similarity reaches Config.ANSWER_CACHE_SIMILARITY_THRESHOLD.
+    The semantic index is kept in memory.
+    """
+
+    def __init__(self, cache: SQLiteCache, manifest: IndexManifest, embeddings: Embeddings = None,
+                 semantic: bool = False, threshold: float = None, max_semantic_entries: int = None):
+        self.cache = cache
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.semantic = semantic and embeddings is not None
+        self.threshold = threshold if threshold is not None else Config.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        self.max_semantic_entries = max_semantic_entries or Config.ANSWER_CACHE_SEMANTIC_MAX_ENTRIES
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Semantic index: rows of unit query vectors and their (normalized query, method)
+        self._semantic_version = None
+        self._semantic_vectors = None
+        self._semantic_entries = []
+
+    @classmethod
+    def from_config(cls, manifest: IndexManifest, embeddings: Embeddings = None) -> Optional["AnswerCache"]:
+        """Build the cache described by Config, or None if it is disabled."""
+        if not Config.ANSWER_CACHE_ENABLED:
+            return None
+        return cls(
+            SQLiteCache(Config.ANSWER_CACHE_PATH, max_entries=Config.ANSWER_CACHE_MAX_ENTRIES),
+            manifest,
+            embeddings=embeddings,
+            semantic=Config.ANSWER_CACHE_SEMANTIC,
+        )
+
+    @staticmethod
+    def _hash(*parts) -> str:
+        return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _pointer_key(self, query: str, method: int, version: int) -> str:
+        return "query:" + self._hash(Config.LLM_MODEL, version, method, query)
+
+    def _answer_key(self, query: str, method: int, chunk_ids: List[str], version: int) -> str:
+        return "answer:" + self._hash(Config.LLM_MODEL, version, method, query, ",".join(sorted(chunk_ids)))
+
+    def _lookup(self, query: str, method: int, version: int) -> Optional[str]:
+        """Resolve (normalized query, method) to a stored answer at the given index version."""
+        blob = self.cache.get(self._pointer_key(query, method, version))
+        if blob is None:
+            return None
+        chunk_ids = json.loads(blob)
+        blob = self.cache.get(self._answer_key(query, method, chunk_ids, version))
+        return blob.decode("utf-8") if blob is not None else None
+
+    def _record(self, answer: Optional[str], semantic: bool = False):
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            elif semantic:
+                self.semantic_hits += 1
+            else:
+                self.hits += 1
+        record("answer_cache_misses" if answer is None else "answer_cache_hits")
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _nearest(self, method: int, vector, version: int) -> Optional[str]:
+        """Return the cached query most similar to vector, if it clears the threshold."""
+        with self._lock:
+            if self._semantic_version != version or self._semantic_vectors is None:
+                return None
+            similarities = self._semantic_vectors @ self._unit(vector)
+            for index in np.argsort(-similarities):
+                if similarities[index] < self.threshold:
+                    return None
+                query, entry_method = self._semantic_entries[index]
+                if entry_method == method:
+                    return query
+        return None
+
+    def _remember(self, query: str, method: int, vector, version: int):
+        """Add a query to the semantic index, resetting it after a re-index."""
+        with self._lock:
+            if self._semantic_version != version:
+                self._semantic_version = version
+                self._semantic_vectors = None
+                self._semantic_entries = []
+            if (query, method) in self._semantic_entries:
+                return
+
+            row = self._unit(vector)[np.newaxis, :]
+            if self._semantic_vectors is None:
+                self._semantic_vectors = row
+            else:
+                self._semantic_vectors = np.vstack([self._semantic_vectors, row])[-self.max_semantic_entries:]
+            self._semantic_entries = (self._semantic_entries + [(query, method)])[-self.max_semantic_entries:]
+
+    def get(self, user_query: str, method: int) -> Optional[str]:
+        """Return the cached answer for the query and method, or None."""
+        query = normalize_query(user_query)
+        version = self.manifest.current_version()
+        answer = self._lookup(query, method, version)
+        if answer is None and self.semantic:
+            similar = self._nearest(method, self.embeddings.embed_query(user_query), version)
+            if similar is not None:
+                answer = self._lookup(similar, method, version)
+                self._record(answer, semantic=True)
+                return answer
+        self._record(answer)
+        return answer
+
+    async def aget(self, user_query: str, method: int) -> Optional[str]:
+        """Async version of get; only the query embedding is awaited."""
+        query = normalize_query(user_query)
+        version = self.manifest.current_version()
+        answer = self._lookup(query, method, version)
+        if answer is None and self.semantic:
+            similar = self._nearest(method, await self.embeddings.aembed_query(user_query), version)
+            if similar is not None:
+                answer = self._lookup(similar, method, version)
+                self._record(answer, semantic=True)
+                return answer
+        self._record(answer)
+        return answer
+
+    def _store(self, query: str, method: int, relevant_chunks: List[Document], answer: str, version: int):
+        chunk_ids = [chunk_key(doc) for doc in relevant_chunks]
+        self.cache.set_many({
+            self._pointer_key(query, method, version): json.dumps(sorted(chunk_ids)).encode("utf-8"),
+            self._answer_key(query, method, chunk_ids, version): answer.encode("utf-8"),
+        })
+
+    def set(self, user_query: str, method: int, relevant_chunks: List[Document], answer: str):
+        """Store the answer generated for the query from relevant_chunks."""
+        query = normalize_query(user_query)
+        version = self.manifest.current_version()
+        self._store(query, method, relevant_chunks, answer, version)
+        if self.semantic:
+            self._remember(query, method, self.embeddings.embed_query(user_query), version)
+
+    async def aset(self, user_query: str, method: int, relevant_chunks: List[Document], answer: str):
+        """Async version of set."""
+        query = normalize_query(user_query)
+        version = self.manifest.current_version()
+        self._store(query, method, relevant_chunks, answer, version)
+        if self.semantic:
+            self._remember(query, method, await self.embeddings.aembed_query(user_query), version)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters together with the cache size."""
+        with self._lock:
+            hits, semantic_hits, misses = self.hits, self.semantic_hits, self.misses
+        lookups = hits + semantic_hits + misses
+        return {
+            "hits": hits,
+            "semantic_hits": semantic_hits,
+            "misses": misses,
+            "hit_rate": (hits + semantic_hits) / lookups if lookups else 0.0,
+            **self.cache.stats(),
+        }
@@ -1,15 +1,21 @@
+import time
+from typing import AsyncIterator, Iterator
+from langchain_core.language_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from config import Config
+from context_packer import ContextPacker
+from tracing import observe, record, span
 
 class AnswerGenerator:
     """Generates final answers using LLM based on retrieved documents."""
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
+    def __init__(self, llm: BaseChatModel = None):
+        self.llm = llm if llm is not None else ChatGoogleGenerativeAI(
             model=Config.LLM_MODEL,
             temperature=Config.LLM_TEMPERATURE,
             google_api_key=Config.GOOGLE_API_KEY,
         )
+        self.context_packer = ContextPacker()
         
         self.system_prompt = '''
         You are a helpful AI assistant from a software engineering company named as ChaiCode. 
@@ -17,7 +23,9 @@ class AnswerGenerator:
         
         The user query is: {user_query}
         
-        The relevant chunks from our documentation are: {relevant_chunks}
+        The relevant chunks from our documentation, each tagged with its source, are:
+        
+        {relevant_chunks}
         
         You are requested to answer the user query in the most comprehensive way such that the user gets all the information and is satisfied. 
         You have been given the relevant chunks after improving the user query and fetching the relevant chunks.
@@ -25,6 +33,26 @@ class AnswerGenerator:
         Please provide a detailed, well-structured response that directly addresses the user's question.
         '''
     
+    def _messages(self, user_query: str, relevant_chunks: list) -> list:
+        # Compact, deduplicated, token-budgeted context instead of the list's repr
+        context = self.context_packer.pack(relevant_chunks)
+        return [
+            ("system", self.system_prompt.format(
+                user_query=user_query, 
+                relevant_chunks=context
+            )),
+            ("user", user_query)
+        ]
+    
+    @staticmethod
+    def _usage(message) -> dict:
+        """Token usage reported by the model for a response or streamed chunk."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        return {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+    
     def generate_answer(self, user_query: str, relevant_chunks: list) -> str:
         """Generate a comprehensive answer based on the user query and relevant chunks."""
         print("Thinking for your solution")
@@ -35,17 +63,66 @@ class AnswerGenerator:
         
         print(f"Found {len(relevant_chunks)} relevant document chunks")
         
-        messages = [
-            ("system", self.system_prompt.format(
-                user_query=user_query, 
-                relevant_chunks=relevant_chunks
-            )),
-            ("user", user_query)
-        ]
+        with span("generate"):
+            response = self.llm.invoke(self._messages(user_query, relevant_chunks))
+            for counter, amount in self._usage(response).items():
+                record(counter, amount)
+        return response.content
+    
+    async def agenerate_answer(self, user_query: str, relevant_chunks: list) -> str:
+        """Async version of generate_answer."""
+        print("Thinking for your solution")
         
-        response = self.llm.invoke(messages)
+        if not relevant_chunks:
+            return self._generate_no_results_response()
+        
+        print(f"Found {len(relevant_chunks)} relevant document chunks")
+        
+        with span("generate"):
+            response = await self.llm.ainvoke(self._messages(user_query, relevant_chunks))
+            for counter, amount in self._usage(response).items():
+                record(counter, amount)
         return response.content
     
+    def stream_answer(self, user_query: str, relevant_chunks: list) -> Iterator[str]:
+        """Generate the answer token by token, yielding text as soon as the model produces it."""
+        print("Thinking for your solution")
+        
+        if not relevant_chunks:
+            yield self._generate_no_results_response()
+            return
+        
+        print(f"Found {len(relevant_chunks)} relevant document chunks")
+        
+        # The stream is timed by hand: a span cannot stay open across yields
+        start = time.perf_counter()
+        counters = {"input_tokens": 0, "output_tokens": 0}
+        for chunk in self.llm.stream(self._messages(user_query, relevant_chunks)):
+            for counter, amount in self._usage(chunk).items():
+                counters[counter] += amount
+            if chunk.content:
+                yield chunk.content
+        observe("generate_stream", time.perf_counter() - start, counters)
+    
+    async def astream_answer(self, user_query: str, relevant_chunks: list) -> AsyncIterator[str]:
+        """Async version of stream_answer."""
+        print("Thinking for your solution")
+        
+        if not relevant_chunks:
+            yield self._generate_no_results_response()
+            return
+        
+        print(f"Found {len(relevant_chunks)} relevant document chunks")
+        
+        start = time.perf_counter()
+        counters = {"input_tokens": 0, "output_tokens": 0}
+        async for chunk in self.llm.astream(self._messages(user_query, relevant_chunks)):
+            for counter, amount in self._usage(chunk).items():
+                counters[counter] += amount
+            if chunk.content:
+                yield chunk.content
+        observe("generate_stream", time.perf_counter() - start, counters)
+    
     def _generate_no_results_response(self) -> str:
         """Generate a response when no relevant documents are found."""
         return """No relevant documents found for your query. This could be due to:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+ChaiCode RAG System - Batch Query Runner
+
+Answers a JSONL file of questions concurrently and writes one JSONL result per
+question as soon as it completes.
+
+Input lines:  {"query": "...", "method": 1-4, "id": "..."}   (method and id are optional)
+Output lines: {"line": n, "id": ..., "query": ..., "method": ..., "answer": ..., "error": ...,
+               "cached": ..., "sources": [...], "timings": {...}}
+
+Results are appended in completion order and tagged with their input line number,
+so re-running with the same output file skips the lines already answered and
+resumes after a crash. Lines whose result has an error are retried on the next
+run; the last result written for a line is the current one.
+
+Usage:
+    python batch_runner.py questions.jsonl answers.jsonl [--concurrency 8] [--rate 2] [--method 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from config import Config
+from rag_system import ChaiCodeRAGSystem
+
+class RateLimiter:
+    """Spaces out request starts to at most `rate` per second."""
+
+    def __init__(self, rate: float = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class BatchRunner:
+    """Runs many queries through one ChaiCodeRAGSystem with bounded concurrency."""
+
+    def __init__(self, rag_system: ChaiCodeRAGSystem, concurrency: int = None, rate: float = None,
+                 default_method: int = 4):
+        self.rag_system = rag_system
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        self.rate = rate if rate is not None else Config.BATCH_RATE_LIMIT
+        self.default_method = default_method
+
+    @staticmethod
+    def completed_lines(output_path: str) -> set:
+        """
+        Return the input line numbers already answered without an error in the output file.
+
+        A partially written last line (from a crash mid-write) is truncated away so
+        new results can be appended cleanly.
+        """
+        if not os.path.exists(output_path):
+            return set()
+
+        with open(output_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                data = data[:data.rfind(b"\n") + 1]
+
+        completed = set()
+        for raw_line in data.splitlines():
+            try:
+                record = json.loads(raw_line)
+                if not record.get("error"):
+                    completed.add(record["line"])
+            except (ValueError, KeyError, AttributeError):
+                continue
+        return completed
+
+    def _read_requests(self, input_path: str, skip: set):
+        """Yield (line number, request dict) for every input line still to be answered."""
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line_number, raw_line in enumerate(f, start=1):
+                if line_number in skip or not raw_line.strip():
+                    continue
+                try:
+                    request = json.loads(raw_line)
+                except ValueError as e:
+                    request = {"_invalid": f"Invalid JSON: {e}"}
+                if isinstance(request, str):
+                    request = {"query": request}
+                elif not isinstance(request, dict):
+                    request = {"_invalid": "Each line must be a JSON object or string"}
+                yield line_number, request
+
+    async def _answer(self, line_number: int, request: dict, limiter: RateLimiter) -> dict:
+        record = {
+            "line": line_number,
+            "id": request.get("id"),
+            "query": request.get("query"),
+            "method": request.get("method", self.default_method),
+        }
+        if "_invalid" in request or not request.get("query"):
+            record.update(answer=None, error=request.get("_invalid", "Missing 'query'"))
+            return record
+        if record["method"] not in (1, 2, 3, 4):
+            record.update(answer=None, error=f"Invalid method: {record['method']}. Choose 1-4.")
+            return record
+
+        await limiter.wait()
+        result = await self.rag_system.aquery_with_details(record["query"], record["method"])
+        record.update(result)
+        return record
+
+    async def arun(self, input_path: str, output_path: str) -> dict:
+        """
+        Answer every pending query in input_path, appending results to output_path.
+
+        Returns:
+            dict: Counts of processed, skipped and failed queries and the wall time
+        """
+        skip = self.completed_lines(output_path)
+        if skip:
+            print(f"Resuming: {len(skip)} queries already answered in {output_path}")
+
+        limiter = RateLimiter(self.rate)
+        pending = asyncio.Queue(maxsize=self.concurrency * 2)
+        stats = {"processed": 0, "skipped": len(skip), "failed": 0}
+        start = time.perf_counter()
+
+        with open(output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    item = await pending.get()
+                    try:
+                        if item is None:
+                            return
+                        line_number, request = item
+                        try:
+                            record = await self._answer(line_number, request, limiter)
+                        except Exception as e:
+                            # One bad query must not stop the worker and stall the queue
+                            record = {"line": line_number, "id": request.get("id"), "query": request.get("query"),
+                                      "method": request.get("method", self.default_method),
+                                      "answer": None, "error": str(e)}
+                        # Each line is written and flushed whole, so a crash loses at most the open queries
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+                        stats["processed"] += 1
+                        if record.get("error"):
+                            stats["failed"] += 1
+                        if stats["processed"] % 10 == 0:
+                            print(f"Answered {stats['processed']} queries")
+                    finally:
+                        pending.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                # Queries are read lazily so huge inputs never sit in memory at once
+                for line_number, request in self._read_requests(input_path, skip):
+                    await pending.put((line_number, request))
+                for _ in workers:
+                    await pending.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    def run(self, input_path: str, output_path: str) -> dict:
+        """Synchronous wrapper around arun, on the RAG system's event loop."""
+        return self.rag_system.run(self.arun(input_path, output_path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the ChaiCode RAG system.")
+    parser.add_argument("input", help="JSONL file with one {\"query\": ..., \"method\": ...} object per line")
+    parser.add_argument("output", help="JSONL file to append results to (existing results are skipped)")
+    parser.add_argument("--concurrency", type=int, default=Config.BATCH_CONCURRENCY, help="queries in flight at once")
+    parser.add_argument("--rate", type=float, default=Config.BATCH_RATE_LIMIT, help="maximum queries started per second")
+    parser.add_argument("--method", type=int, default=4, choices=[1, 2, 3, 4], help="default retrieval method")
+    args = parser.parse_args()
+
+    print("Initializing ChaiCode RAG System...")
+    runner = BatchRunner(ChaiCodeRAGSystem(), args.concurrency, args.rate, args.method)
+    stats = runner.run(args.input, args.output)
+    print(
+        f"Done: {stats['processed']} answered ({stats['failed']} failed), "
+        f"{stats['skipped']} skipped, {stats['seconds']:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
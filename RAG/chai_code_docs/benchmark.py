@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+ChaiCode RAG System - Offline Retrieval Benchmark
+
+Compares the four retrieval methods without Gemini or Qdrant: a deterministic
+hashing embedder, a fake chat model with configurable latency and the local
+in-memory vector index, loaded with a synthetic (or snapshotted) corpus.
+
+For every method it reports p50/p99 end-to-end latency, QPS under concurrency,
+LLM and embedding calls per query and recall@k against a labeled query set.
+
+Usage:
+    python benchmark.py [--docs 200] [--queries 50] [--llm-latency 0.05] [--concurrency 8]
+                        [--corpus corpus.jsonl --labels queries.jsonl] [--json results.json]
+                        [--min-recall 0.5]
+    python benchmark.py --chunking 100000
+
+Snapshot files are JSONL: corpus lines are {"source": ..., "text": ...} and label
+lines are {"query": ..., "relevant": [source, ...]}. With --min-recall the exit
+status is non-zero when any method falls below it, so the suite can gate CI.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, List
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+from config import Config
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings via feature hashing.
+
+    Texts that share words get similar vectors, so retrieval quality is meaningful
+    without a real model. Calls and embedded texts are counted.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _count(self, texts: List[str]):
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._count(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._count(texts)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+def _last_user_text(messages) -> str:
+    """Return the content of the last message, for both tuples and message objects."""
+    last = messages[-1]
+    if isinstance(last, tuple):
+        return last[1]
+    return last.content
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers after a fixed latency with text derived from the query.
+
+    Structured output fills list fields with query variants and string fields with
+    a short passage, which covers query improvement, decomposition and planning.
+    """
+
+    latency: float = 0.05
+    answer_words: int = 80
+    calls: int = 0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark-chat"
+
+    def _count(self):
+        # The event loop thread and the fan-out pool both call the model
+        with self._lock:
+            self.calls += 1
+
+    def _text(self, query: str) -> str:
+        words = (query.rstrip("?.! ") + " explained with examples and details").split()
+        return " ".join(words[i % len(words)] for i in range(self.answer_words))
+
+    def _result(self, messages) -> ChatResult:
+        text = self._text(_last_user_text(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._count()
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._count()
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._count()
+        time.sleep(self.latency)
+        for word in self._text(_last_user_text(messages)).split():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._count()
+        await asyncio.sleep(self.latency)
+        for word in self._text(_last_user_text(messages)).split():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _structured(self, schema, messages) -> Any:
+        query = _last_user_text(messages)
+        fields = {}
+        for name, field in schema.model_fields.items():
+            if "List" in str(field.annotation) or "list" in str(field.annotation):
+                fields[name] = [query, f"What is {query}", f"How to use {query}"]
+            else:
+                fields[name] = self._text(query)
+        return schema(**fields)
+
+    def with_structured_output(self, schema, **kwargs):
+        def invoke(messages):
+            self._count()
+            time.sleep(self.latency)
+            return self._structured(schema, messages)
+
+        async def ainvoke(messages):
+            self._count()
+            await asyncio.sleep(self.latency)
+            return self._structured(schema, messages)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+def synthetic_corpus(num_docs: int, num_queries: int, seed: int = 7):
+    """
+    Build documents about made-up topics plus labeled queries.
+
+    Each document has a unique topic word and a handful of keywords; each query
+    mentions a topic and two of its keywords and is labeled with that document.
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ru", "te", "zan", "qui", "vo", "pel", "dra", "sho", "ny", "gri", "fu", "bex"]
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    vocabulary = list({word() for _ in range(num_docs * 6)})
+    filler = "the a configure setup install use with when for and module server option".split()
+
+    documents = []
+    labels = []
+    for i in range(num_docs):
+        topic = f"{word()}{i}"
+        keywords = rng.sample(vocabulary, 6)
+        sentences = [
+            f"{topic} {rng.choice(filler)} {keyword} {rng.choice(filler)} {rng.choice(vocabulary)}."
+            for keyword in keywords
+        ]
+        source = f"synthetic://docs/{i}"
+        documents.append(Document(page_content=f"{topic} guide. " + " ".join(sentences), metadata={"source": source}))
+        labels.append((topic, keywords, source))
+
+    queries = []
+    for topic, keywords, source in rng.sample(labels, min(num_queries, len(labels))):
+        first, second = rng.sample(keywords, 2)
+        queries.append({"query": f"How does {topic} work with {first} and {second}?", "relevant": [source]})
+    return documents, queries
+
+def load_snapshot(corpus_path: str, labels_path: str):
+    """Load a snapshotted corpus and labeled queries from JSONL files."""
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        documents = [
+            Document(page_content=record["text"], metadata={"source": record["source"]})
+            for record in map(json.loads, filter(str.strip, f))
+        ]
+    with open(labels_path, "r", encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    return documents, queries
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def recall_at_k(sources: List[str], relevant: List[str], k: int) -> float:
+    """Fraction of the relevant sources found among the first k distinct retrieved sources."""
+    distinct = list(dict.fromkeys(source for source in sources if source is not None))[:k]
+    return len(set(distinct) & set(relevant)) / len(relevant) if relevant else 0.0
+
+class RetrievalBenchmark:
+    """
+    Runs the labeled queries through each retrieval method of an offline RAG system.
+
+    The index lives in a temporary directory that close() (or leaving a with block)
+    removes. Config points at that index, with every cache disabled, until close()
+    restores the previous settings.
+    """
+
+    def __init__(self, documents: List[Document], queries: List[dict], llm_latency: float = 0.05,
+                 embedding_latency: float = 0.0, concurrency: int = 8, k: int = None):
+        self.queries = queries
+        self.concurrency = concurrency
+        self.k = k or Config.SEARCH_K
+
+        # Isolated local index and no caches, so every run measures cold work
+        self._workdir = tempfile.TemporaryDirectory(prefix="rag-benchmark-")
+        self.workdir = self._workdir.name
+        overrides = {
+            "VECTOR_BACKEND": "local",
+            "LOCAL_INDEX_PATH": f"{self.workdir}/index",
+            "INDEX_MANIFEST_PATH": f"{self.workdir}/manifest.json",
+            "EMBEDDING_CACHE_ENABLED": False,
+            "LLM_CACHE_ENABLED": False,
+            "ANSWER_CACHE_ENABLED": False,
+        }
+        self._saved_config = {name: getattr(Config, name) for name in overrides}
+        for name, value in overrides.items():
+            setattr(Config, name, value)
+
+        from rag_system import ChaiCodeRAGSystem
+
+        self.llm = FakeChatModel(latency=llm_latency)
+        self.embeddings = HashingEmbeddings(latency=embedding_latency)
+        self.rag_system = None
+        try:
+            self.rag_system = ChaiCodeRAGSystem(llm=self.llm, embeddings=self.embeddings)
+            self.rag_system.vector_store_manager.index_documents(documents)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _run_method(self, method_choice: int) -> dict:
+        llm_calls, embedding_calls = self.llm.calls, self.embeddings.calls
+
+        # Sequential pass: per-query latency and recall
+        latencies = []
+        recalls = []
+        for labeled in self.queries:
+            start = time.perf_counter()
+            details = await self.rag_system.aquery_with_details(labeled["query"], method_choice)
+            latencies.append(time.perf_counter() - start)
+            recalls.append(recall_at_k(details["sources"], labeled["relevant"], self.k))
+
+        calls_per_query = {
+            "llm_calls_per_query": (self.llm.calls - llm_calls) / len(self.queries),
+            "embedding_calls_per_query": (self.embeddings.calls - embedding_calls) / len(self.queries),
+        }
+
+        # Concurrent pass: throughput
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(labeled):
+            async with semaphore:
+                await self.rag_system.aquery_with_details(labeled["query"], method_choice)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(labeled) for labeled in self.queries))
+        wall_time = time.perf_counter() - start
+
+        return {
+            "method": method_choice,
+            "p50_latency": percentile(latencies, 0.50),
+            "p99_latency": percentile(latencies, 0.99),
+            "qps": len(self.queries) / wall_time,
+            f"recall@{self.k}": sum(recalls) / len(recalls),
+            **calls_per_query,
+        }
+
+    def run(self, methods=(1, 2, 3, 4)) -> List[dict]:
+        """Benchmark each method and return one result dict per method."""
+        return [self.rag_system.run(self._run_method(method)) for method in methods]
+
+    def close(self):
+        """Close the RAG system's event loop, restore Config and delete the temporary index."""
+        try:
+            if self.rag_system is not None:
+                self.rag_system.close()
+        finally:
+            for name, value in self._saved_config.items():
+                setattr(Config, name, value)
+            self._workdir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def synthetic_pages(num_pages: int, seed: int = 7) -> List[Document]:
+    """Markdown pages with headings, paragraphs of varied length and code blocks."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+
+    def sentence(words):
+        return " ".join(rng.choice(vocabulary) for _ in range(words)) + "."
+
+    pages = []
+    for i in range(num_pages):
+        parts = [f"# Page {i}"]
+        for section in range(rng.randint(2, 5)):
+            parts.append(f"## Section {section}")
+            parts.extend(" ".join(sentence(rng.randint(5, 25)) for _ in range(rng.randint(1, 15))) for _ in range(rng.randint(1, 4)))
+            if rng.random() < 0.4:
+                lines = "\n".join(sentence(5) for _ in range(rng.randint(3, 60)))
+                parts.append(f"```bash\n{lines}\n```")
+        pages.append(Document(page_content="\n\n".join(parts), metadata={"source": f"synthetic://pages/{i}"}))
+    return pages
+
+def benchmark_chunking(num_pages: int) -> List[dict]:
+    """Time the structural chunker against RecursiveCharacterTextSplitter on synthetic pages."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from chunker import StructuralChunker
+    from tokenizer import count_tokens_batch
+
+    pages = synthetic_pages(num_pages)
+    splitters = {
+        "recursive": RecursiveCharacterTextSplitter(
+            chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP, add_start_index=True
+        ),
+        "structural": StructuralChunker(),
+    }
+
+    results = []
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        chunks = splitter.split_documents(pages)
+        elapsed = time.perf_counter() - start
+        tokens = count_tokens_batch([chunk.page_content for chunk in chunks])
+        results.append({
+            "splitter": name,
+            "seconds": elapsed,
+            "pages_per_second": num_pages / elapsed,
+            "chunks": len(chunks),
+            "mean_tokens": sum(tokens) / len(tokens),
+            "max_tokens": max(tokens),
+        })
+        print(f"{name:>10}: {elapsed:.2f}s ({num_pages / elapsed:.0f} pages/s), {len(chunks)} chunks, "
+              f"{sum(tokens) / len(tokens):.0f} mean / {max(tokens)} max tokens")
+    return results
+
+def print_results(results: List[dict]):
+    recall_key = next(key for key in results[0] if key.startswith("recall@"))
+    print(f"\n{'method':>6} {'p50 (s)':>9} {'p99 (s)':>9} {'QPS':>8} {recall_key:>10} {'LLM/query':>10} {'embed/query':>12}")
+    for result in results:
+        print(
+            f"{result['method']:>6} {result['p50_latency']:>9.3f} {result['p99_latency']:>9.3f} "
+            f"{result['qps']:>8.1f} {result[recall_key]:>10.3f} "
+            f"{result['llm_calls_per_query']:>10.2f} {result['embedding_calls_per_query']:>12.2f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the four retrieval methods.")
+    parser.add_argument("--docs", type=int, default=200, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=50, help="number of synthetic labeled queries")
+    parser.add_argument("--corpus", help="JSONL snapshot of {source, text} documents (with --labels)")
+    parser.add_argument("--labels", help="JSONL snapshot of {query, relevant} labeled queries (with --corpus)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per fake embedding call")
+    parser.add_argument("--concurrency", type=int, default=8, help="queries in flight in the throughput pass")
+    parser.add_argument("--methods", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4])
+    parser.add_argument("--no-planner", action="store_true", help="use the per-method LLM calls instead of the query planner")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--min-recall", type=float, help="exit non-zero if any method's recall@k is below this")
+    parser.add_argument("--chunking", type=int, metavar="PAGES",
+                        help="instead, benchmark the chunkers on this many synthetic pages")
+    args = parser.parse_args()
+
+    if args.chunking:
+        results = benchmark_chunking(args.chunking)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        return
+
+    if args.corpus or args.labels:
+        if not (args.corpus and args.labels):
+            parser.error("--corpus and --labels must be given together")
+        documents, queries = load_snapshot(args.corpus, args.labels)
+    else:
+        documents, queries = synthetic_corpus(args.docs, args.queries)
+
+    Config.USE_QUERY_PLANNER = not args.no_planner
+    with RetrievalBenchmark(
+        documents, queries,
+        llm_latency=args.llm_latency,
+        embedding_latency=args.embedding_latency,
+        concurrency=args.concurrency,
+    ) as benchmark:
+        results = benchmark.run(args.methods)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.min_recall is not None:
+        recall_key = f"recall@{benchmark.k}"
+        failing = [result["method"] for result in results if result[recall_key] < args.min_recall]
+        if failing:
+            print(f"Recall below {args.min_recall} for methods {failing}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import re
+from itertools import accumulate, islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from config import Config
+from tokenizer import count_tokens_batch
+
+# Paragraph boundaries (blank lines), captured so split() keeps the offsets recoverable
+_PARAGRAPH_SPLIT = re.compile(r"(\n[ \t]*\n\s*)")
+# Markdown heading lines
+_HEADING = re.compile(r"^#{1,6}[ \t]+\S[^\n]*", re.MULTILINE)
+
+# A block is (start, end, heading): the span text[start:end], and the heading text for heading lines
+Block = Tuple[int, int, Optional[str]]
+
+def _heading_blocks(paragraph: str, offset: int, blocks: List[Block]):
+    """Split a paragraph holding heading lines into heading and text blocks."""
+    position = 0
+    for match in _HEADING.finditer(paragraph):
+        if paragraph[position:match.start()].strip():
+            blocks.append((offset + position, offset + match.start() - 1, None))
+        blocks.append((offset + match.start(), offset + match.end(), match.group().lstrip("#").strip()))
+        position = match.end() + 1
+    if paragraph[position:].strip():
+        blocks.append((offset + position, offset + len(paragraph), None))
+
+def _prose_blocks(text: str, start: int, end: int, blocks: List[Block]):
+    """Append the paragraph and heading blocks of text[start:end]."""
+    segment = text[start:end]
+    stripped = segment.lstrip()
+    start += len(segment) - len(stripped)
+    segment = stripped.rstrip()
+    if not segment:
+        return
+
+    parts = _PARAGRAPH_SPLIT.split(segment)
+    offsets = accumulate(map(len, parts), initial=start)
+    for paragraph, offset in zip(parts[::2], islice(offsets, 0, None, 2)):
+        if paragraph[0] == "#" or "\n#" in paragraph:
+            _heading_blocks(paragraph, offset, blocks)
+        else:
+            blocks.append((offset, offset + len(paragraph), None))
+
+def _fence_lines(text: str) -> List[int]:
+    """Start offsets of the lines beginning with ``` (after optional indentation)."""
+    lines = []
+    position = text.find("```")
+    while position != -1:
+        line_start = text.rfind("\n", 0, position) + 1
+        if not text[line_start:position].strip(" \t"):
+            lines.append(line_start)
+        line_end = text.find("\n", position)
+        if line_end == -1:
+            break
+        position = text.find("```", line_end)
+    return lines
+
+def structural_blocks(text: str) -> List[Block]:
+    """Split text into code-fence, heading and paragraph blocks, in order."""
+    blocks = []
+    start = 0
+    if "```" in text:
+        # Code blocks are kept whole (blank lines included); an unclosed fence runs to the end
+        fence_lines = _fence_lines(text)
+        for opening, closing in zip(fence_lines[::2], fence_lines[1::2] + [len(text)]):
+            line_end = text.find("\n", closing)
+            fence_end = len(text) if line_end == -1 else line_end
+            _prose_blocks(text, start, opening, blocks)
+            block_end = fence_end
+            while block_end > opening and text[block_end - 1].isspace():
+                block_end -= 1
+            blocks.append((opening, block_end, None))
+            start = fence_end
+    _prose_blocks(text, start, len(text), blocks)
+    return blocks
+
+class StructuralChunker:
+    """
+    Token-budgeted chunker that splits on headings, paragraphs and code fences.
+
+    Each chunk is a contiguous slice of its document holding whole blocks, up to
+    max_tokens. Small sections are packed together so chunks fill the budget; a
+    block larger than the budget is split at lines, then sentences, then words.
+    Consecutive chunks of one section share up to overlap_tokens of trailing
+    blocks. Token counts come from the tokenizer, computed for a whole batch of
+    documents at once, and chunks are produced lazily.
+
+    Chunks carry the document metadata plus start_index (the character offset of
+    the chunk in the document) and section (the nearest heading above it).
+    """
+
+    def __init__(self, max_tokens: int = None, overlap_tokens: int = None, batch_size: int = 256):
+        self.max_tokens = max_tokens or Config.CHUNK_MAX_TOKENS
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else Config.CHUNK_OVERLAP_TOKENS
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _break_before(text: str, low: int, high: int) -> int:
+        """Best place to cut in text[low:high]: after the last line, sentence or word end."""
+        for separator, keep in (("\n", 0), (". ", 1), (" ", 0)):
+            position = text.rfind(separator, low, high)
+            if position != -1:
+                return position + keep
+        return high
+
+    def _fit(self, text: str, start: int, end: int, tokens: int) -> List[Tuple[int, int, int]]:
+        """
+        Split a span larger than the budget into (start, end, tokens) pieces that fit.
+
+        Cuts fall on the last line, sentence or word boundary within the budget, and
+        consecutive pieces overlap by about overlap_tokens. Piece token counts are
+        estimated from the span's characters per token.
+        """
+        if tokens <= self.max_tokens:
+            return [(start, end, tokens)]
+
+        chars_per_token = (end - start) / tokens
+        budget = max(1, int(self.max_tokens * chars_per_token))
+        overlap = int(self.overlap_tokens * chars_per_token)
+
+        pieces = []
+        position = start
+        while True:
+            if position + budget >= end:
+                cut = end
+            else:
+                cut = self._break_before(text, position + budget // 2, position + budget)
+            pieces.append((position, cut, max(1, round((cut - position) / chars_per_token))))
+            if cut >= end:
+                return pieces
+
+            # Start the next piece at a line (else word) boundary about `overlap` characters back
+            boundary = -1
+            if overlap:
+                boundary = text.find("\n", cut - overlap, cut)
+                if boundary == -1:
+                    boundary = text.find(" ", cut - overlap, cut)
+            next_position = boundary + 1 if boundary != -1 else cut
+            while next_position < end and text[next_position].isspace():
+                next_position += 1
+            position = max(next_position, position + 1)
+
+    def _pack(self, document: Document, blocks: List[Block], counts: List[int]) -> Iterator[Document]:
+        text = document.page_content
+        max_tokens = self.max_tokens
+        # Pending pieces of the current chunk as (start, end, tokens, section)
+        current = []
+        current_tokens = 0
+        section = None
+
+        def emit():
+            metadata = dict(document.metadata)
+            metadata["start_index"] = current[0][0]
+            if current[0][3] is not None:
+                metadata["section"] = current[0][3]
+            return Document(page_content=text[current[0][0]:current[-1][1]], metadata=metadata)
+
+        for (start, end, heading), tokens in zip(blocks, counts):
+            if heading is not None:
+                # A new section starts a new chunk once the current one is reasonably full
+                if current and current_tokens >= max_tokens // 2:
+                    yield emit()
+                    current, current_tokens = [], 0
+                section = heading
+
+            for piece_start, piece_end, piece_tokens in self._fit(text, start, end, tokens):
+                # One extra token per piece covers the separator joining it to the previous one
+                if current and current_tokens + piece_tokens + 1 > max_tokens:
+                    yield emit()
+                    # Carry trailing pieces of the same section over as overlap
+                    overlap, overlap_tokens = [], 0
+                    for previous in reversed(current):
+                        if previous[3] != section or overlap_tokens + previous[2] + 1 > self.overlap_tokens:
+                            break
+                        overlap.insert(0, previous)
+                        overlap_tokens += previous[2] + 1
+                    if overlap_tokens + piece_tokens + 1 > max_tokens:
+                        overlap, overlap_tokens = [], 0
+                    current, current_tokens = overlap, overlap_tokens
+
+                current_tokens += piece_tokens + 1 if current else piece_tokens
+                current.append((piece_start, piece_end, piece_tokens, section))
+
+        if current:
+            yield emit()
+
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Lazily yield chunks for a (possibly lazy) stream of documents.
+
+        Documents are read batch_size at a time so token counting runs in bulk.
+        """
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, self.batch_size))
+            if not batch:
+                return
+
+            blocks = [structural_blocks(document.page_content) for document in batch]
+            counts = count_tokens_batch([
+                document.page_content[start:end]
+                for document, document_blocks in zip(batch, blocks)
+                for start, end, _ in document_blocks
+            ])
+
+            position = 0
+            for document, document_blocks in zip(batch, blocks):
+                yield from self._pack(document, document_blocks, counts[position:position + len(document_blocks)])
+                position += len(document_blocks)
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split documents into chunks (same interface as LangChain text splitters)."""
+        return list(self.iter_chunks(documents))
@@ -19,26 +19,139 @@ class Config:
     
     # Vector store settings
     COLLECTION_NAME = "chai_code_docs"
+    VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "qdrant")  # "qdrant" or "local"
+    SEARCH_K = 4  # chunks returned per search
+    
+    # Multi-query (fan-out) search settings
+    BATCHED_SEARCH = True  # one batched request for all sub-queries, per-query fan-out as fallback
+    FANOUT_MAX_WORKERS = 8
+    SEARCH_TIMEOUT = 10.0  # seconds per wave of sub-query searches; one overall deadline covers a whole fan-out
+    
+    # Result fusion settings
+    FUSION_METHOD = "rrf"  # "rrf", "combsum", "combmnz" or "weighted"
+    MIN_RELEVANCE_SCORE = None  # drop retrieved chunks whose similarity is below this (applied before fusion)
+    
+    # Query planning settings
+    USE_QUERY_PLANNER = True  # one structured LLM call yields the improved queries and sub-queries of methods 1-3
+    
+    # Speculative HyDE settings (method 4)
+    SPECULATIVE_HYDE = True  # search the raw query and a partial hypothetical document while generating
+    HYDE_EARLY_SEARCH_CHARS = 400  # streamed characters before the early partial-document search
+    HYDE_MAX_CHARS = 2000  # stop generating once the hypothetical document is this long
+    
+    # Local vector index settings (VECTOR_BACKEND = "local")
+    LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", f".cache/local_index/{COLLECTION_NAME}")
+    LOCAL_INDEX_MODE = os.environ.get("LOCAL_INDEX_MODE", "exact")  # "exact" or "hnsw"
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 100
+    HNSW_EF_SEARCH = 64
+    
+    # Answer context settings
+    CONTEXT_MAX_TOKENS = 6000  # token budget for the retrieved chunks in the answer prompt
+    TOKENIZER_ENCODING = "o200k_base"  # tiktoken encoding used to measure prompt tokens
+    CONTEXT_COMPRESSION = False  # keep only the sentences most similar to the query in each chunk
+    COMPRESSION_SENTENCES_PER_CHUNK = 3
     
     # Text splitting settings
-    CHUNK_SIZE = 1000
+    CHUNKER = "structural"  # "structural" (token-budgeted, see chunker.py) or "recursive" (character-based)
+    CHUNK_MAX_TOKENS = 256  # structural chunker budget per chunk
+    CHUNK_OVERLAP_TOKENS = 48  # trailing tokens repeated at the start of the next chunk
+    CHUNK_SIZE = 1000  # recursive splitter, in characters
     CHUNK_OVERLAP = 200
     
+    # Near-duplicate chunk filter (MinHash + LSH over word shingles)
+    NEAR_DUPLICATE_FILTER = True
+    NEAR_DUPLICATE_THRESHOLD = 0.85  # Jaccard similarity at which chunks count as duplicates
+    MINHASH_PERMUTATIONS = 128
+    SHINGLE_SIZE = 5  # words per shingle
+    
+    # Incremental indexing settings
+    INDEX_MANIFEST_PATH = os.environ.get("INDEX_MANIFEST_PATH", f".cache/{COLLECTION_NAME}_{VECTOR_BACKEND}_manifest.json")
+    
     # Batch processing settings
     BATCH_SIZE = 10
     MAX_RETRIES = 3
     RETRY_DELAY = 2
     
+    # LLM response cache settings (query improvement, decomposition, HyDE)
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+    LLM_CACHE_MAX_ENTRIES = 50_000
+    LLM_CACHE_TTL = 7 * 24 * 3600  # seconds
+    
+    # Answer cache settings (invalidated whenever the index version changes)
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", ".cache/answers.sqlite3")
+    ANSWER_CACHE_MAX_ENTRIES = 10_000
+    ANSWER_CACHE_SEMANTIC = False  # also reuse answers of near-duplicate queries
+    ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95  # minimum query-embedding cosine similarity
+    ANSWER_CACHE_SEMANTIC_MAX_ENTRIES = 5_000
+    
+    # Tracing settings (per-stage spans exported as metrics)
+    TRACING_ENABLED = True
+    TRACING_SAMPLE_WINDOW = 2048  # recent durations kept per stage for p50/p95/p99
+    TRACING_MAX_TRACES = 100  # most recent full query traces kept for the JSON dump
+    
+    # HTTP server settings (server.py)
+    SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+    SERVER_MAX_CONCURRENCY = 8  # queries running the pipeline at once
+    SERVER_MAX_QUEUE = 32  # queries waiting for a slot before new ones get 503
+    SERVER_QUEUE_TIMEOUT = 30.0  # seconds a query may wait for a slot
+    
+    # Batch query settings (batch_runner.py)
+    BATCH_CONCURRENCY = 4  # queries in flight at once
+    BATCH_RATE_LIMIT = None  # maximum queries started per second, None for unlimited
+    
+    # Web fetcher settings (web_fetcher.py)
+    FETCH_CONCURRENCY = 32  # connections open at once
+    FETCH_PER_HOST_CONCURRENCY = 8  # connections open to a single host
+    FETCH_TIMEOUT = 30.0  # seconds per request
+    FETCH_RETRY_DELAY = 0.5  # seconds, doubled after every failed attempt
+    FETCH_VERIFY_SSL = False
+    FETCH_USER_AGENT = os.environ.get("USER_AGENT", "chai-code-docs-rag/1.0")
+    FETCH_CACHE_ENABLED = True
+    FETCH_CACHE_PATH = os.environ.get("FETCH_CACHE_PATH", ".cache/pages.sqlite3")
+    FETCH_CACHE_MAX_ENTRIES = 20_000  # two entries (validators and body) per page
+    EXTRACT_MAIN_CONTENT = True  # drop navigation and page chrome, keep the article as markdown
+    
+    # Pipelined ingest settings
+    PIPELINED_INGEST = True
+    EMBED_CONCURRENCY = 4  # embedding batches in flight at once
+    MAX_PENDING_UPSERTS = 8  # embedded batches waiting for the upsert stage
+    MIN_BATCH_SIZE = 5
+    MAX_BATCH_SIZE = 100  # Gemini embeds at most 100 texts per request
+    TARGET_BATCH_LATENCY = 5.0  # seconds; batches faster than this grow
+    
+    # Streaming ingest settings (ingest_pipeline.py)
+    STREAMING_INGEST = True  # fetch, chunk, embed and upsert pages concurrently with bounded memory
+    INGEST_PAGE_QUEUE_SIZE = 16  # fetched pages waiting to be extracted and chunked
+    INGEST_CHUNK_QUEUE_SIZE = 500  # new chunks waiting to be embedded
+    INGEST_BATCH_WAIT = 0.5  # seconds to wait for an embedding batch to fill
+    
+    # Embedding cache settings
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+    EMBEDDING_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB
+    
     @classmethod
-    def validate_config(cls):
+    def validate_config(cls, require_google_api_key: bool = True):
         """Validate that all required environment variables are set."""
-        if not cls.GOOGLE_API_KEY:
+        if require_google_api_key and not cls.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables. Please check your .env file.")
         
-        if not cls.QDRANT_API_KEY:
-            raise ValueError("QDRANT_API_KEY not found in environment variables. Please check your .env file.")
+        if cls.VECTOR_BACKEND not in ("qdrant", "local"):
+            raise ValueError(f"Invalid VECTOR_BACKEND: {cls.VECTOR_BACKEND}. Choose 'qdrant' or 'local'.")
+        
+        if cls.CHUNKER not in ("structural", "recursive"):
+            raise ValueError(f"Invalid CHUNKER: {cls.CHUNKER}. Choose 'structural' or 'recursive'.")
         
-        if not cls.QDRANT_API_URL:
-            raise ValueError("QDRANT_API_URL not found in environment variables. Please check your .env file.")
+        if cls.VECTOR_BACKEND == "qdrant":
+            if not cls.QDRANT_API_KEY:
+                raise ValueError("QDRANT_API_KEY not found in environment variables. Please check your .env file.")
+            
+            if not cls.QDRANT_API_URL:
+                raise ValueError("QDRANT_API_URL not found in environment variables. Please check your .env file.")
         
         print("Configuration validated successfully!") 
\ No newline at end of file
@@ -0,0 +1,164 @@
+import re
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Candidate containers for the article body, most specific first
+MAIN_SELECTORS = [
+    ".sl-markdown-content",  # Starlight, used by docs.chaicode.com
+    "main article",
+    "article",
+    "[role=main]",
+    "main",
+    "#content",
+    ".content",
+]
+
+# Elements that never belong to the article text
+DROP_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "form", "button", "nav", "header", "footer", "aside"]
+
+# Whole class names or ids of page chrome that is not always marked up semantically,
+# e.g. "sidebar", "site-header" or "pagination-links" but not "card-header"
+BOILERPLATE_PATTERN = re.compile(
+    r"((site|page|main|sl|left|right)[-_])?"
+    r"(sidebar|navbar|nav|menu|breadcrumbs?|toc|table-of-contents|pagination|pagefind|"
+    r"footer|header|skip-link|edit-link|social|cookie|banner|sr-only)"
+    r"([-_](links|container|wrapper|bar|list|menu|nav))?",
+    re.IGNORECASE,
+)
+
+# Asides with these classes are callouts (notes, tips, warnings) that belong to the article
+CALLOUT_CLASSES = {"starlight-aside", "admonition", "callout"}
+
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "aside", "blockquote", "figure", "figcaption", "details", "summary", "dl", "dt", "dd"}
+
+def _is_callout(tag: Tag) -> bool:
+    return tag.name == "aside" and not CALLOUT_CLASSES.isdisjoint(tag.get("class", []))
+
+def _is_boilerplate(tag: Tag) -> bool:
+    if tag.attrs is None:
+        return False
+    names = tag.get("class", []) + [tag.get("id") or ""]
+    return any(BOILERPLATE_PATTERN.fullmatch(name) for name in names) or tag.get("aria-hidden") == "true"
+
+def _code_language(pre: Tag) -> str:
+    """Language of a code block from data-language or a language-xxx class."""
+    code = pre.find("code")
+    for tag in (pre, code):
+        if tag is None:
+            continue
+        if tag.get("data-language"):
+            return tag["data-language"]
+        for name in tag.get("class", []):
+            if name.startswith(("language-", "lang-")):
+                return name.split("-", 1)[1]
+    return ""
+
+def _code_text(pre: Tag) -> str:
+    # Expressive Code renders each line as its own div without newlines between them
+    lines = pre.select(".ec-line")
+    if lines:
+        return "\n".join(line.get_text() for line in lines)
+    return pre.get_text()
+
+class ContentExtractor:
+    """
+    Extracts the main article of an HTML page as lightweight markdown.
+
+    Navigation, headers, footers, sidebars and other page chrome are removed;
+    headings become "#" lines, code blocks become fenced blocks with their
+    language, list items become "- " lines and tables become "|"-separated rows.
+    Falls back to the whole body when no article container is found.
+    """
+
+    def __init__(self, selectors: list = None):
+        self.selectors = selectors or MAIN_SELECTORS
+
+    def main_element(self, soup: BeautifulSoup) -> Tag:
+        """Return the element holding the article content."""
+        for selector in self.selectors:
+            element = soup.select_one(selector)
+            if element is not None and element.get_text(strip=True):
+                return element
+        return soup.body or soup
+
+    def _inline(self, tag: Tag) -> str:
+        """Render tag on a single line."""
+        out = []
+        self._render(tag, out)
+        return re.sub(r"\s+", " ", "".join(out)).strip()
+
+    def _render(self, node, out: list):
+        """Append markdown fragments for node to out; block boundaries are "\n\n"."""
+        for child in list(node.children):
+            if isinstance(child, NavigableString):
+                if type(child) is NavigableString:  # skip comments, doctypes, CDATA
+                    out.append(re.sub(r"\s+", " ", str(child)))
+                continue
+            if not isinstance(child, Tag) or _is_boilerplate(child):
+                continue
+            if child.name in DROP_TAGS and not _is_callout(child):
+                continue
+
+            name = child.name
+            if re.fullmatch(r"h[1-6]", name):
+                text = self._inline(child)
+                if text:
+                    out.append(f"\n\n{'#' * int(name[1])} {text}\n\n")
+            elif name == "pre":
+                code = _code_text(child).strip("\n")
+                if code.strip():
+                    out.append(f"\n\n```{_code_language(child)}\n{code}\n```\n\n")
+            elif name == "code":
+                out.append(f"`{child.get_text()}`")
+            elif name == "li":
+                item = []
+                self._render(child, item)
+                text = "".join(item).strip()
+                if text:
+                    lines = [line.rstrip() for line in text.split("\n") if line.strip()]
+                    out.append("\n- " + "\n  ".join(lines))
+            elif name == "tr":
+                cells = [self._inline(cell) for cell in child.find_all(["th", "td"])]
+                out.append("\n" + " | ".join(cells))
+            elif name == "br":
+                out.append("\n")
+            elif name in ("ul", "ol", "table", "thead", "tbody"):
+                out.append("\n\n")
+                self._render(child, out)
+                out.append("\n")
+            elif name in BLOCK_TAGS:
+                out.append("\n\n")
+                self._render(child, out)
+                out.append("\n\n")
+            else:
+                self._render(child, out)
+
+    def to_markdown(self, element: Tag) -> str:
+        """Render an element (and its descendants) as markdown text."""
+        out = []
+        self._render(element, out)
+
+        # Tidy whitespace outside code fences; code keeps its indentation and blank lines
+        lines = []
+        in_fence = False
+        for line in "".join(out).split("\n"):
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+                lines.append(line.strip())
+            elif in_fence:
+                lines.append(line.rstrip())
+            elif line.strip() or (lines and lines[-1]):
+                # Keep list nesting (two-space steps), drop stray whitespace from text nodes
+                indent = (len(line) - len(line.lstrip(" "))) // 2 * 2
+                lines.append(" " * indent + line.strip())
+        return "\n".join(lines).strip()
+
+    def extract(self, soup: BeautifulSoup) -> str:
+        """Return the main content of a parsed page as markdown."""
+        main = self.main_element(soup)
+        text = self.to_markdown(main)
+
+        # Some themes render the page title outside the article container
+        title = soup.find("h1")
+        if title is not None and main.find("h1") is None and title.get_text(strip=True):
+            text = f"# {self._inline(title)}\n\n{text}"
+        return text
@@ -0,0 +1,116 @@
+import re
+from typing import List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+# Fenced code blocks, from an opening ``` line to the closing one (or the end of the text)
+CODE_FENCE = re.compile(r"^[ \t]*```.*?(?:\n[ \t]*```[^\n]*|\Z)", re.MULTILINE | re.DOTALL)
+# Sentence ends followed by spaces, or line breaks (list items, shell lines); captured to keep separators
+SENTENCE_BOUNDARY = re.compile(r"((?<=[.!?])[ \t]+|[ \t]*\n(?:[ \t]*\n)*)")
+
+def _prose_pieces(text: str, separator: str, pieces: List[Tuple[str, str]]) -> str:
+    """Append the sentences and lines of text to pieces; returns the separator still pending."""
+    parts = SENTENCE_BOUNDARY.split(text)
+    for index, part in enumerate(parts):
+        if index % 2:
+            separator += part
+        elif part.strip():
+            pieces.append((separator, part.rstrip()))
+            separator = ""
+    return separator
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """
+    Split text into (separator, piece) pairs, dropping empty pieces.
+
+    Fenced code blocks are single pieces; other text is split into sentences and
+    lines, keeping their indentation. separator is the whitespace that preceded
+    the piece, so adjacent pieces can be rejoined exactly.
+    """
+    pieces = []
+    separator = ""
+    position = 0
+    for match in CODE_FENCE.finditer(text):
+        separator = _prose_pieces(text[position:match.start()], separator, pieces)
+        pieces.append((separator, match.group().rstrip()))
+        separator = ""
+        position = match.end()
+    _prose_pieces(text[position:], separator, pieces)
+    return pieces
+
+class ContextCompressor:
+    """
+    Extractive compression of retrieved chunks.
+
+    The query and every sentence of every chunk are embedded in one batched
+    request and scored with cosine similarity. Each chunk keeps only its top
+    Config.COMPRESSION_SENTENCES_PER_CHUNK sentences, in their original order.
+    Code blocks count as one sentence and are kept or dropped whole, and kept
+    lines keep their line breaks and indentation.
+    """
+
+    # Marks where sentences were removed between two kept ones
+    GAP = " ... "
+    LINE_GAP = "\n...\n"
+
+    def __init__(self, embeddings: Embeddings, sentences_per_chunk: int = None):
+        self.embeddings = embeddings
+        self.sentences_per_chunk = sentences_per_chunk or Config.COMPRESSION_SENTENCES_PER_CHUNK
+
+    def _split(self, chunks: List[Document]):
+        """Return per-chunk sentence lists and the flat list of sentences that need scoring."""
+        chunk_sentences = [split_sentences(doc.page_content) for doc in chunks]
+        to_score = [
+            sentence
+            for sentences in chunk_sentences if len(sentences) > self.sentences_per_chunk
+            for _, sentence in sentences
+        ]
+        return chunk_sentences, to_score
+
+    def _compressed(self, chunks: List[Document], chunk_sentences, query_vector, sentence_vectors) -> List[Document]:
+        if sentence_vectors:
+            matrix = np.asarray(sentence_vectors, dtype=np.float32)
+            query = np.asarray(query_vector, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            similarities = matrix @ query / np.maximum(norms, 1e-12)
+
+        compressed = []
+        offset = 0
+        for doc, sentences in zip(chunks, chunk_sentences):
+            if len(sentences) <= self.sentences_per_chunk:
+                compressed.append(doc)
+                continue
+
+            scores = similarities[offset:offset + len(sentences)]
+            offset += len(sentences)
+            keep = np.sort(np.argpartition(-scores, self.sentences_per_chunk - 1)[:self.sentences_per_chunk])
+
+            parts = [sentences[keep[0]][1]]
+            for previous, index in zip(keep, keep[1:]):
+                separator, sentence = sentences[index]
+                if index == previous + 1:
+                    parts.append(separator + sentence)
+                elif "\n" in separator or "\n" in sentence or "\n" in sentences[previous][1]:
+                    parts.append(self.LINE_GAP + sentence)
+                else:
+                    parts.append(self.GAP + sentence)
+            compressed.append(Document(page_content="".join(parts), metadata=dict(doc.metadata)))
+        return compressed
+
+    def compress(self, user_query: str, chunks: List[Document]) -> List[Document]:
+        """Return the chunks with each one reduced to its sentences most similar to the query."""
+        chunk_sentences, to_score = self._split(chunks)
+        if not to_score:
+            return chunks
+        query_vector, *sentence_vectors = self.embeddings.embed_documents([user_query, *to_score])
+        return self._compressed(chunks, chunk_sentences, query_vector, sentence_vectors)
+
+    async def acompress(self, user_query: str, chunks: List[Document]) -> List[Document]:
+        """Async version of compress."""
+        chunk_sentences, to_score = self._split(chunks)
+        if not to_score:
+            return chunks
+        query_vector, *sentence_vectors = await self.embeddings.aembed_documents([user_query, *to_score])
+        return self._compressed(chunks, chunk_sentences, query_vector, sentence_vectors)
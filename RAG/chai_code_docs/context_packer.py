@@ -0,0 +1,77 @@
+import hashlib
+import re
+from typing import List, Tuple
+from langchain_core.documents import Document
+from config import Config
+from fusion import chunk_key
+from tokenizer import count_tokens, truncate_to_tokens
+from tracing import record
+
+def compact_text(text: str) -> str:
+    """Strip trailing spaces and collapse runs of blank lines, keeping indentation for code."""
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+class ContextPacker:
+    """
+    Serializes retrieved chunks into a compact prompt context.
+
+    Each chunk becomes a "[n] source" tag followed by its text. Duplicate chunks are
+    dropped, the rest are ordered by retrieval score and added until the token
+    budget is spent.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, max_tokens: int = None):
+        self.max_tokens = max_tokens if max_tokens is not None else Config.CONTEXT_MAX_TOKENS
+
+    @staticmethod
+    def _ordered(chunks: List[Document]) -> List[Document]:
+        """Highest score first; chunks without a score keep their retrieval order after the scored ones."""
+        scored = [doc for doc in chunks if doc.metadata.get("_score") is not None]
+        unscored = [doc for doc in chunks if doc.metadata.get("_score") is None]
+        return sorted(scored, key=lambda doc: doc.metadata["_score"], reverse=True) + unscored
+
+    @staticmethod
+    def _source(doc: Document) -> str:
+        source = doc.metadata.get("source", "unknown")
+        page = doc.metadata.get("page")
+        return f"{source} (page {page + 1})" if isinstance(page, int) else str(source)
+
+    def select(self, chunks: List[Document]) -> List[Tuple[Document, str]]:
+        """Return the (chunk, serialized block) pairs that fit in the token budget, in prompt order."""
+        seen = set()
+        selected = []
+        used_tokens = 0
+        separator_tokens = count_tokens(self.SEPARATOR)
+
+        for doc in self._ordered(chunks):
+            text = compact_text(doc.page_content)
+            content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if not text or chunk_key(doc) in seen or content_hash in seen:
+                continue
+            seen.update((chunk_key(doc), content_hash))
+
+            header = f"[{len(selected) + 1}] {self._source(doc)}\n"
+            block = header + text
+            cost = count_tokens(block) + (separator_tokens if selected else 0)
+            if used_tokens + cost > self.max_tokens:
+                if not selected:
+                    # Never send an empty context: keep as much of the best chunk as fits
+                    block = header + truncate_to_tokens(text, self.max_tokens - count_tokens(header))
+                    selected.append((doc, block))
+                break
+
+            selected.append((doc, block))
+            used_tokens += cost
+
+        return selected
+
+    def pack(self, chunks: List[Document]) -> str:
+        """Serialize chunks into a context string that fits in the token budget."""
+        selected = self.select(chunks)
+        context = self.SEPARATOR.join(block for _, block in selected)
+        record("context_chunks", len(selected))
+        record("context_tokens", count_tokens(context))
+        return context
@@ -1,9 +1,16 @@
-from langchain_community.document_loaders import WebBaseLoader
+import time
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from config import Config
+from content_extractor import ContentExtractor
+from web_fetcher import FetchResult, WebFetcher
 
 class DataLoader:
     """Handles loading documents from various sources."""
     
-    def __init__(self):
+    def __init__(self, fetcher: WebFetcher = None):
+        self.fetcher = fetcher if fetcher is not None else WebFetcher.from_config()
+        self.extractor = ContentExtractor() if Config.EXTRACT_MAIN_CONTENT else None
         self.chai_code_urls = [
             "https://docs.chaicode.com/youtube/getting-started/",
             "https://docs.chaicode.com/youtube/chai-aur-html/welcome/",
@@ -51,25 +58,55 @@ class DataLoader:
             "https://docs.chaicode.com/youtube/chai-aur-devops/node-logger/"
         ]
     
+    @staticmethod
+    def _page_metadata(soup: BeautifulSoup, url: str) -> dict:
+        """Source, title, description and language of a page (same keys as WebBaseLoader)."""
+        metadata = {"source": url}
+        if title := soup.find("title"):
+            metadata["title"] = title.get_text()
+        if description := soup.find("meta", attrs={"name": "description"}):
+            metadata["description"] = description.get("content", "No description found.")
+        if html := soup.find("html"):
+            metadata["language"] = html.get("lang", "No language found.")
+        return metadata
+    
+    def page_document(self, result: FetchResult) -> Document:
+        """Turn a fetched page into a Document holding its (main) text and metadata."""
+        soup = BeautifulSoup(result.text, "html.parser")
+        text = self.extractor.extract(soup) if self.extractor is not None else soup.get_text()
+        return Document(page_content=text, metadata=self._page_metadata(soup, result.url))
+    
     def load_chai_code_docs(self, urls: list = None) -> list:
-        """Load documents from ChaiCode documentation URLs."""
+        """
+        Load documents from ChaiCode documentation URLs.
+        
+        Pages are fetched concurrently; unchanged pages are served from the
+        conditional-request cache. Only the main article is kept, as markdown
+        with headings and code blocks (see Config.EXTRACT_MAIN_CONTENT). Raises
+        if any page could not be loaded at all, so a failed fetch never removes
+        that page from the index.
+        """
         if urls is None:
             urls = self.chai_code_urls
         
         print(f"Loading documents from {len(urls)} URLs...")
+        start = time.perf_counter()
+        
+        results = self.fetcher.fetch_many(urls)
+        failed = [result for result in results if not result.ok]
+        if failed:
+            details = ", ".join(f"{result.url} ({result.error})" for result in failed)
+            print(f"Error loading documents: {details}")
+            raise RuntimeError(f"Failed to load {len(failed)} of {len(urls)} URLs: {details}")
         
-        loader = WebBaseLoader(urls)
-        loader.requests_kwargs = {
-            'verify': False,  # Disable SSL verification
-        }
+        docs = [self.page_document(result) for result in results]
         
-        try:
-            docs = loader.load()
-            print(f"Successfully loaded {len(docs)} documents")
-            return docs
-        except Exception as e:
-            print(f"Error loading documents: {e}")
-            raise
+        not_modified = sum(1 for result in results if result.status == 304)
+        print(
+            f"Successfully loaded {len(docs)} documents in {time.perf_counter() - start:.1f}s "
+            f"({not_modified} unchanged since the last fetch)"
+        )
+        return docs
     
     def load_custom_urls(self, urls: list) -> list:
         """Load documents from custom URLs."""
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+from array import array
+from typing import List
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from sqlite_cache import SQLiteCache
+from tracing import record
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a cache entry."""
+    return " ".join(text.split())
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed several queries with a single batched request."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        # embed_documents defaults to the document task type; queries need their own
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return embeddings.embed_documents(texts)
+
+async def aembed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Async version of embed_queries."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return await embeddings.aembed_queries(texts)
+    if isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        return await embeddings.aembed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return await embeddings.aembed_documents(texts)
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings model with a persistent content-addressed cache.
+
+    Entries are keyed by (embedding model, embedding kind, hash of the normalized text),
+    so documents and queries - which Gemini embeds with different task types - never
+    share a vector.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: SQLiteCache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _record(self, hits: int, misses: int):
+        with self._counter_lock:
+            self.hits += hits
+            self.misses += misses
+        record("embedding_cache_hits", hits)
+        record("embedding_cache_misses", misses)
+
+    def _lookup(self, kind: str, texts: List[str]):
+        """Look texts up in one query; returns (keys, cached blobs, {key: text} still to embed)."""
+        keys = [self._key(kind, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+
+        # Embed every missing text once, even if it appears several times in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self._record(len(texts) - sum(1 for key in keys if key in missing), len(missing))
+        return keys, cached, missing
+
+    def _store(self, keys, cached, missing, vectors) -> List[List[float]]:
+        """Persist freshly embedded vectors and assemble the result in input order."""
+        if missing:
+            new_entries = {key: self._encode(vector) for key, vector in zip(missing.keys(), vectors)}
+            self.cache.set_many(new_entries)
+            cached.update(new_entries)
+        return [self._decode(cached[key]) for key in keys]
+
+    def _embed_many(self, kind: str, texts: List[str], embed_fn) -> List[List[float]]:
+        """Embed texts, calling embed_fn only for the ones not already cached."""
+        if not texts:
+            return []
+        keys, cached, missing = self._lookup(kind, texts)
+        vectors = embed_fn(list(missing.values())) if missing else []
+        return self._store(keys, cached, missing, vectors)
+
+    async def _aembed_many(self, kind: str, texts: List[str], aembed_fn) -> List[List[float]]:
+        """Async version of _embed_many; the local cache lookups stay synchronous."""
+        if not texts:
+            return []
+        keys, cached, missing = self._lookup(kind, texts)
+        vectors = await aembed_fn(list(missing.values())) if missing else []
+        return self._store(keys, cached, missing, vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, calling the model only for texts not already cached."""
+        return self._embed_many("document", texts, self.embeddings.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one request, calling the model only for cache misses."""
+        return self._embed_many("query", texts, lambda missing: embed_queries(self.embeddings, missing))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed_many("document", texts, self.embeddings.aembed_documents)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed_many("query", texts, lambda missing: aembed_queries(self.embeddings, missing))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_queries([text]))[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, returning the cached vector when available."""
+        key = self._key("query", text)
+        blob = self.cache.get(key)
+        if blob is not None:
+            self._record(1, 0)
+            return self._decode(blob)
+
+        self._record(0, 1)
+        vector = self.embeddings.embed_query(text)
+        self.cache.set(key, self._encode(vector))
+        return vector
+
+    def stats(self) -> dict:
+        """Return hit/miss counters together with the cache size."""
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            **self.cache.stats(),
+        }
@@ -32,8 +32,10 @@ def demonstrate_methods():
         print(f"\n{'='*20} Method {method_num}: {method_name} {'='*20}")
         
         try:
-            answer = rag_system.query(test_query, method_choice=method_num)
-            print(f"\nAnswer:\n{answer}")
+            print("\nAnswer:")
+            for token in rag_system.stream_query(test_query, method_choice=method_num):
+                print(token, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Error with method {method_num}: {e}")
         
@@ -84,8 +86,10 @@ def interactive_demo():
         # Process query
         print(f"\nProcessing with Method {method_choice}...")
         try:
-            answer = rag_system.query(query, method_choice=method_choice)
-            print(f"\nAnswer:\n{answer}")
+            print("\nAnswer:")
+            for token in rag_system.stream_query(query, method_choice=method_choice):
+                print(token, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Error processing query: {e}")
 
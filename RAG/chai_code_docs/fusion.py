@@ -0,0 +1,105 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+# A ranked result list as returned by VectorStoreManager.search_many_with_score
+ScoredResults = List[Tuple[Document, float]]
+
+def chunk_key(doc: Document) -> str:
+    """Return a stable key for a chunk: its vector store point ID, or a content hash."""
+    point_id = doc.metadata.get("_id")
+    if point_id is not None:
+        return str(point_id)
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+def _resolve_weights(result_lists: List[ScoredResults], weights: Optional[List[float]]) -> List[float]:
+    if weights is None:
+        return [1.0] * len(result_lists)
+    if len(weights) != len(result_lists):
+        raise ValueError(f"Got {len(weights)} weights for {len(result_lists)} result lists")
+    return weights
+
+def _normalize(results: ScoredResults) -> List[float]:
+    """Min-max normalize the scores of one result list to [0, 1]."""
+    if not results:
+        return []
+    scores = [score for _, score in results]
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+def _ranked(fused: Dict[str, float], documents: Dict[str, Document]) -> ScoredResults:
+    return [
+        (documents[key], score)
+        for key, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    ]
+
+def unique_documents(result_lists: List[ScoredResults]) -> ScoredResults:
+    """Deduplicate by chunk ID in first-seen order, keeping each chunk's best score."""
+    best = {}
+    documents = {}
+    for results in result_lists:
+        for doc, score in results:
+            key = chunk_key(doc)
+            if key not in documents:
+                documents[key] = doc
+                best[key] = score
+            else:
+                best[key] = max(best[key], score)
+    return [(documents[key], best[key]) for key in documents]
+
+def reciprocal_rank_fusion(
+    result_lists: List[ScoredResults], k: int = 60, weights: Optional[List[float]] = None
+) -> ScoredResults:
+    """Reciprocal Rank Fusion: sum of weight / (rank + k) over the lists a chunk appears in."""
+    weights = _resolve_weights(result_lists, weights)
+    fused = {}
+    documents = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, (doc, _) in enumerate(results):
+            key = chunk_key(doc)
+            documents.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight / (rank + k)
+    return _ranked(fused, documents)
+
+def weighted_fusion(result_lists: List[ScoredResults], weights: Optional[List[float]] = None) -> ScoredResults:
+    """Weighted sum of min-max normalized scores."""
+    weights = _resolve_weights(result_lists, weights)
+    fused = {}
+    documents = {}
+    for results, weight in zip(result_lists, weights):
+        for (doc, _), score in zip(results, _normalize(results)):
+            key = chunk_key(doc)
+            documents.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight * score
+    return _ranked(fused, documents)
+
+def comb_sum(result_lists: List[ScoredResults]) -> ScoredResults:
+    """CombSUM: unweighted sum of normalized scores."""
+    return weighted_fusion(result_lists)
+
+def comb_mnz(result_lists: List[ScoredResults]) -> ScoredResults:
+    """CombMNZ: CombSUM multiplied by the number of lists that returned the chunk."""
+    hits = {}
+    for results in result_lists:
+        for key in {chunk_key(doc) for doc, _ in results}:
+            hits[key] = hits.get(key, 0) + 1
+    return sorted(
+        ((doc, score * hits[chunk_key(doc)]) for doc, score in comb_sum(result_lists)),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+FUSION_METHODS = {
+    "rrf": reciprocal_rank_fusion,
+    "combsum": comb_sum,
+    "combmnz": comb_mnz,
+    "weighted": weighted_fusion,
+}
+
+def fuse(result_lists: List[ScoredResults], method: str = "rrf", **kwargs) -> ScoredResults:
+    """Fuse ranked result lists with the named method ("rrf", "combsum", "combmnz" or "weighted")."""
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Invalid fusion method: {method}. Choose one of {', '.join(FUSION_METHODS)}.")
+    return FUSION_METHODS[method](result_lists, **kwargs)
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import uuid
+
+# Fixed namespace so the same chunk always maps to the same point ID
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a4e-8f0b-4c63-9a57-2d6c1b7e9f30")
+
+def chunk_id(source: str, offset: int, content: str) -> str:
+    """Derive a deterministic point ID from (source URL, chunk offset, content hash)."""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}|{offset}|{content_hash}"))
+
+class IndexManifest:
+    """Local record of which chunk IDs are currently indexed for each source."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self.sources = {}
+        # (mtime, size) of the manifest file when it was last read or written
+        self._signature = None
+        self.load()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it does not exist yet."""
+        if not os.path.exists(self.path):
+            return
+
+        self._signature = self._stat()
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.version = data.get("version", 0)
+        self.sources = {source: set(ids) for source, ids in data.get("sources", {}).items()}
+
+    def current_version(self) -> int:
+        """
+        Return the index version, re-reading it from disk if the manifest file changed
+        since this process last read or wrote it (another process re-indexed).
+        """
+        signature = self._stat()
+        if signature is not None and signature != self._signature:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._signature = signature
+            self.version = max(self.version, data.get("version", 0))
+        return self.version
+
+    def save(self):
+        """Atomically write the manifest to disk."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "version": self.version,
+            "sources": {source: sorted(ids) for source, ids in self.sources.items()},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._signature = self._stat()
+
+    def chunk_ids(self, source: str) -> set:
+        """Return the chunk IDs indexed for a source."""
+        return set(self.sources.get(source, ()))
+
+    def set_chunk_ids(self, source: str, ids):
+        """Record the chunk IDs indexed for a source."""
+        self.sources[source] = set(ids)
+
+    def remove_source(self, source: str):
+        """Forget a source entirely."""
+        self.sources.pop(source, None)
+
+    def bump_version(self):
+        """Mark the index as changed, past any version another process has saved."""
+        self.version = self.current_version() + 1
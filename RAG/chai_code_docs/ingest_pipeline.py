@@ -0,0 +1,316 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, List
+from config import Config
+from data_loader import DataLoader
+from vector_store import VectorStoreManager
+
+# Marks the end of a stage's output
+_DONE = object()
+# Seconds between checks of the stop flag while waiting on a queue
+_POLL_INTERVAL = 0.1
+
+class _SourceState:
+    """Chunk IDs of one page while its new chunks are being embedded and upserted."""
+
+    def __init__(self, indexed: set, current: set, pending: set):
+        self.indexed = indexed  # IDs in the manifest before this run
+        self.current = current  # IDs of the page as loaded now
+        self.pending = pending  # new IDs not yet upserted (or failed)
+        self.uploaded = set()
+
+class StreamingIngestPipeline:
+    """
+    Streams pages through fetch -> extract -> chunk -> embed -> upsert.
+
+    Every stage runs concurrently and hands work to the next through a bounded
+    queue, so memory stays flat however many pages are loaded, and the first
+    chunks are upserted (and searchable) while later pages are still being
+    fetched. Indexing is incremental as in VectorStoreManager.index_documents: a
+    page's stale chunks are deleted and its manifest entry updated once all of
+    its new chunks have been upserted. Near-duplicates are folded within each
+    page; pages that fail to load keep their indexed chunks.
+
+    If the chunk or embed stage fails, a stop flag makes the fetch and chunk
+    stages give up on their queues, so the run raises instead of hanging.
+    """
+
+    def __init__(self, vector_store_manager: VectorStoreManager, data_loader: DataLoader):
+        self.manager = vector_store_manager
+        self.data_loader = data_loader
+        self.pages = queue.Queue(maxsize=Config.INGEST_PAGE_QUEUE_SIZE)
+        self.chunks = queue.Queue(maxsize=Config.INGEST_CHUNK_QUEUE_SIZE)
+        self.upserts = queue.Queue(maxsize=Config.MAX_PENDING_UPSERTS)
+        self._sources = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "pages": 0, "failed_pages": 0, "chunks": 0, "unchanged": 0,
+            "uploaded": 0, "deleted": 0, "first_upsert_seconds": None,
+        }
+        self._start = None
+        self._errors = []
+        self._stop = threading.Event()
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Put item on target, giving up (returning False) once the run is stopping."""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue):
+        """Take the next item from source, or _DONE once the run is stopping."""
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    # Stage 1: fetch pages (asyncio, on its own thread)
+
+    def _fetch_stage(self, urls: Iterable[str]):
+        async def produce():
+            async for result in self.data_loader.fetcher.aiter_fetch(urls):
+                if not await asyncio.to_thread(self._put, self.pages, result):
+                    return
+
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._put(self.pages, _DONE)
+
+    # Stage 2: extract and chunk pages, diff them against the manifest
+
+    def _chunk_page(self, document) -> List:
+        chunks = self.manager.text_splitter.split_documents([document])
+        if self.manager.near_duplicate_filter is not None:
+            chunks = self.manager.near_duplicate_filter.filter(chunks)
+        return chunks
+
+    def _chunk_stage(self, seen_sources: set):
+        try:
+            while True:
+                result = self._get(self.pages)
+                if result is _DONE:
+                    break
+
+                # Failed pages count as seen so a full refresh does not delete them
+                source = result.url
+                if source in seen_sources:
+                    continue
+                seen_sources.add(source)
+                if not result.ok:
+                    print(f"Failed to load {source}: {result.error}")
+                    self.stats["failed_pages"] += 1
+                    continue
+
+                try:
+                    document = self.data_loader.page_document(result)
+                    chunks = {self.manager.get_chunk_id(chunk): chunk for chunk in self._chunk_page(document)}
+                except Exception as e:
+                    print(f"Failed to process {source}: {e}")
+                    self.stats["failed_pages"] += 1
+                    continue
+                indexed = self.manager.manifest.chunk_ids(source)
+                new_ids = [point_id for point_id in chunks if point_id not in indexed]
+
+                self.stats["pages"] += 1
+                self.stats["chunks"] += len(chunks)
+                self.stats["unchanged"] += len(chunks) - len(new_ids)
+
+                with self._lock:
+                    self._sources[source] = _SourceState(indexed, set(chunks), set(new_ids))
+                if not new_ids:
+                    # Nothing to embed; let the upsert stage settle stale chunks right away
+                    self.upserts.put(("settle", source))
+                for point_id in new_ids:
+                    if not self._put(self.chunks, (point_id, chunks[point_id])):
+                        return
+        except Exception as e:
+            self._errors.append(e)
+            # Nothing reads the page queue any more; release the fetch stage
+            self._stop.set()
+        finally:
+            self._put(self.chunks, _DONE)
+
+    # Stage 3: embed adaptive-size batches concurrently (on the calling thread)
+
+    def _next_batch(self, batch_size: int, block: bool):
+        """
+        Collect up to batch_size chunks.
+
+        Waits briefly for a batch to fill so slow upstream stages still produce
+        reasonably sized batches; returns (batch, finished).
+        """
+        batch = []
+        deadline = None
+        while len(batch) < batch_size:
+            try:
+                if not batch and block:
+                    item = self._get(self.chunks)
+                else:
+                    if deadline is None:
+                        deadline = time.monotonic() + Config.INGEST_BATCH_WAIT
+                    item = self.chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _embed_stage(self):
+        batch_size = Config.BATCH_SIZE
+        in_flight = {}
+        finished = False
+
+        with ThreadPoolExecutor(max_workers=Config.EMBED_CONCURRENCY) as executor:
+            while not finished or in_flight:
+                while not finished and len(in_flight) < Config.EMBED_CONCURRENCY:
+                    # Only block for input when there is nothing else to wait for
+                    batch, finished = self._next_batch(batch_size, block=not in_flight)
+                    if not batch:
+                        break
+                    ids = [point_id for point_id, _ in batch]
+                    documents = [chunk for _, chunk in batch]
+                    future = executor.submit(self.manager.embed_batch_with_retry, documents)
+                    in_flight[future] = (ids, documents)
+
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, timeout=Config.INGEST_BATCH_WAIT, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ids, documents = in_flight.pop(future)
+                    vectors, elapsed, rate_limited = future.result()
+                    batch_size = self.manager._next_batch_size(batch_size, elapsed, rate_limited)
+                    # Blocks when the upsert stage falls behind, bounding memory
+                    self.upserts.put(("batch", ids, documents, vectors))
+
+    # Stage 4: upsert embedded batches and settle finished pages
+
+    def _settle(self, source: str):
+        """
+        Record a fully processed page's chunk IDs and delete its stale chunks.
+
+        Stale chunks are only deleted once every new chunk of the page has been
+        upserted; otherwise the old version stays searchable and in the manifest.
+        """
+        with self._lock:
+            state = self._sources.pop(source)
+        stale = state.indexed - state.current
+        kept = (state.indexed & state.current) | state.uploaded
+        if stale and not state.current - state.indexed <= state.uploaded:
+            print(f"Keeping {len(stale)} stale chunks of {source} until its new chunks are uploaded")
+            kept |= stale
+        elif stale:
+            if self.manager.delete_with_retry(stale):
+                self.stats["deleted"] += len(stale)
+            else:
+                # Keep them in the manifest so the next run retries the delete
+                kept |= stale
+        self.manager.manifest.set_chunk_ids(source, kept)
+
+    def _upsert_stage(self):
+        while True:
+            item = self.upserts.get()
+            if item is _DONE:
+                break
+            try:
+                if item[0] == "settle":
+                    self._settle(item[1])
+                    continue
+
+                _, ids, documents, vectors = item
+                uploaded = vectors is not None and self.manager.upsert_embeddings_with_retry(documents, vectors, ids)
+                if uploaded:
+                    self.stats["uploaded"] += len(ids)
+                    if self.stats["first_upsert_seconds"] is None:
+                        self.stats["first_upsert_seconds"] = time.perf_counter() - self._start
+                        print(f"First chunks searchable after {self.stats['first_upsert_seconds']:.1f}s")
+                else:
+                    print(f"Failed to upload a batch of {len(ids)} chunks")
+
+                settled = set()
+                with self._lock:
+                    for point_id, document in zip(ids, documents):
+                        source = document.metadata.get("source", "")
+                        state = self._sources[source]
+                        state.pending.discard(point_id)
+                        if uploaded:
+                            state.uploaded.add(point_id)
+                        if not state.pending:
+                            settled.add(source)
+                for source in settled:
+                    self._settle(source)
+            except Exception as e:
+                self._errors.append(e)
+
+    def _save(self):
+        """Persist the index and manifest, bumping the version if any chunk changed."""
+        if self.stats["uploaded"] or self.stats["deleted"]:
+            self.manager.manifest.bump_version()
+        self.manager.persist()
+        self.manager.manifest.save()
+
+    def run(self, urls: Iterable[str], remove_missing_sources: bool = False) -> dict:
+        """
+        Fetch, chunk and index the pages at urls.
+
+        Args:
+            urls (iterable): Page URLs; may be a lazy iterator
+            remove_missing_sources (bool): Also delete every indexed source that is
+                not part of this run, for full refreshes
+
+        Returns:
+            dict: Counts of pages, chunks, uploaded/unchanged/deleted chunks and the
+                seconds until the first chunks were upserted
+        """
+        self._start = time.perf_counter()
+        seen_sources = set()
+
+        fetch_thread = threading.Thread(target=self._fetch_stage, args=(urls,), daemon=True)
+        chunk_thread = threading.Thread(target=self._chunk_stage, args=(seen_sources,), daemon=True)
+        upsert_thread = threading.Thread(target=self._upsert_stage, daemon=True)
+        for thread in (fetch_thread, chunk_thread, upsert_thread):
+            thread.start()
+
+        try:
+            self._embed_stage()
+        except BaseException:
+            # Release the fetch and chunk stages, which may be blocked on full queues
+            self._stop.set()
+            raise
+        finally:
+            self.upserts.put(_DONE)
+            upsert_thread.join()
+            fetch_thread.join()
+            chunk_thread.join()
+
+        if self._errors:
+            # Keep what was indexed; the manifest lets the next run pick up the rest
+            self._save()
+            raise self._errors[0]
+
+        if remove_missing_sources:
+            for source in list(self.manager.manifest.sources):
+                if source not in seen_sources:
+                    ids = self.manager.manifest.chunk_ids(source)
+                    if self.manager.delete_with_retry(ids):
+                        self.stats["deleted"] += len(ids)
+                        self.manager.manifest.remove_source(source)
+
+        self._save()
+
+        elapsed = time.perf_counter() - self._start
+        print(f"Ingest complete in {elapsed:.1f}s: {self.stats['pages']} pages, {self.stats['uploaded']} chunks uploaded, "
+              f"{self.stats['unchanged']} unchanged, {self.stats['deleted']} deleted, {self.stats['failed_pages']} pages failed")
+        return dict(self.stats)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Optional
+from config import Config
+from sqlite_cache import SQLiteCache
+from tracing import record
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing "?", "." and "!", so trivially
+    different phrasings of the same question share a cache entry.
+
+    Other symbols are kept: "what is C++" and "what is C#" are different questions.
+    """
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+class LLMResponseCache:
+    """Persistent TTL + LRU cache for structured LLM outputs.
+
+    Entries are keyed by (kind, model, temperature, prompt template version,
+    normalized query) and store JSON-serializable values such as lists of queries
+    or a hypothetical document.
+    """
+
+    def __init__(self, cache: SQLiteCache, ttl: float = None, model: str = None, temperature: float = None):
+        self.cache = cache
+        self.ttl = ttl
+        self.model = model if model is not None else Config.LLM_MODEL
+        self.temperature = temperature if temperature is not None else Config.LLM_TEMPERATURE
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> Optional["LLMResponseCache"]:
+        """Build the cache described by Config, or None if it is disabled."""
+        if not Config.LLM_CACHE_ENABLED:
+            return None
+        return cls(
+            SQLiteCache(Config.LLM_CACHE_PATH, max_entries=Config.LLM_CACHE_MAX_ENTRIES),
+            ttl=Config.LLM_CACHE_TTL,
+        )
+
+    def _key(self, kind: str, prompt_version: str, query: str) -> str:
+        raw = f"{kind}|{self.model}|{self.temperature}|{prompt_version}|{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, prompt_version: str, query: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry."""
+        key = self._key(kind, prompt_version, query)
+        blob = self.cache.get(key)
+        value = None
+        if blob is not None:
+            entry = json.loads(blob)
+            if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                self.cache.delete(key)
+            else:
+                value = entry["value"]
+
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record("llm_cache_misses" if value is None else "llm_cache_hits")
+        return value
+
+    def set(self, kind: str, prompt_version: str, query: str, value: Any):
+        """Store a JSON-serializable value."""
+        entry = {"created": time.time(), "value": value}
+        self.cache.set(self._key(kind, prompt_version, query), json.dumps(entry).encode("utf-8"))
+
+    def stats(self) -> dict:
+        """Return hit/miss counters together with the cache size."""
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            **self.cache.stats(),
+        }
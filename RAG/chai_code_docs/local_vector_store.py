@@ -0,0 +1,385 @@
+import heapq
+import json
+import os
+import threading
+import uuid
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+class LocalVectorStore(VectorStore):
+    """In-process vector index persisted to memory-mapped NumPy files.
+
+    Two search modes are supported:
+        - "exact": brute-force cosine similarity over all vectors
+        - "hnsw": approximate search over a navigable proximity graph built with
+          HNSW-style neighbour selection (a single layer, which is plenty for
+          documentation-sized corpora)
+
+    The index lives in a directory holding ``vectors.npy``, ``neighbors.npy`` and
+    ``records.json``. Arrays are opened with ``mmap_mode="r"`` on load, so a restarted
+    process can search straight away without copying vectors into memory; they are
+    only materialised once the index is modified.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        path: str = None,
+        mode: str = "exact",
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+    ):
+        if mode not in ("exact", "hnsw"):
+            raise ValueError(f"Invalid local index mode: {mode}. Choose 'exact' or 'hnsw'.")
+
+        self.embedding = embedding
+        self.path = path
+        self.mode = mode
+        self.m = m
+        self.max_neighbors = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+        self._lock = threading.RLock()
+        self._count = 0
+        self._vectors = None
+        self._neighbors = None
+        self._records = []
+        self._id_to_row = {}
+        self._deleted = set()
+
+        if path and os.path.exists(os.path.join(path, "records.json")):
+            self.load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    # ------------------------------------------------------------------ persistence
+
+    def load(self):
+        """Load the index from its directory, memory-mapping the arrays."""
+        with self._lock:
+            with open(os.path.join(self.path, "records.json"), "r", encoding="utf-8") as f:
+                self._records = json.load(f)
+
+            self._count = len(self._records)
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+            neighbors_path = os.path.join(self.path, "neighbors.npy")
+            if self.mode == "hnsw" and os.path.exists(neighbors_path):
+                self._neighbors = np.load(neighbors_path, mmap_mode="r")
+            self._id_to_row = {record["id"]: row for row, record in enumerate(self._records)}
+            self._deleted = set()
+
+            if self.mode == "hnsw" and (self._neighbors is None or len(self._neighbors) != self._count):
+                self._rebuild_graph()
+
+    def save(self):
+        """Write the index to its directory, compacting away deleted rows first."""
+        if not self.path:
+            return
+
+        with self._lock:
+            if self._deleted:
+                self._compact()
+
+            os.makedirs(self.path, exist_ok=True)
+            vectors = self._vectors[:self._count] if self._vectors is not None else np.zeros((0, 0), np.float32)
+            self._atomic_save(os.path.join(self.path, "vectors.npy"), vectors)
+            if self.mode == "hnsw" and self._neighbors is not None:
+                self._atomic_save(os.path.join(self.path, "neighbors.npy"), self._neighbors[:self._count])
+
+            tmp_path = os.path.join(self.path, "records.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._records, f)
+            os.replace(tmp_path, os.path.join(self.path, "records.json"))
+
+    @staticmethod
+    def _atomic_save(path: str, array: np.ndarray):
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(array))
+        os.replace(tmp_path, path)
+
+    def _compact(self):
+        """Physically drop deleted rows and rebuild the graph over the survivors."""
+        keep = [row for row in range(self._count) if row not in self._deleted]
+        self._vectors = np.array(self._vectors[keep], dtype=np.float32)
+        self._records = [self._records[row] for row in keep]
+        self._count = len(keep)
+        self._id_to_row = {record["id"]: row for row, record in enumerate(self._records)}
+        self._deleted = set()
+        if self.mode == "hnsw":
+            self._rebuild_graph()
+
+    # ------------------------------------------------------------------ writes
+
+    def _ensure_capacity(self, extra: int, dim: int):
+        """Grow (and materialise memory-mapped) arrays so `extra` rows can be appended."""
+        needed = self._count + extra
+        if self._vectors is None or (self._count == 0 and self._vectors.shape[1] != dim):
+            capacity = max(needed, 64)
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+            self._neighbors = np.full((capacity, self.max_neighbors), -1, dtype=np.int32)
+            return
+
+        if self._vectors.shape[1] != dim:
+            raise ValueError(f"Vector dimension {dim} does not match index dimension {self._vectors.shape[1]}")
+
+        writable = isinstance(self._vectors, np.ndarray) and not isinstance(self._vectors, np.memmap)
+        if needed <= len(self._vectors) and writable:
+            if self._neighbors is None:
+                self._neighbors = np.full((len(self._vectors), self.max_neighbors), -1, dtype=np.int32)
+            return
+
+        capacity = max(needed, 2 * len(self._vectors), 64)
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        neighbors = np.full((capacity, self.max_neighbors), -1, dtype=np.int32)
+        if self._neighbors is not None:
+            neighbors[:self._count] = self._neighbors[:self._count]
+        self._vectors = vectors
+        self._neighbors = neighbors
+
+    def add_embeddings(self, ids: List[str], vectors: List[List[float]], documents: List[Document]) -> List[str]:
+        """Upsert precomputed vectors together with their documents."""
+        if not ids:
+            return []
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            # Upserting an existing ID replaces it
+            for point_id in ids:
+                row = self._id_to_row.pop(point_id, None)
+                if row is not None:
+                    self._deleted.add(row)
+
+            self._ensure_capacity(len(ids), matrix.shape[1])
+            for point_id, vector, document in zip(ids, matrix, documents):
+                row = self._count
+                self._vectors[row] = vector
+                self._records.append({
+                    "id": point_id,
+                    "page_content": document.page_content,
+                    "metadata": document.metadata,
+                })
+                self._id_to_row[point_id] = row
+                self._count += 1
+                if self.mode == "hnsw":
+                    self._insert_into_graph(row)
+
+        return list(ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs,
+    ) -> List[str]:
+        """Embed and upsert texts."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        return self.add_embeddings(ids, vectors, documents)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> Optional[bool]:
+        """Delete points by ID."""
+        if ids is None:
+            return False
+        with self._lock:
+            for point_id in ids:
+                row = self._id_to_row.pop(point_id, None)
+                if row is not None:
+                    self._deleted.add(row)
+        return True
+
+    def get_by_ids(self, ids: List[str], /) -> List[Document]:
+        """Return the documents stored under the given IDs."""
+        with self._lock:
+            return [self._document(self._id_to_row[point_id]) for point_id in ids if point_id in self._id_to_row]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    # ------------------------------------------------------------------ graph
+
+    def _similarities(self, rows, vector: np.ndarray) -> np.ndarray:
+        return self._vectors[rows] @ vector
+
+    def _search_graph(self, vector: np.ndarray, ef: int, entry: int = 0) -> List[Tuple[float, int]]:
+        """Best-first beam search over the graph; returns (similarity, row) pairs, best first."""
+        entry_similarity = float(self._vectors[entry] @ vector)
+        visited = {entry}
+        # candidates: max-heap on similarity (stored negated); results: min-heap on similarity
+        candidates = [(-entry_similarity, entry)]
+        results = [(entry_similarity, entry)]
+
+        while candidates:
+            negative_similarity, row = heapq.heappop(candidates)
+            if len(results) >= ef and -negative_similarity < results[0][0]:
+                break
+
+            neighbors = [n for n in self._neighbors[row] if n >= 0 and n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+
+            for neighbor, similarity in zip(neighbors, self._similarities(neighbors, vector)):
+                similarity = float(similarity)
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, int(neighbor)))
+                    heapq.heappush(results, (similarity, int(neighbor)))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], limit: int) -> List[int]:
+        """HNSW neighbour-selection heuristic.
+
+        Candidates (sorted best first) are skipped when they are closer to an already
+        selected neighbour than to the new node, which keeps long-range links and the
+        graph navigable. Remaining slots are topped up with the closest candidates.
+        """
+        rows = [row for _, row in candidates]
+        pairwise = self._vectors[rows] @ self._vectors[rows].T
+        selected = []
+        for index, (similarity, _) in enumerate(candidates):
+            if len(selected) >= limit:
+                break
+            if selected and pairwise[index, selected].max() > similarity:
+                continue
+            selected.append(index)
+
+        if len(selected) < limit:
+            chosen = set(selected)
+            selected.extend([index for index in range(len(rows)) if index not in chosen][:limit - len(selected)])
+        return [rows[index] for index in selected]
+
+    def _insert_into_graph(self, row: int):
+        if self._count == 1:
+            return
+
+        vector = self._vectors[row]
+        candidates = [
+            (similarity, candidate)
+            for similarity, candidate in self._search_graph(vector, self.ef_construction)
+            if candidate != row
+        ]
+        neighbors = self._select_neighbors(candidates, self.m)
+        self._neighbors[row, :len(neighbors)] = neighbors
+
+        for neighbor in neighbors:
+            links = [n for n in self._neighbors[neighbor] if n >= 0]
+            links.append(row)
+            if len(links) > self.max_neighbors:
+                similarities = self._similarities(links, self._vectors[neighbor])
+                order = np.argsort(-similarities)
+                links = self._select_neighbors(
+                    [(float(similarities[i]), links[i]) for i in order],
+                    self.max_neighbors,
+                )
+            self._neighbors[neighbor] = -1
+            self._neighbors[neighbor, :len(links)] = links
+
+    def _rebuild_graph(self):
+        count = self._count
+        dim = self._vectors.shape[1] if self._vectors is not None else 0
+        vectors = np.array(self._vectors[:count], dtype=np.float32) if count else np.zeros((0, dim), np.float32)
+        self._vectors = vectors
+        self._neighbors = np.full((count, self.max_neighbors), -1, dtype=np.int32)
+        for row in range(count):
+            self._count = row + 1
+            self._insert_into_graph(row)
+        self._count = count
+
+    # ------------------------------------------------------------------ search
+
+    def _document(self, row: int) -> Document:
+        record = self._records[row]
+        metadata = dict(record["metadata"])
+        metadata["_id"] = record["id"]
+        return Document(page_content=record["page_content"], metadata=metadata)
+
+    def _top_rows(self, vector: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        if self._count == 0 or not self._id_to_row:
+            return []
+
+        if self.mode == "hnsw":
+            # Over-fetch so deleted rows can be filtered out
+            ef = max(self.ef_search, k + len(self._deleted))
+            results = self._search_graph(vector, ef)
+            return [(similarity, row) for similarity, row in results if row not in self._deleted][:k]
+
+        similarities = self._vectors[:self._count] @ vector
+        if self._deleted:
+            similarities[list(self._deleted)] = -np.inf
+        k = min(k, len(self._id_to_row))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(float(similarities[row]), int(row)) for row in top]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """Return the k nearest documents to a vector with their cosine similarity."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        with self._lock:
+            return [(self._document(row), similarity) for similarity, row in self._top_rows(vector, k)]
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: List[List[float]], k: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """Batched search: one result list per query vector, computed in a single matrix product."""
+        if self.mode == "hnsw" or self._count == 0:
+            return [self.similarity_search_with_score_by_vector(embedding, k) for embedding in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            similarities = self._vectors[:self._count] @ queries.T
+            if self._deleted:
+                similarities[list(self._deleted)] = -np.inf
+            k = min(k, len(self._id_to_row))
+            top = np.argpartition(-similarities, k - 1, axis=0)[:k]
+
+            results = []
+            for column in range(len(queries)):
+                rows = top[:, column]
+                rows = rows[np.argsort(-similarities[rows, column])]
+                results.append([(self._document(row), float(similarities[row, column])) for row in rows])
+            return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Similarities are cosine in [-1, 1]; map to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
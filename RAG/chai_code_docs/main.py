@@ -3,13 +3,20 @@
 ChaiCode RAG System - Main Entry Point
 
 This module runs the ChaiCode RAG system in interactive mode by default.
+Pass --serve to start the HTTP server instead (see server.py).
 """
 
+import sys
 from rag_system import ChaiCodeRAGSystem
 
 def main():
     """Main function to run the RAG system in interactive mode."""
     
+    if "--serve" in sys.argv[1:]:
+        from server import run_server
+        run_server()
+        return
+    
     # Initialize the RAG system
     print("Initializing ChaiCode RAG System...")
     rag_system = ChaiCodeRAGSystem()
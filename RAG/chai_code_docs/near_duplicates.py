@@ -0,0 +1,119 @@
+import hashlib
+import re
+from typing import List
+import numpy as np
+from langchain_core.documents import Document
+from config import Config
+
+# Mersenne prime for the universal hash family (a * x + b) mod p; fits products in uint64
+_PRIME = (1 << 31) - 1
+
+def shingles(text: str, size: int) -> set:
+    """Hashed word n-grams of text (the whole text as one shingle if it is shorter than size)."""
+    words = re.findall(r"\w+", text.lower())
+    grams = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+    return {int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") for gram in grams}
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def lsh_bands(num_perm: int, threshold: float) -> int:
+    """
+    Pick the number of LSH bands for a Jaccard threshold.
+
+    With b bands of r rows, pairs become candidates with probability
+    1 - (1 - s^r)^b, whose steep part sits near s = (1/b)^(1/r). The band count
+    whose midpoint lies just below the threshold is chosen, so true duplicates
+    are rarely missed; candidates are verified exactly afterwards.
+    """
+    best = 1
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = bands
+            break
+    return best
+
+class NearDuplicateFilter:
+    """
+    Drops near-duplicate chunks before they are embedded, using MinHash with LSH banding.
+
+    Chunks are processed in order; a chunk whose word-shingle Jaccard similarity
+    with an earlier kept chunk reaches the threshold is folded into it. The kept
+    chunk records where the dropped ones came from under metadata["duplicates"],
+    as {"source", "start_index"} entries, so the provenance survives in the payload.
+    """
+
+    def __init__(self, threshold: float = None, num_perm: int = None, shingle_size: int = None, seed: int = 1):
+        self.threshold = threshold if threshold is not None else Config.NEAR_DUPLICATE_THRESHOLD
+        self.num_perm = num_perm or Config.MINHASH_PERMUTATIONS
+        self.shingle_size = shingle_size or Config.SHINGLE_SIZE
+        self.bands = lsh_bands(self.num_perm, self.threshold)
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=self.num_perm, dtype=np.uint64)
+
+    @classmethod
+    def from_config(cls):
+        """Build the filter described by Config, or None if it is disabled."""
+        if not Config.NEAR_DUPLICATE_FILTER:
+            return None
+        return cls()
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        """MinHash signature: the minimum of each hash function over the shingles."""
+        values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set)) % _PRIME
+        hashed = (values[:, np.newaxis] * self._a + self._b) % _PRIME
+        return hashed.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def filter(self, chunks: List[Document]) -> List[Document]:
+        """
+        Return one representative per cluster of near-duplicate chunks, in input order.
+
+        Args:
+            chunks (list): Split chunks
+
+        Returns:
+            list: Kept chunks; those that absorbed duplicates carry metadata["duplicates"]
+        """
+        buckets = {}
+        kept = []
+        kept_shingles = []
+        dropped = 0
+
+        for chunk in chunks:
+            shingle_set = shingles(chunk.page_content, self.shingle_size)
+            band_keys = self._band_keys(self.signature(shingle_set))
+
+            candidates = sorted({index for key in band_keys for index in buckets.get(key, ())})
+            match = next(
+                (index for index in candidates if jaccard(shingle_set, kept_shingles[index]) >= self.threshold),
+                None
+            )
+            if match is not None:
+                representative = kept[match]
+                representative.metadata.setdefault("duplicates", []).append({
+                    "source": chunk.metadata.get("source"),
+                    "start_index": chunk.metadata.get("start_index"),
+                })
+                dropped += 1
+                continue
+
+            # Copy so that recording provenance never mutates the caller's chunk
+            representative = Document(page_content=chunk.page_content, metadata=dict(chunk.metadata))
+            representative.metadata.pop("duplicates", None)
+            for key in band_keys:
+                buckets.setdefault(key, []).append(len(kept))
+            kept.append(representative)
+            kept_shingles.append(shingle_set)
+
+        if dropped:
+            print(f"Dropped {dropped} near-duplicate chunks ({len(kept)} kept)")
+        return kept
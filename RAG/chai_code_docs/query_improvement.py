@@ -1,7 +1,10 @@
 from typing import List
 from pydantic import BaseModel, Field
+from langchain_core.language_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from config import Config
+from llm_cache import LLMResponseCache
+from tracing import span
 
 class ImprovedQueries(BaseModel):
     """Information about improved queries."""
@@ -10,13 +13,17 @@ class ImprovedQueries(BaseModel):
 class QueryImprover:
     """Handles query improvement using LLM."""
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
+    # Bump whenever improve_query_prompt changes so cached outputs are not reused
+    PROMPT_VERSION = "1"
+    
+    def __init__(self, llm: BaseChatModel = None):
+        self.llm = llm if llm is not None else ChatGoogleGenerativeAI(
             model=Config.LLM_MODEL,
             temperature=Config.LLM_TEMPERATURE,
             google_api_key=Config.GOOGLE_API_KEY,
         )
         self.structured_llm = self.llm.with_structured_output(ImprovedQueries)
+        self.cache = LLMResponseCache.from_config()
         
         self.improve_query_prompt = '''
         You are a helpful AI assistant in a software engineering company called ChaiCode.
@@ -38,14 +45,45 @@ class QueryImprover:
         3. Do not add any additional text or explanation.
         '''
     
+    def _messages(self, user_query: str) -> list:
+        return [
+            ("system", self.improve_query_prompt.format(user_query=user_query)),
+            ("user", user_query)
+        ]
+    
+    def _cached(self, user_query: str):
+        if self.cache is None:
+            return None
+        cached = self.cache.get("improve", self.PROMPT_VERSION, user_query)
+        if cached is not None:
+            print("Using cached improved queries")
+        return cached
+    
+    def _store(self, user_query: str, queries: List[str]) -> List[str]:
+        if self.cache is not None:
+            self.cache.set("improve", self.PROMPT_VERSION, user_query, queries)
+        return queries
+    
     def improve_query(self, user_query: str) -> List[str]:
         """Improve the user query by generating 3 related queries."""
         print("Improving the query")
         
-        messages = [
-            ("system", self.improve_query_prompt.format(user_query=user_query)),
-            ("user", user_query)
-        ]
+        with span("improve_query"):
+            cached = self._cached(user_query)
+            if cached is not None:
+                return cached
+            
+            response = self.structured_llm.invoke(self._messages(user_query))
+            return self._store(user_query, response.queries)
+    
+    async def aimprove_query(self, user_query: str) -> List[str]:
+        """Async version of improve_query."""
+        print("Improving the query")
         
-        response = self.structured_llm.invoke(messages)
-        return response.queries 
\ No newline at end of file
+        with span("improve_query"):
+            cached = self._cached(user_query)
+            if cached is not None:
+                return cached
+            
+            response = await self.structured_llm.ainvoke(self._messages(user_query))
+            return self._store(user_query, response.queries)
\ No newline at end of file
@@ -0,0 +1,95 @@
+from typing import List
+from pydantic import BaseModel, Field
+from langchain_core.language_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+from config import Config
+from llm_cache import LLMResponseCache
+from tracing import span
+
+class QueryPlan(BaseModel):
+    """Everything retrieval methods 1-3 need from the LLM, produced in one call."""
+    improved_queries: List[str] = Field(..., description="List of 3 improved queries related to the user query")
+    sub_queries: List[str] = Field(..., description="List of 3-5 focused sub-queries that break down the user query into simpler parts")
+
+class QueryPlanner:
+    """Plans retrieval for a user query with a single structured-output LLM call."""
+
+    # Bump whenever plan_prompt changes so cached plans are not reused
+    PROMPT_VERSION = "2"
+
+    def __init__(self, llm: BaseChatModel = None):
+        self.llm = llm if llm is not None else ChatGoogleGenerativeAI(
+            model=Config.LLM_MODEL,
+            temperature=Config.LLM_TEMPERATURE,
+            google_api_key=Config.GOOGLE_API_KEY,
+        )
+        self.structured_llm = self.llm.with_structured_output(QueryPlan)
+        self.cache = LLMResponseCache.from_config()
+
+        self.plan_prompt = '''
+        You are a helpful AI assistant in a software engineering company called ChaiCode.
+        You are preparing a user query for document retrieval over the ChaiCode documentation. Produce two things:
+
+        1. improved_queries: 3 new queries related to the user query that add context and predict what the user is looking for.
+           Do not repeat the user query.
+        2. sub_queries: 3-5 focused sub-queries, each addressing a different aspect of the user query and simpler than it.
+
+        For example:
+        user_query = "what is a fs module"
+        improved_queries = [
+            "What is module system in Node.js?",
+            "What is the fs module in Node.js and how do I use it?",
+            "What are the common methods in the fs module of Node.js?",
+        ]
+        sub_queries = [
+            "What is the fs module in Node.js?",
+            "How do I read and write files with the fs module?",
+            "What is the difference between sync and async fs methods?",
+        ]
+
+        The user query is: {user_query}
+
+        IMPORTANT: RESPOND ONLY WITH THE REQUESTED FIELDS. Do not add any additional text or explanation.
+        '''
+
+    def _messages(self, user_query: str) -> list:
+        return [
+            ("system", self.plan_prompt.format(user_query=user_query)),
+            ("user", user_query)
+        ]
+
+    def _cached(self, user_query: str):
+        if self.cache is None:
+            return None
+        cached = self.cache.get("plan", self.PROMPT_VERSION, user_query)
+        if cached is None:
+            return None
+        print("Using cached query plan")
+        return QueryPlan(**cached)
+
+    def _store(self, user_query: str, plan: QueryPlan) -> QueryPlan:
+        if self.cache is not None:
+            self.cache.set("plan", self.PROMPT_VERSION, user_query, plan.model_dump())
+        return plan
+
+    def plan(self, user_query: str) -> QueryPlan:
+        """Return improved queries and sub-queries for the user query."""
+        print("Planning the query")
+
+        with span("plan"):
+            cached = self._cached(user_query)
+            if cached is not None:
+                return cached
+
+            return self._store(user_query, self.structured_llm.invoke(self._messages(user_query)))
+
+    async def aplan(self, user_query: str) -> QueryPlan:
+        """Async version of plan."""
+        print("Planning the query")
+
+        with span("plan"):
+            cached = self._cached(user_query)
+            if cached is not None:
+                return cached
+
+            return self._store(user_query, await self.structured_llm.ainvoke(self._messages(user_query)))
@@ -1,36 +1,84 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Iterator
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 from config import Config
 from vector_store import VectorStoreManager
 from query_improvement import QueryImprover
+from query_planner import QueryPlanner
 from retrieval_methods import RetrievalMethods
 from answer_generator import AnswerGenerator
+from context_compressor import ContextCompressor
+from answer_cache import AnswerCache
+from llm_cache import normalize_query
+from single_flight import AsyncSingleFlight
+from tracing import observe, span
 from data_loader import DataLoader
+from ingest_pipeline import StreamingIngestPipeline
 
 class ChaiCodeRAGSystem:
     """Main RAG system orchestrator for ChaiCode documentation."""
     
-    def __init__(self):
-        """Initialize the RAG system with all components."""
-        # Validate configuration
-        Config.validate_config()
+    def __init__(self, llm: BaseChatModel = None, embeddings: Embeddings = None):
+        """
+        Initialize the RAG system with all components.
+        
+        Args:
+            llm (BaseChatModel): Chat model shared by every component instead of Gemini
+            embeddings (Embeddings): Embeddings model to use instead of Gemini
+        """
+        # Validate configuration; the Google API key is only needed for the Gemini defaults
+        Config.validate_config(require_google_api_key=llm is None or embeddings is None)
         
         # Initialize components
-        self.vector_store_manager = VectorStoreManager()
-        self.query_improver = QueryImprover()
-        self.retrieval_methods = RetrievalMethods(self.vector_store_manager)
-        self.answer_generator = AnswerGenerator()
+        self.vector_store_manager = VectorStoreManager(embeddings)
+        self.query_improver = QueryImprover(llm)
+        self.query_planner = QueryPlanner(llm)
+        self.retrieval_methods = RetrievalMethods(self.vector_store_manager, llm)
+        self.answer_generator = AnswerGenerator(llm)
+        self.context_compressor = ContextCompressor(self.vector_store_manager.embeddings)
+        self.answer_cache = AnswerCache.from_config(
+            self.vector_store_manager.manifest, self.vector_store_manager.embeddings
+        )
         self.data_loader = DataLoader()
         
+        # Concurrent identical queries attach to the pipeline already in flight. Keys use
+        # normalize_query, which only folds case, whitespace and trailing punctuation, so
+        # queries that differ in symbols (C++ and C#) never share a run.
+        self._inflight = AsyncSingleFlight()
+        
+        # Event loop backing the synchronous wrappers, running on its own thread so
+        # sync calls work from any number of threads and from inside other event
+        # loops. Async clients (Gemini, Qdrant) bind to the loop they were first used
+        # on, so it is kept for the lifetime of the system.
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="rag-event-loop", daemon=True)
+        self._loop_thread.start()
+        
         print("ChaiCode RAG System initialized successfully!")
     
     def load_and_index_documents(self, urls: list = None):
-        """Load documents from URLs and index them in the vector store."""
-        print("Loading and indexing documents...")
+        """
+        Load documents from URLs and index them in the vector store.
         
-        # Load documents
-        docs = self.data_loader.load_chai_code_docs(urls)
+        Re-runs only embed and upsert new or changed chunks and delete stale ones.
+        When no URLs are given, the full ChaiCode docs are refreshed and pages that
+        are no longer listed are removed from the index as well.
+        """
+        print("Loading and indexing documents...")
         
-        # Upload to vector store
-        self.vector_store_manager.upload_documents_batch(docs)
+        if Config.STREAMING_INGEST:
+            # Pages are chunked and indexed as they arrive; failed pages keep their indexed chunks
+            pipeline = StreamingIngestPipeline(self.vector_store_manager, self.data_loader)
+            pipeline.run(urls if urls is not None else self.data_loader.chai_code_urls, remove_missing_sources=urls is None)
+        else:
+            # Load documents
+            docs = self.data_loader.load_chai_code_docs(urls)
+            
+            # Sync the vector store with the loaded pages
+            self.vector_store_manager.index_documents(docs, remove_missing_sources=urls is None)
         
         print("Document loading and indexing completed!")
     
@@ -38,10 +86,36 @@ class ChaiCodeRAGSystem:
         """Get list of available retrieval methods."""
         return self.retrieval_methods.get_available_methods()
     
+    def run(self, coroutine):
+        """
+        Run a coroutine on the system's event loop and return its result.
+        
+        Safe to call from several threads at once; the calling thread blocks until
+        the coroutine finishes. Async code should await the coroutine instead.
+        """
+        if threading.current_thread() is self._loop_thread:
+            raise RuntimeError("ChaiCodeRAGSystem.run cannot be called from its own event loop; await the coroutine")
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+    
+    def close(self):
+        """Stop the event loop behind the synchronous API."""
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+    
     def query(self, user_query: str, method_choice: int = 4):
         """
         Process a user query using the specified retrieval method.
         
+        Synchronous wrapper around aquery.
+        
         Args:
             user_query (str): The user's question
             method_choice (int): 1-4 for different retrieval methods
@@ -49,30 +123,181 @@ class ChaiCodeRAGSystem:
         Returns:
             str: Generated answer
         """
-        print(f"\nProcessing query: {user_query}")
-        print(f"Using retrieval method: {method_choice}")
+        return self.run(self.aquery(user_query, method_choice))
+    
+    async def aquery(self, user_query: str, method_choice: int = 4):
+        """
+        Process a user query asynchronously using the specified retrieval method.
         
-        try:
-            # Step 1: Improve query (for methods 1 and 2)
-            improved_queries = None
-            if method_choice in [1, 2]:
-                improved_queries = self.query_improver.improve_query(user_query)
-                print(f"Generated {len(improved_queries)} improved queries")
+        Every LLM, embedding and vector search call is awaited rather than blocking,
+        so one process can serve many concurrent queries on a single event loop.
+        Concurrent calls for the same (normalized) query and method share one run.
+        
+        Args:
+            user_query (str): The user's question
+            method_choice (int): 1-4 for different retrieval methods
+        
+        Returns:
+            str: Generated answer
+        """
+        return (await self.aquery_with_details(user_query, method_choice))["answer"]
+    
+    async def aquery_with_details(self, user_query: str, method_choice: int = 4) -> dict:
+        """
+        Like aquery, but also report how the answer was produced.
+        
+        Returns:
+            dict: "answer", "error" (None on success), "cached" (answer cache hit),
+                "sources" (source of each retrieved chunk) and "timings" (seconds
+                spent in the cache lookup, retrieval and generation stages, and in total)
+        """
+        return await self._inflight.do(
+            ("answer", normalize_query(user_query), method_choice),
+            lambda: self._aanswer(user_query, method_choice),
+        )
+    
+    async def _aanswer(self, user_query: str, method_choice: int) -> dict:
+        with span("query", method=method_choice):
+            result = {"answer": None, "error": None, "cached": False, "sources": [], "timings": {}}
+            timings = result["timings"]
+            start = time.perf_counter()
+            try:
+                stage_start = time.perf_counter()
+                cached_answer = await self._acached_answer(user_query, method_choice)
+                timings["cache_lookup"] = time.perf_counter() - stage_start
+                if cached_answer is not None:
+                    result.update(answer=cached_answer, cached=True)
+                    return result
             
-            # Step 2: Retrieve relevant documents
-            print("Fetching relevant chunks...")
-            relevant_chunks = self.retrieval_methods.execute_method(
-                method_choice, user_query, improved_queries
-            )
+                stage_start = time.perf_counter()
+                relevant_chunks = await self._aretrieve(user_query, method_choice)
+                timings["retrieve"] = time.perf_counter() - stage_start
+                result["sources"] = [doc.metadata.get("source") for doc in relevant_chunks]
             
-            # Step 3: Generate answer
-            answer = self.answer_generator.generate_answer(user_query, relevant_chunks)
+                # Step 3: Generate answer
+                stage_start = time.perf_counter()
+                answer = await self.answer_generator.agenerate_answer(user_query, relevant_chunks)
+                timings["generate"] = time.perf_counter() - stage_start
+                await self._acache_answer(user_query, method_choice, relevant_chunks, answer)
             
-            return answer
+                result["answer"] = answer
+            
+            except Exception as e:
+                print(f"Error processing query: {e}")
+                result.update(answer=f"An error occurred while processing your query: {str(e)}", error=str(e))
+            finally:
+                timings["total"] = time.perf_counter() - start
+            return result
+    
+    async def _acached_answer(self, user_query: str, method_choice: int):
+        """Return a cached answer for the query, or None."""
+        if self.answer_cache is None:
+            return None
+        answer = await self.answer_cache.aget(user_query, method_choice)
+        if answer is not None:
+            print("Using cached answer")
+        return answer
+    
+    async def _acache_answer(self, user_query: str, method_choice: int, relevant_chunks: list, answer: str):
+        """Cache an answer generated from retrieved chunks (the no-results message is not cached)."""
+        if self.answer_cache is not None and relevant_chunks and answer:
+            await self.answer_cache.aset(user_query, method_choice, relevant_chunks, answer)
+    
+    async def _aretrieve(self, user_query: str, method_choice: int) -> list:
+        """Retrieve the relevant chunks, compressed to their key sentences if enabled."""
+        return await self._inflight.do(
+            ("retrieve", normalize_query(user_query), method_choice),
+            lambda: self._aretrieve_uncoalesced(user_query, method_choice),
+        )
+    
+    async def _aretrieve_uncoalesced(self, user_query: str, method_choice: int) -> list:
+        with span("retrieve", method=method_choice):
+            relevant_chunks = await self._aexecute_retrieval(user_query, method_choice)
+        
+        if Config.CONTEXT_COMPRESSION and relevant_chunks:
+            print("Compressing the retrieved chunks")
+            with span("compress"):
+                relevant_chunks = await self.context_compressor.acompress(user_query, relevant_chunks)
+        
+        return relevant_chunks
+    
+    async def _aexecute_retrieval(self, user_query: str, method_choice: int) -> list:
+        """Plan or improve the query if the method needs it and retrieve the relevant chunks."""
+        print(f"\nProcessing query: {user_query}")
+        print(f"Using retrieval method: {method_choice}")
+        
+        if Config.USE_QUERY_PLANNER and method_choice != 4:
+            # One LLM call covers what methods 1-3 would otherwise request separately. HyDE
+            # skips it so its streamed generation can overlap retrieval (speculative HyDE).
+            plan = await self.query_planner.aplan(user_query)
+            print("Fetching relevant chunks...")
+            return await self.retrieval_methods.aexecute_method(method_choice, user_query, plan=plan)
+        
+        # Step 1: Improve query (for methods 1 and 2)
+        improved_queries = None
+        if method_choice in [1, 2]:
+            improved_queries = await self.query_improver.aimprove_query(user_query)
+            print(f"Generated {len(improved_queries)} improved queries")
+        
+        # Step 2: Retrieve relevant documents
+        print("Fetching relevant chunks...")
+        return await self.retrieval_methods.aexecute_method(
+            method_choice, user_query, improved_queries
+        )
+    
+    async def astream_query(self, user_query: str, method_choice: int = 4, raise_errors: bool = False) -> AsyncIterator[str]:
+        """
+        Process a user query and yield the answer incrementally as tokens arrive.
+        
+        Args:
+            user_query (str): The user's question
+            method_choice (int): 1-4 for different retrieval methods
+            raise_errors (bool): Re-raise pipeline errors instead of yielding an error message
+        
+        Yields:
+            str: Pieces of the generated answer
+        """
+        # Timed by hand: a tracing span cannot stay open across yields
+        start = time.perf_counter()
+        first_token = None
+        try:
+            cached_answer = await self._acached_answer(user_query, method_choice)
+            if cached_answer is not None:
+                yield cached_answer
+                return
             
+            relevant_chunks = await self._aretrieve(user_query, method_choice)
+            tokens = []
+            async for token in self.answer_generator.astream_answer(user_query, relevant_chunks):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                    observe("time_to_first_token", first_token, method=method_choice)
+                tokens.append(token)
+                yield token
+            await self._acache_answer(user_query, method_choice, relevant_chunks, "".join(tokens))
         except Exception as e:
             print(f"Error processing query: {e}")
-            return f"An error occurred while processing your query: {str(e)}"
+            if raise_errors:
+                raise
+            yield f"An error occurred while processing your query: {str(e)}"
+        finally:
+            observe("stream_query", time.perf_counter() - start, method=method_choice)
+    
+    def stream_query(self, user_query: str, method_choice: int = 4) -> Iterator[str]:
+        """Synchronous wrapper around astream_query."""
+        stream = self.astream_query(user_query, method_choice)
+        
+        async def next_token():
+            return await stream.__anext__()
+        
+        try:
+            while True:
+                try:
+                    yield self.run(next_token())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self.run(stream.aclose())
     
     def interactive_mode(self):
         """Run the RAG system in interactive mode."""
@@ -117,9 +342,10 @@ class ChaiCodeRAGSystem:
                 
                 # Process query
                 print("\n" + "="*50)
-                answer = self.query(user_query, method_choice)
                 print("\nAnswer:")
-                print(answer)
+                for token in self.stream_query(user_query, method_choice):
+                    print(token, end="", flush=True)
+                print()
                 print("="*50)
                 
             except KeyboardInterrupt:
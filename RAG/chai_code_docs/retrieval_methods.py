@@ -1,8 +1,17 @@
+import asyncio
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List, Tuple
 from pydantic import BaseModel, Field
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.load import dumps, loads
 from config import Config
+from fusion import fuse, unique_documents
+from llm_cache import LLMResponseCache
+from query_planner import QueryPlan
+from tracing import current_context, record, span
 from vector_store import VectorStoreManager
 
 class SubQueries(BaseModel):
@@ -12,9 +21,15 @@ class SubQueries(BaseModel):
 class RetrievalMethods:
     """Implements different document retrieval strategies."""
     
-    def __init__(self, vector_store_manager: VectorStoreManager):
+    # Bump whenever the matching prompt changes so cached outputs are not reused
+    DECOMPOSITION_PROMPT_VERSION = "1"
+    HYDE_PROMPT_VERSION = "1"
+    
+    def __init__(self, vector_store_manager: VectorStoreManager, llm: BaseChatModel = None):
         self.vector_store = vector_store_manager
-        self.llm = ChatGoogleGenerativeAI(
+        self.search_executor = ThreadPoolExecutor(max_workers=Config.FANOUT_MAX_WORKERS)
+        self.cache = LLMResponseCache.from_config()
+        self.llm = llm if llm is not None else ChatGoogleGenerativeAI(
             model=Config.LLM_MODEL,
             temperature=Config.LLM_TEMPERATURE,
             google_api_key=Config.GOOGLE_API_KEY,
@@ -50,111 +65,359 @@ class RetrievalMethods:
         Your response should be comprehensive and include all key points that would be found in the top search result. 
         '''
     
-    def method_1_parallel_query(self, improved_queries: List[str]) -> List:
-        """Method 1: Parallel query (FANOUT) - Filter unique documents based on content."""
-        print("Using Method 1: Parallel Query (FANOUT)")
+    @staticmethod
+    def _fan_out_budget(queries: List[str]) -> float:
+        """
+        Seconds a whole fan-out may take: Config.SEARCH_TIMEOUT per wave of searches.
         
-        all_documents = []
-        for improved_query in improved_queries:
-            relevant_chunks = self.vector_store.search_with_retry(improved_query)
-            all_documents.append(relevant_chunks)
+        Queries beyond the pool size start late, so the budget grows with the number
+        of waves. A batched search that is still running holds one pool worker.
+        """
+        workers = max(1, Config.FANOUT_MAX_WORKERS - (1 if Config.BATCHED_SEARCH else 0))
+        return Config.SEARCH_TIMEOUT * math.ceil(len(queries) / workers)
+    
+    def _fan_out_search(self, queries: List[str]) -> List[List[Tuple]]:
+        """
+        Search every query and return one (Document, score) list per query, in query order.
         
-        # Filter unique documents based on their page_content
-        seen_content = set()
-        unique_documents = []
+        The whole call finishes within _fan_out_budget(queries) seconds. A single
+        batched search is tried first for up to half of that budget; if it fails or
+        is still running, or batching is disabled, the queries are also searched
+        concurrently on a bounded thread pool until the deadline. A late batched
+        result is still used if it arrives first, and a sub-query that fails or
+        misses the deadline yields an empty list instead of holding up the others.
         
-        for doc_list in all_documents:
-            for doc in doc_list:
-                content_hash = doc.page_content
-                if content_hash not in seen_content:
-                    seen_content.add(content_hash)
-                    unique_documents.append(doc)
+        A blocking search cannot be interrupted: on timeout it is abandoned and
+        finishes in the background, and searches still queued are cancelled.
+        """
+        budget = self._fan_out_budget(queries)
+        deadline = time.monotonic() + budget
+        batched = None
+        if Config.BATCHED_SEARCH:
+            batched = self.search_executor.submit(
+                current_context().run, self.vector_store.search_many_with_score, queries,
+                max_retries=1, raise_on_failure=True,
+            )
+            try:
+                return batched.result(timeout=budget / 2)
+            except TimeoutError:
+                print("Batched search is slow, also searching the queries one by one")
+            except Exception as e:
+                batched = None
+                print(f"Batched search failed ({e!r}), falling back to per-query searches")
         
-        return unique_documents
+        futures = [self._submit_search(query) for query in queries]
+        pending = set(futures) | ({batched} if batched is not None else set())
+        while not all(future.done() for future in futures):
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            if batched in done and batched.exception() is None:
+                for future in futures:
+                    future.cancel()
+                return batched.result()
+        if batched is not None:
+            batched.cancel()
+        return [self._search_result(future, query, timeout=0) for query, future in zip(queries, futures)]
     
-    def method_2_rank_fusion(self, improved_queries: List[str]) -> List:
-        """Method 2: Rank Fusion - Combine results using Reciprocal Rank Fusion."""
-        print("Using Method 2: Rank Fusion")
+    def _search_one(self, query: str) -> List[List[Tuple]]:
+        return self.vector_store.search_many_with_score([query])
+    
+    def _submit_search(self, query: str):
+        """Search a single query on the search pool, in the caller's tracing context."""
+        return self.search_executor.submit(current_context().run, self._search_one, query)
+    
+    def _search_result(self, future, query: str, timeout: float = None) -> List[Tuple]:
+        """Result of a background single-query search, or an empty list if it failed or timed out."""
+        try:
+            return future.result(timeout=Config.SEARCH_TIMEOUT if timeout is None else timeout)[0]
+        except Exception as e:
+            future.cancel()
+            record("failed_searches")
+            print(f"Search for sub-query '{query}' failed or timed out: {e!r}")
+            return []
+    
+    async def _afan_out_search(self, queries: List[str]) -> List[List[Tuple]]:
+        """
+        Async version of _fan_out_search, with one overall deadline.
         
-        all_documents = []
-        for improved_query in improved_queries:
-            relevant_chunks = self.vector_store.search_with_retry(improved_query)
-            all_documents.append(relevant_chunks)
-        
-        # Rank Fusion implementation
-        fused_scores = {}
-        k = 60  # RRF parameter
-        
-        for docs in all_documents:
-            for rank, doc in enumerate(docs):
-                doc_str = dumps(doc)
-                if doc_str not in fused_scores:
-                    fused_scores[doc_str] = 0
-                # RRF formula: 1 / (rank + k)
-                fused_scores[doc_str] += 1 / (rank + k)
-        
-        # Sort by fused scores
-        unique_relevant_chunks = [
-            (loads(doc), score)
-            for doc, score in sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
-        ]
+        Each sub-query also gets at most Config.SEARCH_TIMEOUT, and a timed-out
+        batched search is cancelled rather than abandoned.
+        """
+        budget = self._fan_out_budget(queries)
+        deadline = time.monotonic() + budget
+        if Config.BATCHED_SEARCH:
+            try:
+                return await asyncio.wait_for(
+                    self.vector_store.asearch_many_with_score(queries, max_retries=1, raise_on_failure=True),
+                    timeout=min(Config.SEARCH_TIMEOUT, budget / 2),
+                )
+            except Exception as e:
+                print(f"Batched search failed ({e!r}), falling back to per-query searches")
         
-        # Return only the documents (without scores)
-        return [doc for doc, _ in unique_relevant_chunks]
-    
-    def method_3_query_decomposition(self, user_query: str) -> List:
-        """Method 3: Query Decomposition - Break complex query into sub-queries."""
-        print("Using Method 3: Query Decomposition")
+        semaphore = asyncio.Semaphore(Config.FANOUT_MAX_WORKERS)
+        
+        async def search(query):
+            async with semaphore:
+                timeout = min(Config.SEARCH_TIMEOUT, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise asyncio.TimeoutError("fan-out deadline passed before the search started")
+                results = await asyncio.wait_for(self.vector_store.asearch_many_with_score([query]), timeout=timeout)
+                return results[0]
         
-        decomposition_llm = self.llm.with_structured_output(SubQueries)
+        outcomes = await asyncio.gather(*(search(query) for query in queries), return_exceptions=True)
         
-        print("Decomposing the query into sub-queries")
-        decomposition_messages = [
+        results = []
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, BaseException):
+                record("failed_searches")
+                print(f"Search for sub-query '{query}' failed or timed out: {outcome!r}")
+                results.append([])
+            else:
+                results.append(outcome)
+        return results
+    
+    def _cache_get(self, kind: str, prompt_version: str, user_query: str):
+        """Return a cached LLM output for this query, or None."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(kind, prompt_version, user_query)
+        if cached is not None:
+            print(f"Using cached {kind} output")
+        return cached
+    
+    def _cache_set(self, kind: str, prompt_version: str, user_query: str, value):
+        """Cache an LLM output and return it unchanged."""
+        if self.cache is not None:
+            self.cache.set(kind, prompt_version, user_query, value)
+        return value
+    
+    @staticmethod
+    def _relevant(results: List[Tuple]) -> List[Tuple]:
+        """Drop search results below Config.MIN_RELEVANCE_SCORE (a vector store similarity)."""
+        if Config.MIN_RELEVANCE_SCORE is None:
+            return results
+        return [(doc, score) for doc, score in results if score >= Config.MIN_RELEVANCE_SCORE]
+    
+    def _fused(self, result_lists: List[List[Tuple]], method: str) -> List:
+        """Merge per-query results ("unique" dedup or a fusion method) and return scored documents."""
+        # Threshold before fusing: fused scores (e.g. RRF's 1 / (rank + 60)) are on a different scale
+        result_lists = [self._relevant(results) for results in result_lists]
+        with span("fusion", fusion=method):
+            if method == "unique":
+                return self._with_scores(unique_documents(result_lists))
+            return self._with_scores(fuse(result_lists, method))
+    
+    @staticmethod
+    def _with_scores(scored_documents: List[Tuple]) -> List:
+        """Return copies of the documents with each score recorded under metadata["_score"]."""
+        # Search results may be shared with concurrent callers, so never annotate them in place
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, "_score": score})
+            for doc, score in scored_documents
+        ]
+    
+    def _decomposition_messages(self, user_query: str) -> list:
+        return [
             ("system", self.decomposition_prompt.format(user_query=user_query)),
             ("user", user_query)
         ]
-        
-        decomposition_response = decomposition_llm.invoke(decomposition_messages)
-        sub_queries = decomposition_response.sub_queries
-        
+    
+    def _hyde_messages(self, user_query: str) -> list:
+        return [
+            ("system", self.hyde_prompt.format(query=user_query)),
+            ("user", user_query)
+        ]
+    
+    @staticmethod
+    def _or_user_query(queries: List[str], user_query: str) -> List[str]:
+        """Drop blank generated queries; search the user query itself if none are left."""
+        queries = [query for query in queries if query and query.strip()]
+        if not queries:
+            print("No generated queries, searching the user query itself")
+            return [user_query]
+        return queries
+    
+    @staticmethod
+    def _print_sub_queries(sub_queries: List[str]):
         print(f"Generated {len(sub_queries)} sub-queries:")
         for i, sq in enumerate(sub_queries, 1):
             print(f"{i}. {sq}")
+    
+    def method_1_parallel_query(self, improved_queries: List[str]) -> List:
+        """Method 1: Parallel query (FANOUT) - Filter unique documents by chunk ID."""
+        print("Using Method 1: Parallel Query (FANOUT)")
+        
+        all_documents = self._fan_out_search(improved_queries)
+        return self._fused(all_documents, "unique")
+    
+    def method_2_rank_fusion(self, improved_queries: List[str]) -> List:
+        """Method 2: Rank Fusion - Combine results using Config.FUSION_METHOD (RRF by default)."""
+        print("Using Method 2: Rank Fusion")
+        
+        all_documents = self._fan_out_search(improved_queries)
+        return self._fused(all_documents, Config.FUSION_METHOD)
+    
+    def method_3_query_decomposition(self, user_query: str, sub_queries: List[str] = None) -> List:
+        """Method 3: Query Decomposition - Break complex query into sub-queries.
+        
+        Pass sub_queries (e.g. from a QueryPlan) to skip the decomposition LLM call.
+        """
+        print("Using Method 3: Query Decomposition")
+        
+        if sub_queries is None:
+            sub_queries = self._cache_get("decompose", self.DECOMPOSITION_PROMPT_VERSION, user_query)
+        if sub_queries is None:
+            decomposition_llm = self.llm.with_structured_output(SubQueries)
+            
+            print("Decomposing the query into sub-queries")
+            with span("decompose"):
+                decomposition_response = decomposition_llm.invoke(self._decomposition_messages(user_query))
+            sub_queries = self._cache_set(
+                "decompose", self.DECOMPOSITION_PROMPT_VERSION, user_query, decomposition_response.sub_queries
+            )
+        sub_queries = self._or_user_query(sub_queries, user_query)
+        self._print_sub_queries(sub_queries)
         
         # Collect documents from all sub-queries
-        decomposition_documents = []
-        for sub_query in sub_queries:
-            relevant_chunks = self.vector_store.search_with_retry(sub_query)
-            decomposition_documents.append(relevant_chunks)
-        
-        # Filter unique documents
-        seen_content = set()
-        unique_documents = []
-        
-        for doc_list in decomposition_documents:
-            for doc in doc_list:
-                content_hash = doc.page_content
-                if content_hash not in seen_content:
-                    seen_content.add(content_hash)
-                    unique_documents.append(doc)
-        
-        return unique_documents
-    
-    def method_4_hypothetical_document_embedding(self, user_query: str) -> List:
-        """Method 4: Hypothetical Document Embedding (HyDE)."""
-        print("Using Method 4: Hypothetical Document Embedding (HyDE)")
+        decomposition_documents = self._fan_out_search(sub_queries)
+        return self._fused(decomposition_documents, "unique")
+    
+    def method_4_hypothetical_document_embedding(self, user_query: str, hypothetical_document: str = None) -> List:
+        """Method 4: Hypothetical Document Embedding (HyDE).
         
-        messages = [
-            ("system", self.hyde_prompt.format(query=user_query)),
-            ("user", user_query)
-        ]
+        Pass hypothetical_document (e.g. a cached one) to skip generating it.
+        """
+        print("Using Method 4: Hypothetical Document Embedding (HyDE)")
         
-        response = self.llm.invoke(messages)
-        hypothetical_document = response.content
+        if hypothetical_document is None:
+            hypothetical_document = self._cache_get("hyde", self.HYDE_PROMPT_VERSION, user_query)
+        if hypothetical_document is not None:
+            if Config.SPECULATIVE_HYDE:
+                # Same candidate lists as the speculative path, without any generation
+                result_lists = self.vector_store.search_many_with_score([user_query, hypothetical_document])
+                return self._fused(result_lists, "rrf")
+        elif Config.SPECULATIVE_HYDE:
+            return self._speculative_hyde(user_query)
+        else:
+            with span("hyde_generate"):
+                response = self.llm.invoke(self._hyde_messages(user_query))
+            hypothetical_document = self._cache_set("hyde", self.HYDE_PROMPT_VERSION, user_query, response.content)
         
         # Search using the hypothetical document
-        unique_relevant_chunks = self.vector_store.search_with_retry(hypothetical_document)
-        return unique_relevant_chunks
+        unique_relevant_chunks = self.vector_store.search_many_with_score([hypothetical_document])[0]
+        return self._with_scores(self._relevant(unique_relevant_chunks))
+    
+    def _speculative_hyde(self, user_query: str) -> List:
+        """
+        HyDE with retrieval overlapped with generation.
+        
+        The raw query is searched immediately and a partial hypothetical document is
+        searched as soon as Config.HYDE_EARLY_SEARCH_CHARS have streamed in, both in
+        the background while generation continues. Generation stops at
+        Config.HYDE_MAX_CHARS, the final document is searched, and all candidate
+        lists are merged with Reciprocal Rank Fusion.
+        """
+        searches = [(user_query, self._submit_search(user_query))]
+        
+        hypothetical_document = ""
+        with span("hyde_generate"):
+            for chunk in self.llm.stream(self._hyde_messages(user_query)):
+                hypothetical_document += chunk.content
+                if len(searches) == 1 and len(hypothetical_document) >= Config.HYDE_EARLY_SEARCH_CHARS:
+                    print("Searching with the partial hypothetical document")
+                    searches.append((hypothetical_document, self._submit_search(hypothetical_document)))
+                if len(hypothetical_document) >= Config.HYDE_MAX_CHARS:
+                    break
+        
+        self._cache_set("hyde", self.HYDE_PROMPT_VERSION, user_query, hypothetical_document)
+        
+        searches.append((hypothetical_document, self._submit_search(hypothetical_document)))
+        result_lists = [self._search_result(future, query) for query, future in searches]
+        return self._fused(result_lists, "rrf")
+    
+    async def _aspeculative_hyde(self, user_query: str) -> List:
+        """Async version of _speculative_hyde."""
+        searches = [asyncio.create_task(self.vector_store.asearch_many_with_score([user_query]))]
+        
+        hypothetical_document = ""
+        try:
+            with span("hyde_generate"):
+                async for chunk in self.llm.astream(self._hyde_messages(user_query)):
+                    hypothetical_document += chunk.content
+                    if len(searches) == 1 and len(hypothetical_document) >= Config.HYDE_EARLY_SEARCH_CHARS:
+                        print("Searching with the partial hypothetical document")
+                        searches.append(asyncio.create_task(
+                            self.vector_store.asearch_many_with_score([hypothetical_document])
+                        ))
+                    if len(hypothetical_document) >= Config.HYDE_MAX_CHARS:
+                        break
+            self._cache_set("hyde", self.HYDE_PROMPT_VERSION, user_query, hypothetical_document)
+            
+            searches.append(asyncio.create_task(
+                self.vector_store.asearch_many_with_score([hypothetical_document])
+            ))
+            result_lists = [results[0] for results in await asyncio.gather(*searches)]
+        finally:
+            for task in searches:
+                task.cancel()
+        
+        return self._fused(result_lists, "rrf")
+    
+    async def amethod_1_parallel_query(self, improved_queries: List[str]) -> List:
+        """Async version of method_1_parallel_query."""
+        print("Using Method 1: Parallel Query (FANOUT)")
+        
+        all_documents = await self._afan_out_search(improved_queries)
+        return self._fused(all_documents, "unique")
+    
+    async def amethod_2_rank_fusion(self, improved_queries: List[str]) -> List:
+        """Async version of method_2_rank_fusion."""
+        print("Using Method 2: Rank Fusion")
+        
+        all_documents = await self._afan_out_search(improved_queries)
+        return self._fused(all_documents, Config.FUSION_METHOD)
+    
+    async def amethod_3_query_decomposition(self, user_query: str, sub_queries: List[str] = None) -> List:
+        """Async version of method_3_query_decomposition."""
+        print("Using Method 3: Query Decomposition")
+        
+        if sub_queries is None:
+            sub_queries = self._cache_get("decompose", self.DECOMPOSITION_PROMPT_VERSION, user_query)
+        if sub_queries is None:
+            decomposition_llm = self.llm.with_structured_output(SubQueries)
+            
+            print("Decomposing the query into sub-queries")
+            with span("decompose"):
+                decomposition_response = await decomposition_llm.ainvoke(self._decomposition_messages(user_query))
+            sub_queries = self._cache_set(
+                "decompose", self.DECOMPOSITION_PROMPT_VERSION, user_query, decomposition_response.sub_queries
+            )
+        sub_queries = self._or_user_query(sub_queries, user_query)
+        self._print_sub_queries(sub_queries)
+        
+        decomposition_documents = await self._afan_out_search(sub_queries)
+        return self._fused(decomposition_documents, "unique")
+    
+    async def amethod_4_hypothetical_document_embedding(self, user_query: str, hypothetical_document: str = None) -> List:
+        """Async version of method_4_hypothetical_document_embedding."""
+        print("Using Method 4: Hypothetical Document Embedding (HyDE)")
+        
+        if hypothetical_document is None:
+            hypothetical_document = self._cache_get("hyde", self.HYDE_PROMPT_VERSION, user_query)
+        if hypothetical_document is not None:
+            if Config.SPECULATIVE_HYDE:
+                result_lists = await self.vector_store.asearch_many_with_score([user_query, hypothetical_document])
+                return self._fused(result_lists, "rrf")
+        elif Config.SPECULATIVE_HYDE:
+            return await self._aspeculative_hyde(user_query)
+        else:
+            with span("hyde_generate"):
+                response = await self.llm.ainvoke(self._hyde_messages(user_query))
+            hypothetical_document = self._cache_set("hyde", self.HYDE_PROMPT_VERSION, user_query, response.content)
+        
+        results = await self.vector_store.asearch_many_with_score([hypothetical_document])
+        return self._with_scores(self._relevant(results[0]))
     
     def get_available_methods(self) -> List[str]:
         """Return list of available retrieval methods."""
@@ -165,19 +428,51 @@ class RetrievalMethods:
             "4. Hypothetical Document Embedding (HyDE)"
         ]
     
-    def execute_method(self, method_choice: int, user_query: str, improved_queries: List[str] = None) -> List:
-        """Execute the chosen retrieval method."""
+    def execute_method(self, method_choice: int, user_query: str, improved_queries: List[str] = None, plan: QueryPlan = None) -> List:
+        """
+        Execute the chosen retrieval method.
+        
+        When a QueryPlan is given, its queries and sub-queries are used instead of
+        asking the LLM for them again. If the generated queries or sub-queries are
+        empty, the user query itself is searched. Method 4 does not use a plan: it generates
+        its hypothetical document speculatively (see Config.SPECULATIVE_HYDE).
+        """
+        if plan is not None:
+            improved_queries = plan.improved_queries
         if method_choice == 1:
             if improved_queries is None:
                 raise ValueError("Improved queries are required for Method 1")
-            return self.method_1_parallel_query(improved_queries)
+            return self.method_1_parallel_query(self._or_user_query(improved_queries, user_query))
         elif method_choice == 2:
             if improved_queries is None:
                 raise ValueError("Improved queries are required for Method 2")
-            return self.method_2_rank_fusion(improved_queries)
+            return self.method_2_rank_fusion(self._or_user_query(improved_queries, user_query))
         elif method_choice == 3:
-            return self.method_3_query_decomposition(user_query)
+            return self.method_3_query_decomposition(
+                user_query, sub_queries=plan.sub_queries if plan is not None else None
+            )
         elif method_choice == 4:
             return self.method_4_hypothetical_document_embedding(user_query)
         else:
-            raise ValueError(f"Invalid method choice: {method_choice}. Choose 1-4.") 
\ No newline at end of file
+            raise ValueError(f"Invalid method choice: {method_choice}. Choose 1-4.")
+    
+    async def aexecute_method(self, method_choice: int, user_query: str, improved_queries: List[str] = None, plan: QueryPlan = None) -> List:
+        """Async version of execute_method."""
+        if plan is not None:
+            improved_queries = plan.improved_queries
+        if method_choice == 1:
+            if improved_queries is None:
+                raise ValueError("Improved queries are required for Method 1")
+            return await self.amethod_1_parallel_query(self._or_user_query(improved_queries, user_query))
+        elif method_choice == 2:
+            if improved_queries is None:
+                raise ValueError("Improved queries are required for Method 2")
+            return await self.amethod_2_rank_fusion(self._or_user_query(improved_queries, user_query))
+        elif method_choice == 3:
+            return await self.amethod_3_query_decomposition(
+                user_query, sub_queries=plan.sub_queries if plan is not None else None
+            )
+        elif method_choice == 4:
+            return await self.amethod_4_hypothetical_document_embedding(user_query)
+        else:
+            raise ValueError(f"Invalid method choice: {method_choice}. Choose 1-4.")
\ No newline at end of file
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+ChaiCode RAG System - HTTP Server
+
+Serves the RAG system over HTTP with a single shared ChaiCodeRAGSystem, so the
+Qdrant, embedding and LLM clients are created once for all requests.
+
+Endpoints:
+    POST /query    {"query": "...", "method": 1-4} -> {"answer": "...", "method": n}
+                   (500 with {"error": "...", "method": n} if the pipeline failed)
+    POST /stream   same body, the answer is streamed back as plain text
+                   (500 with the same JSON error if the pipeline failed before the
+                   first token; a later failure cuts the stream off mid-answer)
+    GET  /healthz  liveness and load information
+    GET  /metrics  per-stage latency histograms and counters (Prometheus text format)
+    GET  /metrics.json  the same metrics with p50/p95/p99 and recent traces, as JSON
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from aiohttp import web
+from config import Config
+from rag_system import ChaiCodeRAGSystem
+from tracing import tracer
+
+class RAGServer:
+    """Async HTTP front end with a concurrency limit and a bounded request queue."""
+
+    def __init__(self, rag_system: ChaiCodeRAGSystem = None, max_concurrency: int = None, max_queue: int = None):
+        self.rag_system = rag_system if rag_system is not None else ChaiCodeRAGSystem()
+        self.max_concurrency = max_concurrency or Config.SERVER_MAX_CONCURRENCY
+        self.max_queue = max_queue if max_queue is not None else Config.SERVER_MAX_QUEUE
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+
+    @asynccontextmanager
+    async def _slot(self):
+        """
+        Hold one of the pipeline slots for the duration of a request.
+
+        Requests wait in a queue of at most max_queue entries for up to
+        Config.SERVER_QUEUE_TIMEOUT seconds; beyond that they are rejected with 503
+        so a burst cannot exhaust the upstream LLM and Qdrant quotas.
+        """
+        if self._slots.locked() and self.queued >= self.max_queue:
+            raise web.HTTPServiceUnavailable(text="Server is busy, please retry later", headers={"Retry-After": "5"})
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=Config.SERVER_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise web.HTTPServiceUnavailable(text="Timed out waiting for a free slot", headers={"Retry-After": "5"})
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    @staticmethod
+    async def _parse_request(request: web.Request):
+        """Read the query and method from a JSON body or the query string."""
+        if request.method == "POST":
+            try:
+                body = await request.json()
+            except ValueError:
+                raise web.HTTPBadRequest(text="Request body must be JSON")
+        else:
+            body = request.query
+
+        user_query = str(body.get("query", "")).strip()
+        if not user_query:
+            raise web.HTTPBadRequest(text="Missing 'query'")
+
+        try:
+            method_choice = int(body.get("method", 4))
+        except (TypeError, ValueError):
+            raise web.HTTPBadRequest(text="'method' must be an integer between 1 and 4")
+        if not 1 <= method_choice <= 4:
+            raise web.HTTPBadRequest(text="'method' must be an integer between 1 and 4")
+
+        return user_query, method_choice
+
+    async def handle_query(self, request: web.Request) -> web.Response:
+        user_query, method_choice = await self._parse_request(request)
+        async with self._slot():
+            result = await self.rag_system.aquery_with_details(user_query, method_choice)
+        if result["error"] is not None:
+            return web.json_response({"error": result["error"], "method": method_choice}, status=500)
+        return web.json_response({"answer": result["answer"], "method": method_choice})
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        user_query, method_choice = await self._parse_request(request)
+        async with self._slot():
+            stream = self.rag_system.astream_query(user_query, method_choice, raise_errors=True)
+            try:
+                # Wait for the first token so a failed pipeline still gets a 500
+                try:
+                    first_token = await stream.__anext__()
+                except StopAsyncIteration:
+                    first_token = ""
+                except Exception as e:
+                    return web.json_response({"error": str(e), "method": method_choice}, status=500)
+
+                response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+                await response.prepare(request)
+                await response.write(first_token.encode("utf-8"))
+                # An error after this point aborts the connection, so the client
+                # sees a truncated body rather than a complete answer
+                async for token in stream:
+                    await response.write(token.encode("utf-8"))
+            finally:
+                # Stops generation if the client disconnects mid-answer
+                await stream.aclose()
+
+            await response.write_eof()
+            return response
+
+    async def handle_healthz(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        })
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=tracer.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    async def handle_metrics_json(self, request: web.Request) -> web.Response:
+        return web.json_response(tracer.metrics())
+
+    def create_app(self) -> web.Application:
+        """Build the aiohttp application serving this RAG system."""
+        app = web.Application()
+        app.add_routes([
+            web.post("/query", self.handle_query),
+            web.get("/query", self.handle_query),
+            web.post("/stream", self.handle_stream),
+            web.get("/stream", self.handle_stream),
+            web.get("/healthz", self.handle_healthz),
+            web.get("/metrics", self.handle_metrics),
+            web.get("/metrics.json", self.handle_metrics_json),
+        ])
+        return app
+
+def run_server(host: str = None, port: int = None):
+    """Initialize the RAG system once and serve it until interrupted."""
+    print("Initializing ChaiCode RAG System...")
+    server = RAGServer()
+    web.run_app(server.create_app(), host=host or Config.SERVER_HOST, port=port or Config.SERVER_PORT)
+
+if __name__ == "__main__":
+    run_server()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls across threads.
+
+    The first caller for a key runs the function; callers that arrive while it is
+    in flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call["done"].wait()
+        else:
+            try:
+                call["result"] = fn()
+            except BaseException as e:
+                call["error"] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call["done"].set()
+
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent identical coroutine calls on an event loop.
+
+    The shared computation runs as its own task, so a caller that is cancelled does
+    not cancel it for the others. Calls are only coalesced within one event loop.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() for key, or join the identical call already in flight."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(loop_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._tasks[loop_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+        return await asyncio.shield(task)
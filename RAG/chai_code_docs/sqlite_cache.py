@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+class SQLiteCache:
+    """
+    Small disk-backed key/value store with LRU and size-based eviction.
+
+    The entry count and byte total are kept in a one-row totals table that
+    triggers update on every write, so eviction checks never scan the entries.
+    """
+
+    def __init__(self, path: str, max_entries: int = None, max_bytes: int = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), "
+            "entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+            "UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+            "UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN "
+            "UPDATE totals SET bytes = bytes + NEW.size - OLD.size; END"
+        )
+        # Caches created before the totals table existed are counted once here
+        self._conn.execute(
+            "INSERT OR IGNORE INTO totals (id, entries, bytes) "
+            "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored value for key (and mark it as recently used), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def get_many(self, keys: list) -> dict:
+        """Return a {key: value} dict for the keys that are present."""
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def set(self, key: str, value: bytes):
+        """Store a single value."""
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        """Store several values in one transaction and evict if over capacity."""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the triggers
+            self._conn.executemany(
+                "INSERT INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "accessed = excluded.accessed",
+                [(key, value, len(value), now) for key, value in items.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """Remove a single entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until both limits are respected."""
+        if self.max_entries is not None:
+            count = self._conn.execute("SELECT entries FROM totals").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                    (excess,)
+                )
+
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT bytes FROM totals").fetchone()[0]
+            if total > self.max_bytes:
+                to_free = total - self.max_bytes
+                freed = 0
+                victims = []
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= to_free:
+                        break
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        """Return the number of entries and total stored bytes."""
+        with self._lock:
+            count, total = self._conn.execute("SELECT entries, bytes FROM totals").fetchone()
+        return {"entries": count, "bytes": total}
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
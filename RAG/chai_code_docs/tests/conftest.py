@@ -0,0 +1,62 @@
+import os
+import sys
+import pytest
+
+# The package uses flat imports (from config import Config), as when run from chai_code_docs
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from benchmark import HashingEmbeddings
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Point every index, manifest and cache at tmp_path and use the local backend."""
+    monkeypatch.setattr(Config, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(Config, "LOCAL_INDEX_MODE", "exact")
+    monkeypatch.setattr(Config, "LOCAL_INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setattr(Config, "INDEX_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(Config, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "ANSWER_CACHE_PATH", str(tmp_path / "answers.sqlite3"))
+    monkeypatch.setattr(Config, "FETCH_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "FETCH_CACHE_PATH", str(tmp_path / "pages.sqlite3"))
+    monkeypatch.setattr(Config, "USE_QUERY_PLANNER", Config.USE_QUERY_PLANNER)
+    monkeypatch.setattr(Config, "RETRY_DELAY", 0)
+    return tmp_path
+
+@pytest.fixture
+def embeddings():
+    return HashingEmbeddings()
+
+@pytest.fixture
+def manager(embeddings):
+    from vector_store import VectorStoreManager
+    return VectorStoreManager(embeddings=embeddings)
+
+TOPICS = {
+    "docs://python": "Python virtual environments isolate packages. Create one with python -m venv and activate it.",
+    "docs://docker": "Docker containers package an application with its dependencies. Build images with docker build.",
+    "docs://git": "Git branches let you work on features in isolation. Create one with git switch -c.",
+    "docs://postgres": "Postgres indexes speed up queries. Create one with CREATE INDEX on the column.",
+}
+
+@pytest.fixture
+def llm():
+    from benchmark import FakeChatModel
+    return FakeChatModel(latency=0.0, answer_words=20)
+
+@pytest.fixture
+def rag_system(llm, embeddings):
+    """An offline ChaiCodeRAGSystem indexed with a few short pages."""
+    from langchain_core.documents import Document
+    from rag_system import ChaiCodeRAGSystem
+
+    system = ChaiCodeRAGSystem(llm=llm, embeddings=embeddings)
+    system.vector_store_manager.index_documents(
+        [Document(page_content=text, metadata={"source": source}) for source, text in TOPICS.items()]
+    )
+    yield system
+    system.close()
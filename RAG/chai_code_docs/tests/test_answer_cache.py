@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import pytest
+from langchain_core.documents import Document
+from answer_cache import AnswerCache
+from config import Config
+from index_manifest import IndexManifest
+from sqlite_cache import SQLiteCache
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Re-indexes one page in a fresh interpreter, as a separate indexing job would
+REINDEX = """
+import sys
+from langchain_core.documents import Document
+from benchmark import HashingEmbeddings
+from config import Config
+from vector_store import VectorStoreManager
+
+Config.VECTOR_BACKEND = "local"
+Config.LOCAL_INDEX_PATH, Config.INDEX_MANIFEST_PATH = sys.argv[1], sys.argv[2]
+Config.EMBEDDING_CACHE_ENABLED = False
+manager = VectorStoreManager(embeddings=HashingEmbeddings())
+manager.index_documents([Document(page_content="Git rebase rewrites history.", metadata={"source": "docs://git"})])
+"""
+
+CHUNKS = [Document(page_content="Git branches let you work on features in isolation.", metadata={"source": "docs://git"})]
+
+@pytest.fixture
+def answer_cache(isolated_config):
+    manifest = IndexManifest(Config.INDEX_MANIFEST_PATH)
+    return AnswerCache(SQLiteCache(Config.ANSWER_CACHE_PATH), manifest)
+
+def test_answers_are_keyed_on_query_and_method(answer_cache):
+    answer_cache.set("What is C++?", 1, CHUNKS, "a systems language")
+    answer_cache.set("What is C#?", 1, CHUNKS, "a .NET language")
+
+    assert answer_cache.get("what is  c++", 1) == "a systems language"
+    assert answer_cache.get("What is C#?", 1) == "a .NET language"
+    assert answer_cache.get("What is C?", 1) is None
+    assert answer_cache.get("What is C++?", 2) is None
+
+def test_bumping_the_version_invalidates_answers(answer_cache):
+    answer_cache.set("How do I branch?", 1, CHUNKS, "git switch -c")
+
+    answer_cache.manifest.bump_version()
+    answer_cache.manifest.save()
+
+    assert answer_cache.get("How do I branch?", 1) is None
+    assert answer_cache.stats()["misses"] == 1
+
+def test_reindex_from_another_process_invalidates_answers(manager, answer_cache):
+    manager.index_documents(CHUNKS)
+    answer_cache.manifest = manager.manifest
+    answer_cache.set("How do I branch?", 1, CHUNKS, "git switch -c")
+    assert answer_cache.get("How do I branch?", 1) == "git switch -c"
+    version = manager.manifest.version
+
+    subprocess.run(
+        [sys.executable, "-c", REINDEX, Config.LOCAL_INDEX_PATH, Config.INDEX_MANIFEST_PATH],
+        cwd=PACKAGE_DIR, check=True, capture_output=True,
+    )
+
+    assert answer_cache.get("How do I branch?", 1) is None
+    assert manager.manifest.current_version() == version + 1
+
+    manager.manifest.bump_version()
+    assert manager.manifest.version == version + 2
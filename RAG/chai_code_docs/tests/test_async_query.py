@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+def test_query_answers_from_the_retrieved_chunks(rag_system):
+    details = asyncio.run(rag_system.aquery_with_details("How do docker containers work?", 4))
+
+    assert details["error"] is None
+    assert details["answer"]
+    assert "docs://docker" in details["sources"]
+    assert set(details["timings"]) >= {"retrieve", "generate", "total"}
+
+def test_sync_query_wraps_the_async_pipeline(rag_system):
+    assert rag_system.query("git branches", 1) == asyncio.run(rag_system.aquery("git branches", 1))
+
+def test_concurrent_queries_run_on_one_loop(rag_system):
+    queries = ["python virtual environments", "docker build", "git switch", "postgres index"]
+
+    async def run_all():
+        return await asyncio.gather(*(rag_system.aquery_with_details(query, method) for query in queries for method in (1, 2, 3, 4)))
+
+    results = asyncio.run(run_all())
+
+    assert all(result["error"] is None and result["answer"] for result in results)
+    indexed_sources = set(rag_system.vector_store_manager.manifest.sources)
+    assert all(set(result["sources"]) <= indexed_sources for result in results)
+
+def test_pipeline_errors_are_reported(rag_system, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("search backend down")
+
+    monkeypatch.setattr(rag_system.retrieval_methods, "aexecute_method", fail)
+
+    details = asyncio.run(rag_system.aquery_with_details("anything", 2))
+
+    assert details["error"] == "search backend down"
+    assert "search backend down" in details["answer"]
+
+def test_sync_query_works_from_several_threads(rag_system, llm):
+    llm.latency = 0.02
+    queries = ["python virtual environments", "docker build", "git switch", "postgres index"] * 2
+    answers = {}
+
+    def ask(index, query):
+        answers[index] = rag_system.query(query, 1)
+
+    threads = [threading.Thread(target=ask, args=item) for item in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(answers) == len(queries)
+    assert all(answer and "error" not in answer for answer in answers.values())
+    assert "".join(rag_system.stream_query("git switch", 1)).strip() == answers[2].strip()
+
+def test_sync_query_works_inside_a_running_loop(rag_system):
+    async def caller():
+        return rag_system.query("docker build", 1)
+
+    assert "error" not in asyncio.run(caller())
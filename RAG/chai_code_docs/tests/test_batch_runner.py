@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from batch_runner import BatchRunner, RateLimiter
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+def read_results(path):
+    return sorted((json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()), key=lambda r: r["line"])
+
+def test_batch_answers_every_line(rag_system, tmp_path):
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    write_lines(questions, [
+        json.dumps({"query": "docker containers", "id": "a"}),
+        json.dumps({"query": "git branches", "method": 1}),
+        "",
+        json.dumps("postgres indexes"),
+        "{not json",
+        json.dumps({"query": "python venv", "method": 9}),
+        "[1]",
+        "null",
+    ])
+
+    stats = BatchRunner(rag_system, concurrency=2, rate=0).run(str(questions), str(answers))
+
+    results = read_results(answers)
+    assert [result["line"] for result in results] == [1, 2, 4, 5, 6, 7, 8]
+    assert stats["processed"] == 7 and stats["failed"] == 4 and stats["skipped"] == 0
+    assert results[0]["id"] == "a" and results[0]["method"] == 4
+    assert all(result["answer"] and result["error"] is None for result in results[:3])
+    assert "retrieve" in results[1]["timings"]
+    assert results[3]["error"].startswith("Invalid JSON")
+    assert results[4]["error"] == "Invalid method: 9. Choose 1-4."
+    assert results[5]["error"] == results[6]["error"] == "Each line must be a JSON object or string"
+
+def test_rerun_resumes_after_the_completed_lines(rag_system, tmp_path):
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    write_lines(questions, [json.dumps({"query": query}) for query in ("docker", "git", "postgres")])
+    # A crash left line 1 answered and line 3 half written
+    answers.write_text(json.dumps({"line": 1, "answer": "earlier"}) + "\n" + '{"line": 3, "ans', encoding="utf-8")
+
+    stats = BatchRunner(rag_system, concurrency=2, rate=0).run(str(questions), str(answers))
+
+    results = read_results(answers)
+    assert [result["line"] for result in results] == [1, 2, 3]
+    assert results[0]["answer"] == "earlier"
+    assert stats["skipped"] == 1 and stats["processed"] == 2
+
+def test_failed_lines_are_retried_on_rerun(rag_system, tmp_path):
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    write_lines(questions, [json.dumps({"query": query}) for query in ("docker", "git")])
+    answers.write_text(
+        json.dumps({"line": 1, "answer": "earlier", "error": None}) + "\n"
+        + json.dumps({"line": 2, "answer": None, "error": "search backend down"}) + "\n",
+        encoding="utf-8",
+    )
+
+    stats = BatchRunner(rag_system, concurrency=2, rate=0).run(str(questions), str(answers))
+
+    results = read_results(answers)
+    assert stats["skipped"] == 1 and stats["processed"] == 1
+    assert results[-1]["line"] == 2 and results[-1]["answer"] and results[-1]["error"] is None
+
+def test_an_unexpected_error_becomes_an_error_record(rag_system, tmp_path, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(rag_system, "aquery_with_details", fail)
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    write_lines(questions, [json.dumps({"query": query}) for query in ("docker", "git", "postgres")])
+
+    stats = BatchRunner(rag_system, concurrency=1, rate=0).run(str(questions), str(answers))
+
+    assert stats["processed"] == stats["failed"] == 3
+    assert [result["error"] for result in read_results(answers)] == ["unexpected"] * 3
+
+def test_rate_limiter_spaces_out_starts():
+    async def start_times():
+        limiter = RateLimiter(rate=20)
+        times = []
+
+        async def start():
+            await limiter.wait()
+            times.append(time.monotonic())
+
+        await asyncio.gather(*(start() for _ in range(4)))
+        return times
+
+    times = sorted(asyncio.run(start_times()))
+
+    assert times[-1] - times[0] >= 3 * 0.05 * 0.9
@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from langchain_core.documents import Document
+
+TOPICS = ["python virtual environments", "docker containers", "git branches", "postgres indexes"]
+
+@pytest.fixture
+def indexed(manager):
+    manager.index_documents([Document(page_content=topic, metadata={"source": topic}) for topic in TOPICS])
+    return manager
+
+def test_search_many_embeds_all_queries_in_one_call(indexed, embeddings):
+    calls = embeddings.calls
+
+    results = indexed.search_many(["git branches", "docker containers"], k=1)
+
+    assert embeddings.calls == calls + 1
+    assert [docs[0].page_content for docs in results] == ["git branches", "docker containers"]
+
+def test_async_search_matches_sync_search(indexed):
+    queries = ["postgres indexes", "python virtual environments"]
+
+    sync_results = indexed.search_many_with_score(queries, k=2)
+    async_results = asyncio.run(indexed.asearch_many_with_score(queries, k=2))
+
+    for sync_pairs, async_pairs in zip(sync_results, async_results):
+        assert [doc.page_content for doc, _ in sync_pairs] == [doc.page_content for doc, _ in async_pairs]
+        assert [score for _, score in sync_pairs] == pytest.approx([score for _, score in async_pairs])
+
+def test_failed_search_returns_empty_lists_or_raises(indexed, monkeypatch):
+    def fail(vectors, k):
+        raise ConnectionError("backend down")
+
+    monkeypatch.setattr(indexed, "_search_by_vectors", fail)
+
+    assert indexed.search_many(["a", "b"], max_retries=2) == [[], []]
+    with pytest.raises(ConnectionError):
+        indexed.search_many(["a"], max_retries=1, raise_on_failure=True)
@@ -0,0 +1,34 @@
+import os
+from benchmark import RetrievalBenchmark, recall_at_k, synthetic_corpus
+from config import Config
+
+def test_recall_at_k_counts_distinct_sources():
+    assert recall_at_k(["a", "a", None, "b", "c"], ["b"], 2) == 1.0
+    assert recall_at_k(["a", "a", "b"], ["c", "b"], 2) == 0.5
+    assert recall_at_k(["a"], [], 4) == 0.0
+
+def test_retrieval_methods_keep_their_recall_and_call_budget():
+    """Regression check: the offline benchmark's recall and calls per query must not regress."""
+    documents, queries = synthetic_corpus(num_docs=40, num_queries=12)
+
+    with RetrievalBenchmark(documents, queries, llm_latency=0.0, concurrency=4) as benchmark:
+        results = benchmark.run()
+        workdir = benchmark.workdir
+
+    assert not os.path.exists(workdir)
+    recall_key = f"recall@{benchmark.k}"
+    for result in results:
+        assert result[recall_key] >= 0.9, result
+        assert result["llm_calls_per_query"] <= 3, result
+        assert result["embedding_calls_per_query"] <= 3, result
+
+def test_benchmark_restores_config_when_closed(monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", True)
+    documents, queries = synthetic_corpus(num_docs=5, num_queries=2)
+    before = (Config.LOCAL_INDEX_PATH, Config.INDEX_MANIFEST_PATH, Config.ANSWER_CACHE_ENABLED)
+
+    with RetrievalBenchmark(documents, queries, llm_latency=0.0) as benchmark:
+        assert Config.LOCAL_INDEX_PATH.startswith(benchmark.workdir)
+        assert Config.ANSWER_CACHE_ENABLED is False
+
+    assert (Config.LOCAL_INDEX_PATH, Config.INDEX_MANIFEST_PATH, Config.ANSWER_CACHE_ENABLED) == before
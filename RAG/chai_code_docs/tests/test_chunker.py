@@ -0,0 +1,65 @@
+import random
+from langchain_core.documents import Document
+from chunker import StructuralChunker, structural_blocks
+from tokenizer import count_tokens
+
+CODE = "```bash\npip install requests\n\n    python -m venv .venv\n```"
+
+def words(seed, count):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "omega"]) for _ in range(count)) + "."
+
+def page(*parts):
+    return Document(page_content="\n\n".join(parts), metadata={"source": "docs://page"})
+
+def test_blocks_keep_code_fences_whole():
+    text = f"# Setup\n\nInstall it.\n\n{CODE}\n\nDone."
+
+    blocks = [(text[start:end], heading) for start, end, heading in structural_blocks(text)]
+
+    assert blocks == [("# Setup", "Setup"), ("Install it.", None), (CODE, None), ("Done.", None)]
+
+def test_chunks_are_slices_within_the_token_budget():
+    document = page("# Guide", *(words(seed, 60) for seed in range(6)), CODE, "## Details", words(9, 400))
+
+    chunks = StructuralChunker(max_tokens=80, overlap_tokens=0).split_documents([document])
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert document.page_content[start:start + len(chunk.page_content)] == chunk.page_content
+        assert count_tokens(chunk.page_content) <= 80 * 1.1
+        assert chunk.metadata["source"] == "docs://page"
+    assert any(CODE in chunk.page_content for chunk in chunks)
+    assert [chunk.metadata.get("section") for chunk in chunks][-1] == "Details"
+
+def test_overlap_stays_within_a_section():
+    rng = random.Random(3)
+    sections = [
+        part
+        for number in range(20)
+        for part in [f"# Section {number}", *(words(rng.random(), rng.randint(2, 30)) for _ in range(rng.randint(1, 4)))]
+    ]
+    document = page(*sections)
+
+    chunks = StructuralChunker(max_tokens=60, overlap_tokens=30).split_documents([document])
+
+    overlapping = 0
+    for previous, chunk in zip(chunks, chunks[1:]):
+        previous_end = previous.metadata["start_index"] + len(previous.page_content)
+        shared = document.page_content[chunk.metadata["start_index"]:previous_end]
+        if shared:
+            overlapping += 1
+            # Only a heading at the very start may appear in the shared text
+            assert "\n# " not in shared, shared
+    assert overlapping
+
+def test_consecutive_chunks_of_a_section_overlap():
+    paragraphs = [words(seed, 12) for seed in range(12)]
+    document = page("# Only", *paragraphs)
+
+    chunks = StructuralChunker(max_tokens=60, overlap_tokens=20).split_documents([document])
+
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.metadata["start_index"] < previous.metadata["start_index"] + len(previous.page_content)
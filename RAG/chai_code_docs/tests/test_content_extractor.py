@@ -0,0 +1,90 @@
+from bs4 import BeautifulSoup
+from content_extractor import ContentExtractor
+
+PAGE = """
+<html><body>
+  <header class="site-header"><a href="/">ChaiCode Docs</a></header>
+  <nav class="sidebar"><ul><li>Git</li><li>Docker</li></ul></nav>
+  <h1>Getting started with Git</h1>
+  <main>
+    <div class="sl-markdown-content">
+      <h2 id="install">Install</h2>
+      <p>Install Git with your   package manager, then run <code>git --version</code>.</p>
+      <div class="expressive-code">
+        <pre data-language="bash"><code><div class="ec-line">sudo apt install git</div><div class="ec-line">  git --version</div></code></pre>
+      </div>
+      <ul>
+        <li>Configure your name</li>
+        <li>Configure your email<ul><li>Use a verified address</li></ul></li>
+      </ul>
+      <table>
+        <tr><th>Command</th><th>Effect</th></tr>
+        <tr><td>git init</td><td>Create a repository</td></tr>
+      </table>
+      <div class="pagination-links"><a>Next</a></div>
+      <script>track()</script>
+    </div>
+  </main>
+  <footer>Copyright</footer>
+</body></html>
+"""
+
+def extract(html):
+    return ContentExtractor().extract(BeautifulSoup(html, "html.parser"))
+
+def test_extracts_the_article_as_markdown():
+    assert extract(PAGE) == "\n".join([
+        "# Getting started with Git",
+        "",
+        "## Install",
+        "",
+        "Install Git with your package manager, then run `git --version`.",
+        "",
+        "```bash",
+        "sudo apt install git",
+        "  git --version",
+        "```",
+        "",
+        "- Configure your name",
+        "- Configure your email",
+        "  - Use a verified address",
+        "",
+        "Command | Effect",
+        "git init | Create a repository",
+    ])
+
+def test_page_chrome_is_dropped():
+    text = extract(PAGE)
+
+    for chrome in ("ChaiCode Docs", "Docker", "Next", "track()", "Copyright"):
+        assert chrome not in text
+
+def test_code_keeps_blank_lines_and_indentation():
+    html = '<article><pre class="language-python"><code>def main():\n\n    return 1\n</code></pre></article>'
+
+    assert extract(html) == "```python\ndef main():\n\n    return 1\n```"
+
+def test_callouts_and_card_headers_in_the_article_are_kept():
+    html = """
+    <main>
+      <p>Branches are cheap.</p>
+      <aside class="starlight-aside starlight-aside--tip"><p class="starlight-aside__title">Tip</p><p>Delete merged branches.</p></aside>
+      <div class="card"><div class="card-header">Rebase</div><p>Rewrites history.</p></div>
+      <aside class="related">See also: merging</aside>
+    </main>
+    """
+
+    assert extract(html) == "\n".join([
+        "Branches are cheap.",
+        "",
+        "Tip",
+        "",
+        "Delete merged branches.",
+        "",
+        "Rebase",
+        "",
+        "Rewrites history.",
+    ])
+
+def test_falls_back_to_the_body():
+    assert extract("<html><body><p>Just a paragraph.</p><aside>Related</aside></body></html>") == "Just a paragraph."
@@ -0,0 +1,59 @@
+import asyncio
+from langchain_core.documents import Document
+from context_compressor import ContextCompressor, split_sentences
+
+CODE = "```python\ndef activate():\n    return 'venv'\n```"
+
+def test_code_blocks_are_single_pieces_with_their_indentation():
+    text = f"Create a venv first. Then activate it.\n{CODE}\n  - indented item"
+
+    pieces = [piece for _, piece in split_sentences(text)]
+
+    assert pieces == ["Create a venv first.", "Then activate it.", CODE, "  - indented item"]
+
+def test_code_block_is_kept_whole(embeddings):
+    chunk = Document(page_content=f"Docker builds images.\n{CODE}\nGit has branches.", metadata={"source": "a"})
+
+    [compressed] = ContextCompressor(embeddings, sentences_per_chunk=1).compress(CODE, [chunk])
+
+    assert compressed.page_content == CODE
+    assert compressed.metadata == {"source": "a"}
+
+def test_code_block_is_dropped_whole(embeddings):
+    chunk = Document(page_content=f"Docker builds images.\n{CODE}\nGit has branches.")
+
+    [compressed] = ContextCompressor(embeddings, sentences_per_chunk=1).compress("Git has branches.", [chunk])
+
+    assert compressed.page_content == "Git has branches."
+
+def test_kept_sentences_stay_in_order_with_gaps(embeddings):
+    chunk = Document(page_content="Git has branches. Docker builds images. Postgres has indexes. Python has venvs.")
+
+    [compressed] = ContextCompressor(embeddings, sentences_per_chunk=2).compress("Python has venvs. Git has branches.", [chunk])
+
+    assert compressed.page_content == "Git has branches. ... Python has venvs."
+
+def test_adjacent_lines_keep_their_line_breaks(embeddings):
+    chunk = Document(page_content="Docker builds images.\n$ git switch -c feature\n    git push\nPostgres has indexes.")
+
+    [compressed] = ContextCompressor(embeddings, sentences_per_chunk=2).compress("$ git switch -c feature git push", [chunk])
+
+    assert compressed.page_content == "$ git switch -c feature\n    git push"
+
+def test_sync_and_async_embed_in_one_call(embeddings):
+    compressor = ContextCompressor(embeddings, sentences_per_chunk=1)
+    chunks = [Document(page_content="Git has branches. Docker builds images.")]
+    calls = embeddings.calls
+
+    compressed = compressor.compress("docker", chunks)
+    assert embeddings.calls == calls + 1
+
+    assert asyncio.run(compressor.acompress("docker", chunks)) == compressed
+    assert embeddings.calls == calls + 2
+
+def test_short_chunks_are_not_embedded(embeddings):
+    chunks = [Document(page_content="Only one sentence.")]
+    calls = embeddings.calls
+
+    assert ContextCompressor(embeddings, sentences_per_chunk=2).compress("query", chunks) == chunks
+    assert embeddings.calls == calls
@@ -0,0 +1,47 @@
+from langchain_core.documents import Document
+from context_packer import ContextPacker, compact_text
+from tokenizer import count_tokens
+
+def chunk(text, score=None, source="docs://page", point_id=None):
+    metadata = {"source": source}
+    if score is not None:
+        metadata["_score"] = score
+    if point_id is not None:
+        metadata["_id"] = point_id
+    return Document(page_content=text, metadata=metadata)
+
+def test_chunks_are_ordered_by_score_and_deduplicated():
+    packer = ContextPacker(max_tokens=1000)
+    chunks = [
+        chunk("low scoring text", 0.1, point_id="a"),
+        chunk("high scoring text", 0.9, point_id="b"),
+        chunk("high scoring text", 0.8, point_id="c"),
+        chunk("unscored text"),
+        chunk("low scoring text again", 0.5, point_id="a"),
+    ]
+
+    blocks = [block for _, block in packer.select(chunks)]
+
+    assert blocks == [
+        "[1] docs://page\nhigh scoring text",
+        "[2] docs://page\nlow scoring text again",
+        "[3] docs://page\nunscored text",
+    ]
+
+def test_context_stays_within_the_token_budget():
+    packer = ContextPacker(max_tokens=60)
+    chunks = [chunk(f"sentence number {i} " * 10, 1.0 - i / 100, point_id=str(i)) for i in range(20)]
+
+    context = packer.pack(chunks)
+
+    assert 0 < count_tokens(context) <= 60
+    assert context.startswith("[1] docs://page\nsentence number 0")
+
+def test_oversized_best_chunk_is_truncated_rather_than_dropped():
+    context = ContextPacker(max_tokens=20).pack([chunk("word " * 500, 0.9)])
+
+    assert context.startswith("[1] docs://page\nword")
+    assert count_tokens(context) <= 21
+
+def test_compact_text_keeps_code_indentation():
+    assert compact_text("def f():\n    return 1   \n\n\n\nx = f()\n") == "def f():\n    return 1\n\nx = f()"
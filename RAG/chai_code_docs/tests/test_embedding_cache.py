@@ -0,0 +1,90 @@
+import asyncio
+from benchmark import HashingEmbeddings
+from embedding_cache import CachedEmbeddings
+from sqlite_cache import SQLiteCache
+
+def make_cache(tmp_path, **kwargs):
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+def test_documents_are_embedded_once(tmp_path):
+    model = HashingEmbeddings()
+    cached = CachedEmbeddings(model, "hashing", make_cache(tmp_path))
+
+    first = cached.embed_documents(["alpha beta", "gamma", "alpha beta"])
+    second = cached.embed_documents(["gamma", "alpha   beta"])
+
+    # Duplicates within a batch and whitespace variants share one entry
+    assert model.texts == 2
+    assert second[0] == first[1]
+    assert second[1] == first[0]
+    assert cached.stats()["entries"] == 2
+
+def test_cache_persists_across_instances(tmp_path):
+    CachedEmbeddings(HashingEmbeddings(), "hashing", make_cache(tmp_path)).embed_documents(["alpha"])
+
+    model = HashingEmbeddings()
+    CachedEmbeddings(model, "hashing", make_cache(tmp_path)).embed_documents(["alpha"])
+    assert model.calls == 0
+
+def test_queries_and_documents_do_not_share_entries(tmp_path):
+    model = HashingEmbeddings()
+    cached = CachedEmbeddings(model, "hashing", make_cache(tmp_path))
+
+    cached.embed_documents(["alpha"])
+    cached.embed_query("alpha")
+    cached.embed_query("alpha")
+    asyncio.run(cached.aembed_queries(["alpha"]))
+
+    assert model.texts == 2
+    assert cached.hits == 2
+    assert cached.misses == 2
+
+def test_models_do_not_share_entries(tmp_path):
+    cache = make_cache(tmp_path)
+    CachedEmbeddings(HashingEmbeddings(), "model-a", cache).embed_documents(["alpha"])
+
+    model = HashingEmbeddings()
+    CachedEmbeddings(model, "model-b", cache).embed_documents(["alpha"])
+    assert model.texts == 1
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]) == {"a": b"1", "c": b"3"}
+
+def test_sqlite_cache_evicts_by_size(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.set("a", b"x" * 6)
+    cache.set("b", b"y" * 6)
+
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 1, "bytes": 6}
+
+def test_sqlite_cache_totals_track_every_write(tmp_path):
+    cache = make_cache(tmp_path, max_entries=3)
+    cache.set_many({"a": b"1", "b": b"22", "c": b"333"})
+    cache.set("b", b"22222")
+    cache.delete("c")
+    cache.set_many({"d": b"4", "e": b"5"})
+
+    count, total = cache._conn.execute("SELECT COUNT(*), SUM(size) FROM entries").fetchone()
+    assert cache.stats() == {"entries": count, "bytes": total} == {"entries": 3, "bytes": 7}
+
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "bytes": 0}
+
+def test_sqlite_cache_counts_entries_written_before_totals_existed(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path)
+    cache.set_many({"a": b"1", "b": b"22"})
+    cache._conn.executescript(
+        "DROP TRIGGER entries_insert; DROP TRIGGER entries_delete; DROP TRIGGER entries_resize; DROP TABLE totals;"
+    )
+    cache.close()
+
+    assert SQLiteCache(path).stats() == {"entries": 2, "bytes": 3}
@@ -0,0 +1,107 @@
+import asyncio
+import time
+import pytest
+from config import Config
+
+SLOW = 1.5
+
+@pytest.fixture
+def methods(rag_system, monkeypatch):
+    monkeypatch.setattr(Config, "SEARCH_TIMEOUT", 0.2)
+    return rag_system.retrieval_methods
+
+def slow_for(manager, monkeypatch, predicate, delay=SLOW):
+    """Make searches whose query list matches predicate take delay seconds (longer than the timeout)."""
+    search = manager.search_many_with_score
+    asearch = manager.asearch_many_with_score
+
+    def slow_search(queries, *args, **kwargs):
+        if predicate(queries):
+            time.sleep(delay)
+        return search(queries, *args, **kwargs)
+
+    async def slow_asearch(queries, *args, **kwargs):
+        if predicate(queries):
+            await asyncio.sleep(delay)
+        return await asearch(queries, *args, **kwargs)
+
+    monkeypatch.setattr(manager, "search_many_with_score", slow_search)
+    monkeypatch.setattr(manager, "asearch_many_with_score", slow_asearch)
+
+QUERIES = ["docker build", "git switch", "python venv"]
+
+def test_slow_batched_search_falls_back_to_per_query_searches(methods, monkeypatch):
+    slow_for(methods.vector_store, monkeypatch, lambda queries: len(queries) > 1)
+
+    start = time.perf_counter()
+    results = methods._fan_out_search(QUERIES)
+
+    assert time.perf_counter() - start < SLOW
+    assert all(results)
+
+@pytest.mark.parametrize("fan_out", ["_fan_out_search", "_afan_out_search"])
+def test_fan_out_has_one_overall_deadline(methods, monkeypatch, fan_out):
+    # The batched search and one sub-query are both slow
+    slow_for(methods.vector_store, monkeypatch, lambda queries: len(queries) > 1 or queries == ["git switch"])
+    budget = methods._fan_out_budget(QUERIES)
+
+    start = time.perf_counter()
+    results = getattr(methods, fan_out)(QUERIES)
+    if asyncio.iscoroutine(results):
+        results = asyncio.run(results)
+
+    assert time.perf_counter() - start < budget + 0.1
+    assert results[1] == []
+    assert results[0] and results[2]
+
+def test_late_batched_result_is_still_used(methods, monkeypatch):
+    budget = methods._fan_out_budget(QUERIES)
+    slow_for(methods.vector_store, monkeypatch, lambda queries: len(queries) > 1, delay=budget * 0.7)
+    slow_for(methods.vector_store, monkeypatch, lambda queries: len(queries) == 1)
+
+    start = time.perf_counter()
+    results = methods._fan_out_search(QUERIES)
+
+    assert time.perf_counter() - start < budget
+    assert all(results)
+
+def test_slow_sub_query_yields_an_empty_list(methods, monkeypatch):
+    monkeypatch.setattr(Config, "BATCHED_SEARCH", False)
+    slow_for(methods.vector_store, monkeypatch, lambda queries: queries == ["git switch"])
+
+    start = time.perf_counter()
+    results = methods._fan_out_search(QUERIES)
+
+    assert time.perf_counter() - start < SLOW
+    assert results[1] == []
+    assert results[0] and results[2]
+
+def test_async_fan_out_has_the_same_timeouts(methods, monkeypatch):
+    monkeypatch.setattr(Config, "BATCHED_SEARCH", False)
+    slow_for(methods.vector_store, monkeypatch, lambda queries: queries == ["git switch"])
+
+    start = time.perf_counter()
+    results = asyncio.run(methods._afan_out_search(QUERIES))
+
+    assert time.perf_counter() - start < SLOW
+    assert results[1] == []
+    assert results[0] and results[2]
+
+def test_sync_and_async_methods_agree(methods):
+    queries = ["docker containers", "docker images"]
+    for method, amethod in (
+        (methods.method_1_parallel_query, methods.amethod_1_parallel_query),
+        (methods.method_2_rank_fusion, methods.amethod_2_rank_fusion),
+    ):
+        sync_ids = [doc.metadata["_id"] for doc in method(queries)]
+        assert sync_ids == [doc.metadata["_id"] for doc in asyncio.run(amethod(queries))]
+
+def test_speculative_hyde_survives_a_slow_search(methods, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATIVE_HYDE", True)
+    slow_for(methods.vector_store, monkeypatch, lambda queries: queries == ["docker"])
+
+    start = time.perf_counter()
+    documents = methods.method_4_hypothetical_document_embedding("docker")
+
+    assert time.perf_counter() - start < SLOW
+    assert documents
@@ -0,0 +1,62 @@
+import pytest
+from langchain_core.documents import Document
+from config import Config
+from fusion import chunk_key, fuse, reciprocal_rank_fusion, unique_documents
+
+def doc(point_id, text=None):
+    return Document(page_content=text or f"text of {point_id}", metadata={"_id": point_id})
+
+def ids(scored):
+    return [chunk_key(document) for document, _ in scored]
+
+def test_unique_documents_keeps_first_seen_order_and_best_score():
+    a, b, c = doc("a"), doc("b"), doc("c")
+    fused = unique_documents([[(a, 0.5), (b, 0.4)], [(c, 0.9), (doc("a"), 0.8)]])
+
+    assert ids(fused) == ["a", "b", "c"]
+    assert fused[0][1] == 0.8
+
+def test_rrf_rewards_chunks_found_by_several_queries():
+    fused = reciprocal_rank_fusion([
+        [(doc("a"), 0.9), (doc("b"), 0.8)],
+        [(doc("b"), 0.7), (doc("c"), 0.6)],
+    ])
+
+    assert ids(fused) == ["b", "a", "c"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 60)
+
+def test_chunks_without_ids_are_keyed_by_content():
+    assert chunk_key(Document(page_content="same")) == chunk_key(Document(page_content="same"))
+    assert len(unique_documents([[(Document(page_content="same"), 1.0)], [(Document(page_content="same"), 0.5)]])) == 1
+
+@pytest.mark.parametrize("method", ["combsum", "combmnz", "weighted"])
+def test_score_fusion_methods_rank_shared_chunks_first(method):
+    fused = fuse([[(doc("a"), 0.9), (doc("b"), 0.8), (doc("d"), 0.1)], [(doc("b"), 0.9), (doc("c"), 0.1)]], method)
+    assert ids(fused)[0] == "b"
+
+def test_invalid_fusion_input_is_rejected():
+    with pytest.raises(ValueError):
+        fuse([], "borda")
+    with pytest.raises(ValueError):
+        reciprocal_rank_fusion([[(doc("a"), 1.0)]], weights=[1.0, 2.0])
+
+def test_scores_are_recorded_on_copies(rag_system):
+    methods = rag_system.retrieval_methods
+    shared = doc("a")
+    results = [[(shared, 0.9)], [(shared, 0.8)]]
+
+    rrf = methods._fused(results, "rrf")
+    unique = methods._fused(results, "unique")
+
+    assert "_score" not in shared.metadata
+    assert rrf[0].metadata["_score"] == pytest.approx(2 / 60)
+    assert unique[0].metadata["_score"] == 0.9
+
+def test_relevance_threshold_applies_to_similarity_before_fusion(rag_system, monkeypatch):
+    monkeypatch.setattr(Config, "MIN_RELEVANCE_SCORE", 0.5)
+    methods = rag_system.retrieval_methods
+    results = [[(doc("a"), 0.9), (doc("b"), 0.2)], [(doc("a"), 0.7)]]
+
+    # RRF scores are ~0.03, far below the cosine threshold, yet the relevant chunk is kept
+    assert [chunk_key(d) for d in methods._fused(results, "rrf")] == ["a"]
+    assert [chunk_key(d) for d in methods._fused(results, "unique")] == ["a"]
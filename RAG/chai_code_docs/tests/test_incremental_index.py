@@ -0,0 +1,66 @@
+from langchain_core.documents import Document
+from config import Config
+from index_manifest import IndexManifest, chunk_id
+
+def page(source, *paragraphs):
+    return Document(page_content="\n\n".join(paragraphs), metadata={"source": source})
+
+def indexed_text(manager):
+    return {doc.page_content for doc in manager.vector_store.similarity_search("chunk", k=100)}
+
+def test_chunk_ids_are_deterministic():
+    assert chunk_id("a", 0, "text") == chunk_id("a", 0, "text")
+    assert len({chunk_id("a", 0, "text"), chunk_id("b", 0, "text"), chunk_id("a", 1, "text"), chunk_id("a", 0, "other")}) == 4
+
+def test_reindexing_unchanged_pages_uploads_nothing(manager, embeddings):
+    docs = [page("p1", "first chunk text"), page("p2", "second chunk text")]
+    assert manager.index_documents(docs)["uploaded"] == 2
+
+    embedded = embeddings.texts
+    result = manager.index_documents(docs)
+
+    assert result == {"uploaded": 0, "unchanged": 2, "deleted": 0}
+    assert embeddings.texts == embedded
+
+def test_changed_page_replaces_its_chunks(manager):
+    manager.index_documents([page("p1", "old chunk text"), page("p2", "other chunk text")])
+    version = manager.manifest.version
+
+    result = manager.index_documents([page("p1", "new chunk text")])
+
+    assert result == {"uploaded": 1, "unchanged": 0, "deleted": 1}
+    assert indexed_text(manager) == {"new chunk text", "other chunk text"}
+    assert manager.manifest.version == version + 1
+    assert IndexManifest(Config.INDEX_MANIFEST_PATH).chunk_ids("p1") == manager.manifest.chunk_ids("p1")
+
+def test_full_refresh_removes_missing_sources(manager):
+    manager.index_documents([page("p1", "first chunk text"), page("p2", "second chunk text")])
+
+    result = manager.index_documents([page("p1", "first chunk text")], remove_missing_sources=True)
+
+    assert result["deleted"] == 1
+    assert "p2" not in manager.manifest.sources
+    assert indexed_text(manager) == {"first chunk text"}
+
+def test_failed_upload_keeps_the_old_chunks(manager, monkeypatch):
+    manager.index_documents([page("p1", "old chunk text")])
+    old_ids = manager.manifest.chunk_ids("p1")
+    monkeypatch.setattr(manager, "upsert_embeddings_with_retry", lambda *args, **kwargs: False)
+
+    result = manager.index_documents([page("p1", "new chunk text")])
+
+    assert result["deleted"] == 0
+    assert manager.manifest.chunk_ids("p1") == old_ids
+    assert indexed_text(manager) == {"old chunk text"}
+
+def test_failed_delete_is_retried_next_run(manager, monkeypatch):
+    manager.index_documents([page("p1", "old chunk text")])
+    delete_with_retry = manager.delete_with_retry
+    monkeypatch.setattr(manager, "delete_with_retry", lambda ids: False)
+    manager.index_documents([page("p1", "new chunk text")])
+    assert len(manager.manifest.chunk_ids("p1")) == 2
+
+    monkeypatch.setattr(manager, "delete_with_retry", delete_with_retry)
+    result = manager.index_documents([page("p1", "new chunk text")])
+    assert result["deleted"] == 1
+    assert indexed_text(manager) == {"new chunk text"}
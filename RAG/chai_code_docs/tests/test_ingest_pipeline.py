@@ -0,0 +1,125 @@
+import threading
+import pytest
+from config import Config
+from data_loader import DataLoader
+from ingest_pipeline import StreamingIngestPipeline
+from web_fetcher import FetchResult
+
+class StaticFetcher:
+    """Serves pages from a dict of url -> HTML body; missing URLs fail to load."""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+
+    async def aiter_fetch(self, urls):
+        for url in urls:
+            if url in self.pages:
+                yield FetchResult(url, 200, self.pages[url].encode("utf-8"))
+            else:
+                yield FetchResult(url, error="HTTP 503")
+
+def html(text):
+    return f"<html><body><article><h1>Page</h1><p>{text}</p></article></body></html>"
+
+PAGES = {f"docs://page/{n}": html(f"Page {n} explains topic {n} in detail.") for n in range(5)}
+
+def run_pipeline(manager, pages, urls=None, timeout=30):
+    """Run an ingest on a worker thread and fail the test if it does not finish in time."""
+    pipeline = StreamingIngestPipeline(manager, DataLoader(fetcher=StaticFetcher(pages)))
+    outcome = {}
+
+    def target():
+        try:
+            outcome["stats"] = pipeline.run(list(urls or pages))
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "ingest did not finish"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["stats"]
+
+@pytest.fixture(autouse=True)
+def fast_batches(monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_BATCH_WAIT", 0.01)
+
+def test_pages_are_indexed_incrementally(manager):
+    stats = run_pipeline(manager, PAGES)
+    assert stats["pages"] == 5 and stats["uploaded"] == stats["chunks"] > 0
+    ids = manager.manifest.chunk_ids("docs://page/2")
+
+    changed = {**PAGES, "docs://page/2": html("Page 2 was rewritten.")}
+    stats = run_pipeline(manager, changed)
+
+    assert stats["unchanged"] == stats["chunks"] - stats["uploaded"]
+    assert stats["deleted"] == len(ids)
+    assert manager.manifest.chunk_ids("docs://page/2").isdisjoint(ids)
+    [results] = manager.search_many(["Page 2 was rewritten."], k=1)
+    assert "rewritten" in results[0].page_content
+
+def test_failed_pages_keep_their_chunks(manager):
+    run_pipeline(manager, PAGES)
+    ids = manager.manifest.chunk_ids("docs://page/1")
+
+    stats = run_pipeline(manager, {}, urls=["docs://page/1"])
+
+    assert stats["failed_pages"] == 1
+    assert manager.manifest.chunk_ids("docs://page/1") == ids
+
+def test_stale_chunks_are_kept_until_the_new_ones_are_uploaded(manager, monkeypatch):
+    run_pipeline(manager, PAGES)
+    ids = manager.manifest.chunk_ids("docs://page/3")
+    monkeypatch.setattr(manager, "upsert_embeddings_with_retry", lambda documents, vectors, ids: False)
+
+    stats = run_pipeline(manager, {**PAGES, "docs://page/3": html("Page 3 was rewritten.")})
+
+    assert stats["deleted"] == 0
+    assert manager.manifest.chunk_ids("docs://page/3") == ids
+    [results] = manager.search_many(["Page 3 explains topic 3 in detail."], k=1)
+    assert results[0].metadata["source"] == "docs://page/3"
+
+def test_embedding_failure_raises_instead_of_hanging(manager, monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_PAGE_QUEUE_SIZE", 1)
+    monkeypatch.setattr(Config, "INGEST_CHUNK_QUEUE_SIZE", 1)
+    monkeypatch.setattr(Config, "EMBED_CONCURRENCY", 1)
+    pages = {f"docs://many/{n}": html(f"Page {n} about topic {n}.") for n in range(50)}
+
+    def fail(documents):
+        raise RuntimeError("embedding quota exhausted")
+
+    monkeypatch.setattr(manager, "embed_batch_with_retry", fail)
+
+    with pytest.raises(RuntimeError, match="quota"):
+        run_pipeline(manager, pages, timeout=10)
+
+def test_chunking_failure_raises_instead_of_hanging(manager, monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_PAGE_QUEUE_SIZE", 1)
+    pages = {f"docs://many/{n}": html(f"Page {n} about topic {n}.") for n in range(50)}
+
+    def fail(source):
+        raise RuntimeError("manifest unavailable")
+
+    monkeypatch.setattr(manager.manifest, "chunk_ids", fail)
+
+    with pytest.raises(RuntimeError, match="manifest"):
+        run_pipeline(manager, pages, timeout=10)
+
+def test_a_failed_run_still_bumps_the_version_of_what_it_indexed(manager, monkeypatch):
+    version = manager.manifest.version
+    chunk_ids = manager.manifest.chunk_ids
+
+    def fail_on_last_page(source):
+        if source == "docs://page/4":
+            raise RuntimeError("manifest unavailable")
+        return chunk_ids(source)
+
+    monkeypatch.setattr(manager.manifest, "chunk_ids", fail_on_last_page)
+
+    with pytest.raises(RuntimeError, match="manifest"):
+        run_pipeline(manager, PAGES)
+
+    assert manager.manifest.chunk_ids("docs://page/0")
+    assert manager.manifest.version > version
@@ -0,0 +1,54 @@
+import pytest
+from config import Config
+from llm_cache import LLMResponseCache, normalize_query
+from sqlite_cache import SQLiteCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(SQLiteCache(str(tmp_path / "llm.sqlite3")), ttl=60, model="model", temperature=0.3)
+
+def test_trivial_variants_normalize_together():
+    assert normalize_query("  What is   Docker?") == normalize_query("what is docker")
+    assert normalize_query("what is docker!!") == normalize_query("What is Docker.")
+
+@pytest.mark.parametrize("a, b", [
+    ("what is C++", "what is C"),
+    ("what is C#", "what is C"),
+    ("what is C++?", "what is C#?"),
+    ("explain -- flags", "explain flags"),
+])
+def test_symbols_keep_questions_apart(a, b):
+    assert normalize_query(a) != normalize_query(b)
+
+def test_c_family_questions_do_not_share_cached_outputs(cache):
+    cache.set("hyde", "1", "what is C?", "C is a procedural language")
+    cache.set("hyde", "1", "what is C++?", "C++ adds classes to C")
+
+    assert cache.get("hyde", "1", "What is C") == "C is a procedural language"
+    assert cache.get("hyde", "1", "what is c++") == "C++ adds classes to C"
+    assert cache.get("hyde", "1", "what is C#?") is None
+
+def test_entries_are_keyed_by_kind_prompt_version_and_model(cache):
+    cache.set("plan", "1", "docker", ["a"])
+
+    assert cache.get("plan", "2", "docker") is None
+    assert cache.get("hyde", "1", "docker") is None
+    other_model = LLMResponseCache(cache.cache, model="other", temperature=0.3)
+    assert other_model.get("plan", "1", "docker") is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+def test_expired_entries_are_misses(cache):
+    cache.ttl = -1
+    cache.set("plan", "1", "docker", ["a"])
+    assert cache.get("plan", "1", "docker") is None
+
+def test_query_improver_reuses_cached_queries(llm, monkeypatch):
+    from query_improvement import QueryImprover
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    improver = QueryImprover(llm)
+
+    first = improver.improve_query("what is C++")
+    calls = llm.calls
+    assert improver.improve_query("What is C++?") == first
+    assert llm.calls == calls
+    assert improver.improve_query("what is C") != first
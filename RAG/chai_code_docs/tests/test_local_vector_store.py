@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from local_vector_store import LocalVectorStore
+
+def random_store(embeddings, mode, count=300, dim=32, path=None, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    store = LocalVectorStore(embedding=embeddings, path=path, mode=mode, m=8, ef_construction=64, ef_search=64)
+    documents = [Document(page_content=f"doc {i}", metadata={"row": i}) for i in range(count)]
+    store.add_embeddings([f"id-{i}" for i in range(count)], vectors.tolist(), documents)
+    return store, rng
+
+def test_exact_search_returns_nearest_first(embeddings):
+    store = LocalVectorStore.from_texts(
+        ["python virtual environments", "docker containers", "git branches"], embedding=embeddings
+    )
+
+    results = store.similarity_search_with_score("docker containers", k=2)
+
+    assert results[0][0].page_content == "docker containers"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert results[0][1] >= results[1][1]
+
+def test_upsert_replaces_and_delete_hides(embeddings):
+    store = LocalVectorStore(embedding=embeddings)
+    store.add_texts(["old text"], ids=["a"])
+    store.add_texts(["new text"], ids=["a"])
+    store.add_texts(["other text"], ids=["b"])
+    assert len(store) == 2
+    assert store.get_by_ids(["a"])[0].page_content == "new text"
+
+    store.delete(["a"])
+
+    assert [doc.page_content for doc in store.similarity_search("new text", k=5)] == ["other text"]
+
+@pytest.mark.parametrize("mode", ["exact", "hnsw"])
+def test_index_survives_a_restart(embeddings, tmp_path, mode):
+    path = str(tmp_path / "index")
+    store, rng = random_store(embeddings, mode, count=50, path=path)
+    store.delete(["id-3"])
+    store.save()
+    query = rng.normal(size=32).tolist()
+
+    reopened = LocalVectorStore(embedding=embeddings, path=path, mode=mode, m=8)
+
+    assert len(reopened) == 49
+    assert reopened.get_by_ids(["id-3"]) == []
+    expected = [doc.metadata["_id"] for doc in store.similarity_search_by_vector(query, k=5)]
+    assert [doc.metadata["_id"] for doc in reopened.similarity_search_by_vector(query, k=5)] == expected
+
+def test_hnsw_recall_matches_exact_search(embeddings):
+    exact, rng = random_store(embeddings, "exact")
+    hnsw, _ = random_store(embeddings, "hnsw")
+
+    found = 0
+    queries = rng.normal(size=(30, 32)).tolist()
+    for query in queries:
+        expected = {doc.metadata["_id"] for doc in exact.similarity_search_by_vector(query, k=10)}
+        found += len(expected & {doc.metadata["_id"] for doc in hnsw.similarity_search_by_vector(query, k=10)})
+
+    assert found / (10 * len(queries)) >= 0.9
+
+def test_batched_search_matches_single_queries(embeddings):
+    store, rng = random_store(embeddings, "exact")
+    store.delete(["id-0", "id-1"])
+    queries = rng.normal(size=(4, 32)).tolist()
+
+    batched = store.similarity_search_with_score_by_vectors(queries, k=5)
+
+    for query, results in zip(queries, batched):
+        single = store.similarity_search_with_score_by_vector(query, k=5)
+        assert [doc.metadata["_id"] for doc, _ in results] == [doc.metadata["_id"] for doc, _ in single]
+        assert [score for _, score in results] == pytest.approx([score for _, score in single], abs=1e-5)
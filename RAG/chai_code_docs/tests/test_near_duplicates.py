@@ -0,0 +1,62 @@
+import random
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from near_duplicates import NearDuplicateFilter, jaccard, lsh_bands, shingles
+
+WORDS = "install configure container image branch commit index query server client module option".split()
+
+def paragraph(seed, length=120):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(length))
+
+def chunk(text, source, start_index=0):
+    return Document(page_content=text, metadata={"source": source, "start_index": start_index})
+
+def test_near_duplicates_are_folded_into_the_first_chunk():
+    text = paragraph(1)
+    # The same footer with one word changed, as on two pages of a docs site
+    edited = text.replace(text.split()[60], "changed", 1)
+    chunks = [chunk(text, "docs://a", 0), chunk(paragraph(2), "docs://a", 900), chunk(edited, "docs://b", 40)]
+
+    kept = NearDuplicateFilter(threshold=0.8).filter(chunks)
+
+    assert [doc.page_content for doc in kept] == [text, paragraph(2)]
+    assert kept[0].metadata["duplicates"] == [{"source": "docs://b", "start_index": 40}]
+    assert "duplicates" not in kept[1].metadata
+    assert "duplicates" not in chunks[0].metadata
+
+def test_distinct_chunks_are_all_kept():
+    chunks = [chunk(paragraph(seed), f"docs://{seed}") for seed in range(30)]
+
+    assert len(NearDuplicateFilter().filter(chunks)) == 30
+
+def test_minhash_agreement_estimates_jaccard():
+    duplicates = NearDuplicateFilter(num_perm=256, shingle_size=3)
+    a = shingles(paragraph(3), 3)
+    b = shingles(" ".join(paragraph(3).split()[:90] + paragraph(4).split()[:30]), 3)
+
+    agreement = np.mean(duplicates.signature(a) == duplicates.signature(b))
+
+    assert agreement == pytest.approx(jaccard(a, b), abs=0.1)
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.85, 0.95])
+def test_lsh_bands_put_the_candidate_curve_below_the_threshold(threshold):
+    bands = lsh_bands(128, threshold)
+    rows = 128 // bands
+
+    assert 128 % bands == 0
+    assert (1 / bands) ** (1 / rows) <= threshold
+
+def test_indexing_skips_duplicate_pages(manager):
+    text = paragraph(5)
+
+    manager.index_documents([
+        Document(page_content=text, metadata={"source": "docs://mirror-1"}),
+        Document(page_content=text, metadata={"source": "docs://mirror-2"}),
+    ])
+
+    assert set(manager.manifest.sources) == {"docs://mirror-1"}
+    [results] = manager.search_many([text], k=5)
+    assert {doc.metadata["source"] for doc in results} == {"docs://mirror-1"}
+    assert all(doc.metadata["duplicates"][0]["source"] == "docs://mirror-2" for doc in results)
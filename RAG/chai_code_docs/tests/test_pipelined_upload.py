@@ -0,0 +1,62 @@
+import threading
+from langchain_core.documents import Document
+from config import Config
+
+def make_chunks(count):
+    chunks = [Document(page_content=f"chunk number {i}", metadata={"source": "s", "start_index": i}) for i in range(count)]
+    return chunks, [f"id-{i}" for i in range(count)]
+
+def run_with_timeout(target, timeout=30):
+    """Run target on a thread and fail instead of hanging the suite if it deadlocks."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=target()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "upload deadlocked"
+    return result["value"]
+
+def test_pipelined_upload_uploads_every_chunk(manager, monkeypatch):
+    monkeypatch.setattr(Config, "BATCH_SIZE", 3)
+    chunks, ids = make_chunks(40)
+
+    uploaded = run_with_timeout(lambda: manager.upload_chunks_pipelined(chunks, ids))
+
+    assert sorted(uploaded) == sorted(ids)
+    assert len(manager.vector_store) == 40
+
+def test_local_upsert_errors_are_retried_and_reported(manager, monkeypatch):
+    monkeypatch.setattr(Config, "BATCH_SIZE", 5)
+    monkeypatch.setattr(Config, "MAX_PENDING_UPSERTS", 1)
+    add_embeddings = manager.vector_store.add_embeddings
+
+    def flaky_add(ids, vectors, documents):
+        if "id-0" in ids:
+            raise RuntimeError("disk full")
+        return add_embeddings(ids, vectors, documents)
+
+    monkeypatch.setattr(manager.vector_store, "add_embeddings", flaky_add)
+    chunks, ids = make_chunks(30)
+
+    uploaded = run_with_timeout(lambda: manager.upload_chunks_pipelined(chunks, ids))
+
+    assert "id-0" not in uploaded
+    assert len(uploaded) == 30 - 5
+
+def test_upsert_worker_survives_unexpected_errors(manager, monkeypatch):
+    monkeypatch.setattr(Config, "BATCH_SIZE", 2)
+    monkeypatch.setattr(Config, "MAX_PENDING_UPSERTS", 1)
+    monkeypatch.setattr(Config, "EMBED_CONCURRENCY", 1)
+    upsert = manager.upsert_embeddings_with_retry
+
+    def broken_upsert(batch, vectors, ids, **kwargs):
+        if "id-0" in ids:
+            raise ValueError("bad payload")
+        return upsert(batch, vectors, ids, **kwargs)
+
+    monkeypatch.setattr(manager, "upsert_embeddings_with_retry", broken_upsert)
+    chunks, ids = make_chunks(40)
+
+    uploaded = run_with_timeout(lambda: manager.upload_chunks_pipelined(chunks, ids))
+
+    assert "id-0" not in uploaded
+    assert "id-39" in uploaded
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from config import Config
+from query_planner import QueryPlan
+
+@pytest.fixture
+def planned(rag_system, monkeypatch):
+    """Enable the planner and count the plans requested."""
+    monkeypatch.setattr(Config, "USE_QUERY_PLANNER", True)
+    planner = rag_system.query_planner
+    aplan = planner.aplan
+    plans = []
+
+    async def counted(user_query):
+        plans.append(user_query)
+        return await aplan(user_query)
+
+    monkeypatch.setattr(planner, "aplan", counted)
+    return plans
+
+@pytest.mark.parametrize("method", [1, 2, 3])
+def test_methods_1_to_3_use_one_llm_call_for_planning(rag_system, llm, planned, method):
+    calls = llm.calls
+
+    chunks = asyncio.run(rag_system._aexecute_retrieval("docker build", method))
+
+    assert chunks
+    assert planned == ["docker build"]
+    assert llm.calls == calls + 1
+
+def test_hyde_skips_the_planner_and_stays_speculative(rag_system, planned, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATIVE_HYDE", True)
+    speculative = []
+    aspeculative_hyde = rag_system.retrieval_methods._aspeculative_hyde
+
+    async def tracked(user_query):
+        speculative.append(user_query)
+        return await aspeculative_hyde(user_query)
+
+    monkeypatch.setattr(rag_system.retrieval_methods, "_aspeculative_hyde", tracked)
+
+    chunks = asyncio.run(rag_system._aexecute_retrieval("git switch", 4))
+
+    assert chunks
+    assert planned == []
+    assert speculative == ["git switch"]
+
+def test_plans_are_cached(rag_system, llm, monkeypatch):
+    from llm_cache import LLMResponseCache
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    planner = rag_system.query_planner
+    planner.cache = LLMResponseCache.from_config()
+
+    first = asyncio.run(planner.aplan("postgres index"))
+    calls = llm.calls
+
+    assert planner.plan("Postgres index?") == first
+    assert llm.calls == calls
+
+@pytest.mark.parametrize("method", [1, 2, 3])
+def test_empty_plan_falls_back_to_the_user_query(rag_system, monkeypatch, method):
+    monkeypatch.setattr(Config, "USE_QUERY_PLANNER", True)
+
+    async def empty_plan(user_query):
+        return QueryPlan(improved_queries=[], sub_queries=["  "])
+
+    monkeypatch.setattr(rag_system.query_planner, "aplan", empty_plan)
+
+    chunks = asyncio.run(rag_system._aexecute_retrieval("docker containers", method))
+
+    assert chunks[0].metadata["source"] == "docs://docker"
+
+def test_sync_methods_fall_back_to_the_user_query(rag_system):
+    plan = QueryPlan(improved_queries=[], sub_queries=[])
+    for method in (1, 2, 3):
+        chunks = rag_system.retrieval_methods.execute_method(method, "git branches", plan=plan)
+        assert chunks[0].metadata["source"] == "docs://git"
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from aiohttp import ClientPayloadError
+from aiohttp.test_utils import TestClient, TestServer
+from server import RAGServer
+
+def request(rag_system, method, path, **kwargs):
+    """Send one request to a RAGServer for rag_system and return (status, body)."""
+    async def send():
+        async with TestClient(TestServer(RAGServer(rag_system).create_app())) as client:
+            response = await client.request(method, path, **kwargs)
+            body = await (response.json() if response.content_type == "application/json" else response.text())
+            return response.status, body
+
+    return asyncio.run(send())
+
+def test_query_returns_the_answer(rag_system):
+    status, body = request(rag_system, "POST", "/query", json={"query": "docker containers", "method": 1})
+
+    assert status == 200
+    assert body["method"] == 1
+    assert body["answer"]
+
+def test_query_returns_500_when_the_pipeline_fails(rag_system, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("search backend down")
+
+    monkeypatch.setattr(rag_system.retrieval_methods, "aexecute_method", fail)
+
+    status, body = request(rag_system, "POST", "/query", json={"query": "docker containers", "method": 2})
+
+    assert status == 500
+    assert body == {"error": "search backend down", "method": 2}
+
+def test_invalid_requests_are_rejected(rag_system):
+    assert request(rag_system, "POST", "/query", data="not json")[0] == 400
+    assert request(rag_system, "GET", "/query", params={"query": "git", "method": "7"})[0] == 400
+    assert request(rag_system, "GET", "/query")[0] == 400
+
+def test_stream_returns_the_answer_text(rag_system):
+    status, body = request(rag_system, "GET", "/stream", params={"query": "git branches", "method": "1"})
+
+    assert status == 200
+    assert "git" in body.lower()
+    assert "error" not in body.lower()
+
+def test_stream_returns_500_when_the_pipeline_fails(rag_system, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("search backend down")
+
+    monkeypatch.setattr(rag_system.retrieval_methods, "aexecute_method", fail)
+
+    status, body = request(rag_system, "POST", "/stream", json={"query": "docker containers", "method": 2})
+
+    assert status == 500
+    assert body == {"error": "search backend down", "method": 2}
+
+def test_stream_is_cut_off_when_generation_fails_mid_answer(rag_system, monkeypatch):
+    async def fail_after_one_token(*args, **kwargs):
+        yield "Partial"
+        raise RuntimeError("model overloaded")
+
+    monkeypatch.setattr(rag_system.answer_generator, "astream_answer", fail_after_one_token)
+
+    with pytest.raises(ClientPayloadError):
+        request(rag_system, "GET", "/stream", params={"query": "git branches", "method": "1"})
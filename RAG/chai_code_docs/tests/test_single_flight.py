@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+from single_flight import SingleFlight
+
+def test_single_flight_shares_one_call_across_threads():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.coalesced == 3
+
+def test_identical_queries_share_one_pipeline(rag_system, llm):
+    llm.latency = 0.05
+
+    async def run_both():
+        return await asyncio.gather(
+            rag_system.aquery_with_details("How do git branches work?", 1),
+            rag_system.aquery_with_details("how do  git branches work", 1),
+        )
+
+    first, second = asyncio.run(run_both())
+
+    assert first["answer"] == second["answer"]
+    assert rag_system._inflight.coalesced == 1
+
+def test_queries_differing_in_symbols_are_not_coalesced(rag_system, llm):
+    llm.latency = 0.05
+
+    async def run_all():
+        return await asyncio.gather(*(
+            rag_system.aquery_with_details(f"What is {language}?", 1) for language in ("C", "C++", "C#")
+        ))
+
+    answers = [result["answer"] for result in asyncio.run(run_all())]
+
+    assert rag_system._inflight.coalesced == 0
+    assert "C++" in answers[1] and "C#" in answers[2]
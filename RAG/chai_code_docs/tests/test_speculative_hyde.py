@@ -0,0 +1,56 @@
+import asyncio
+import time
+import pytest
+from config import Config
+
+@pytest.fixture
+def searches(rag_system, monkeypatch):
+    """Record (seconds since the fixture started, query) for every async search."""
+    manager = rag_system.vector_store_manager
+    asearch = manager.asearch_many_with_score
+    start = time.perf_counter()
+    log = []
+
+    async def logged(queries, *args, **kwargs):
+        log.extend((time.perf_counter() - start, query) for query in queries)
+        return await asearch(queries, *args, **kwargs)
+
+    monkeypatch.setattr(manager, "asearch_many_with_score", logged)
+    monkeypatch.setattr(Config, "SPECULATIVE_HYDE", True)
+    monkeypatch.setattr(Config, "HYDE_EARLY_SEARCH_CHARS", 20)
+    return log
+
+def test_raw_query_is_searched_while_generating(rag_system, llm, searches):
+    llm.latency = 0.3
+    methods = rag_system.retrieval_methods
+
+    documents = asyncio.run(methods.amethod_4_hypothetical_document_embedding("docker build"))
+
+    assert documents
+    assert searches[0][1] == "docker build"
+    assert searches[0][0] < llm.latency
+    # Raw query, partial document and final document
+    assert len(searches) == 3
+    assert searches[2][1].startswith(searches[1][1])
+
+def test_cached_document_skips_generation(rag_system, llm, searches, monkeypatch):
+    from llm_cache import LLMResponseCache
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    methods = rag_system.retrieval_methods
+    methods.cache = LLMResponseCache.from_config()
+
+    first = asyncio.run(methods.amethod_4_hypothetical_document_embedding("git branches"))
+    calls = llm.calls
+    second = asyncio.run(methods.amethod_4_hypothetical_document_embedding("git branches"))
+
+    assert llm.calls == calls
+    assert [doc.metadata["_id"] for doc in second] == [doc.metadata["_id"] for doc in first]
+
+def test_sync_speculative_hyde_matches_async(rag_system, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATIVE_HYDE", True)
+    methods = rag_system.retrieval_methods
+
+    sync_ids = {doc.metadata["_id"] for doc in methods.method_4_hypothetical_document_embedding("postgres index")}
+    async_ids = {doc.metadata["_id"] for doc in asyncio.run(methods.amethod_4_hypothetical_document_embedding("postgres index"))}
+
+    assert sync_ids == async_ids
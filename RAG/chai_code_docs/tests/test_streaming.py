@@ -0,0 +1,27 @@
+import asyncio
+
+def test_stream_query_yields_the_answer_incrementally(rag_system):
+    tokens = list(rag_system.stream_query("docker build", 4))
+
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == rag_system.query("docker build", 4).strip()
+
+def test_async_stream_matches_sync_stream(rag_system):
+    async def collect():
+        return [token async for token in rag_system.astream_query("git switch", 2)]
+
+    assert "".join(asyncio.run(collect())) == "".join(rag_system.stream_query("git switch", 2))
+
+def test_stream_without_chunks_yields_the_no_results_message(rag_system):
+    generator = rag_system.answer_generator
+    tokens = list(generator.stream_answer("anything", []))
+
+    assert tokens == [generator._generate_no_results_response()]
+
+def test_stream_errors_are_yielded_as_text(rag_system, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(rag_system, "_aretrieve", fail)
+
+    assert "model unavailable" in "".join(rag_system.stream_query("anything", 1))
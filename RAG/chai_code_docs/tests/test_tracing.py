@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from tracing import Tracer, record, tracer
+
+def test_child_spans_inherit_labels_and_nest_in_the_trace():
+    spans = Tracer()
+
+    with spans.span("query", method=2):
+        with spans.span("retrieve"):
+            record("cache_hits", 2)
+        with spans.span("generate", model="fake"):
+            record("tokens", 10)
+            record("tokens", 5)
+
+    metrics = spans.metrics()
+    stages = {stage["stage"]: stage for stage in metrics["stages"]}
+    assert stages["retrieve"]["labels"] == {"method": "2"}
+    assert stages["generate"]["labels"] == {"method": "2", "model": "fake"}
+    assert stages["generate"]["counters"] == {"tokens": 15}
+    assert stages["retrieve"]["counters"] == {"cache_hits": 2}
+
+    [trace] = metrics["recent_traces"]
+    assert trace["name"] == "query"
+    assert [child["name"] for child in trace["children"]] == ["retrieve", "generate"]
+
+def test_errors_are_counted_and_reraised():
+    spans = Tracer()
+
+    with pytest.raises(ValueError):
+        with spans.span("generate"):
+            raise ValueError("quota exceeded")
+
+    [stage] = spans.metrics()["stages"]
+    assert stage["errors"] == 1 and stage["count"] == 1
+    assert "quota exceeded" in spans.metrics()["recent_traces"][0]["error"]
+    assert 'rag_stage_errors_total{stage="generate"} 1' in spans.prometheus_text()
+
+def test_concurrent_tasks_keep_separate_spans():
+    spans = Tracer()
+
+    async def query(method):
+        with spans.span("query", method=method):
+            await asyncio.sleep(0.01)
+            with spans.span("retrieve"):
+                await asyncio.sleep(0.01)
+
+    async def run_all():
+        await asyncio.gather(query(1), query(2))
+
+    asyncio.run(run_all())
+
+    traces = spans.metrics()["recent_traces"]
+    assert len(traces) == 2
+    for trace in traces:
+        [child] = trace["children"]
+        assert child["labels"] == trace["labels"]
+
+def test_prometheus_histogram_is_cumulative():
+    spans = Tracer()
+    spans.observe("generate", 0.02, {"tokens": 3}, method=1)
+    spans.observe("generate", 3.0, method=1)
+
+    text = spans.prometheus_text()
+
+    assert 'rag_stage_duration_seconds_bucket{stage="generate",method="1",le="0.025"} 1' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="generate",method="1",le="5.0"} 2' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="generate",method="1",le="+Inf"} 2' in text
+    assert 'rag_stage_duration_seconds_count{stage="generate",method="1"} 2' in text
+    assert 'rag_stage_tokens_total{stage="generate",method="1"} 3' in text
+
+def test_disabled_tracer_records_nothing():
+    spans = Tracer(enabled=False)
+
+    with spans.span("query") as span:
+        record("tokens", 1)
+    spans.observe("generate", 0.1)
+
+    assert span is None
+    assert spans.metrics() == {"stages": [], "recent_traces": []}
+
+def test_queries_are_traced_by_stage(rag_system):
+    tracer.reset()
+
+    asyncio.run(rag_system.aquery_with_details("docker containers", 1))
+
+    stages = {stage["stage"] for stage in tracer.metrics()["stages"]}
+    assert {"query", "retrieve"} <= stages
+    assert tracer.metrics()["recent_traces"][-1]["name"] == "query"
@@ -0,0 +1,106 @@
+import asyncio
+from collections import Counter
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from config import Config
+from sqlite_cache import SQLiteCache
+from web_fetcher import WebFetcher
+
+class StubSite:
+    """Local pages with ETags, a flaky page, a missing page and a page that is down."""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.down = False
+
+    async def page(self, request):
+        name = request.match_info["name"]
+        self.hits[name] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+
+        if name == "missing":
+            return web.Response(status=404)
+        if name == "flaky" and self.hits[name] < 3 or self.down:
+            return web.Response(status=503)
+
+        etag = f'"{name}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(text=f"<p>page {name}</p>", content_type="text/html", headers={"ETag": etag})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/{name}", self.page)
+        return app
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(Config, "FETCH_RETRY_DELAY", 0)
+
+def serve(site, fetch):
+    """Run fetch(base_url) against the stub site on a local port."""
+    async def run():
+        async with TestServer(site.app()) as server:
+            return await fetch(str(server.make_url("")))
+
+    return asyncio.run(run())
+
+def test_fetch_many_returns_results_in_input_order():
+    site = StubSite()
+    fetcher = WebFetcher(concurrency=4, per_host_concurrency=2)
+
+    results = serve(site, lambda base: fetcher.afetch_many([f"{base}/{n}" for n in range(6)] + [f"{base}/missing"]))
+
+    assert [result.text for result in results[:6]] == [f"<p>page {n}</p>" for n in range(6)]
+    assert not results[6].ok and results[6].error == "HTTP 404"
+    assert site.hits["missing"] == 1
+    assert site.max_in_flight <= 2
+    assert fetcher.stats == {"fetched": 6, "not_modified": 0, "stale": 0, "failed": 1}
+
+def test_transient_errors_are_retried():
+    site = StubSite()
+
+    [result] = serve(site, lambda base: WebFetcher().afetch_many([f"{base}/flaky"]))
+
+    assert result.ok and result.status == 200
+    assert site.hits["flaky"] == 3
+
+def test_unchanged_pages_are_answered_from_the_cache(tmp_path):
+    site = StubSite()
+    fetcher = WebFetcher(SQLiteCache(str(tmp_path / "pages.sqlite3")))
+
+    async def fetch_twice(base):
+        first = await fetcher.afetch_many([f"{base}/a"])
+        second = await fetcher.afetch_many([f"{base}/a"])
+        site.down = True
+        third = await fetcher.afetch_many([f"{base}/a"])
+        return first + second + third
+
+    first, second, third = serve(site, fetch_twice)
+
+    assert not first.from_cache
+    assert second.from_cache and second.status == 304 and second.text == first.text
+    assert third.from_cache and third.error == "HTTP 503" and third.text == first.text
+    assert fetcher.stats == {"fetched": 1, "not_modified": 1, "stale": 1, "failed": 0}
+
+def test_iter_fetch_yields_every_url_once():
+    site = StubSite()
+    fetcher = WebFetcher(concurrency=2)
+
+    async def collect(base):
+        urls = [f"{base}/{n}" for n in range(10)]
+        fetched = [result.url async for result in fetcher.aiter_fetch(iter(urls), window=3)]
+        return urls, fetched
+
+    urls, fetched = serve(site, collect)
+
+    assert sorted(fetched) == sorted(urls)
+    assert site.max_in_flight <= 2
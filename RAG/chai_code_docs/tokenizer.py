@@ -0,0 +1,51 @@
+from functools import lru_cache
+from typing import List
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:  # a project dependency; estimate token counts if it is missing anyway
+    tiktoken = None
+
+# Rough characters-per-token ratio for English prose and code, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    """Return the tiktoken encoding, or None when tiktoken or its vocabulary file is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # The vocabulary is downloaded on first use, which fails offline
+        print(f"Could not load tokenizer {name}, estimating token counts instead: {e}")
+        return None
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in text with Config.TOKENIZER_ENCODING (or estimate them without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _encoding(Config.TOKENIZER_ENCODING)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Count the tokens of many texts at once (tiktoken encodes the batch on several threads)."""
+    encoding = _encoding(Config.TOKENIZER_ENCODING)
+    if encoding is None:
+        return [-(-len(text) // CHARS_PER_TOKEN) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Return the longest prefix of text that fits in max_tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(Config.TOKENIZER_ENCODING)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,229 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from config import Config
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" values)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Innermost open span and the labels it passes down to child spans
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed pipeline stage with labels and counters (tokens, cache hits, retries, ...)."""
+
+    def __init__(self, name: str, labels: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.labels = labels
+        self.parent = parent
+        self.counters = {}
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def add(self, counter: str, amount: float = 1):
+        """Increment a counter on this span."""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "labels": self.labels,
+            "duration": self.duration,
+            "counters": self.counters,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+class Histogram:
+    """Cumulative bucket counts plus a bounded window of recent samples for percentiles."""
+
+    def __init__(self, window: int):
+        self.bucket_counts = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(DURATION_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Tracer:
+    """
+    Collects spans around pipeline stages and aggregates them into metrics.
+
+    Spans nest through a context variable, so they follow asyncio tasks; labels of
+    an enclosing span (e.g. the retrieval method) are inherited by its children.
+    Finished spans feed one duration histogram and one set of counter totals per
+    (stage, labels) series, exported as Prometheus text or a JSON dump. The most
+    recent root spans are kept as full traces.
+    """
+
+    def __init__(self, enabled: bool = True, window: int = None, max_traces: int = None):
+        self.enabled = enabled
+        self.window = window or Config.TRACING_SAMPLE_WINDOW
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple, Histogram] = {}
+        self._counters: Dict[Tuple, dict] = {}
+        self._errors: Dict[Tuple, int] = {}
+        self._traces = deque(maxlen=max_traces or Config.TRACING_MAX_TRACES)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time the enclosed block as a span named after the pipeline stage."""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        inherited = dict(parent.labels) if parent is not None else {}
+        inherited.update({key: str(value) for key, value in labels.items()})
+        span = Span(name, inherited, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def observe(self, name: str, duration: float, counters: dict = None, **labels):
+        """
+        Record an already-timed stage as a finished span.
+
+        For stages that span generator yields (streamed answers), where a context
+        manager cannot stay open safely.
+        """
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        inherited = dict(parent.labels) if parent is not None else {}
+        inherited.update({key: str(value) for key, value in labels.items()})
+        span = Span(name, inherited, parent)
+        span.counters = dict(counters or {})
+        span.duration = duration
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        key = (span.name, tuple(sorted(span.labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.window)
+            histogram.observe(span.duration)
+
+            totals = self._counters.setdefault(key, {})
+            for counter, amount in span.counters.items():
+                totals[counter] = totals.get(counter, 0) + amount
+            if span.error is not None:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+            if span.parent is not None:
+                span.parent.children.append(span)
+            else:
+                self._traces.append(span)
+
+    def reset(self):
+        """Drop all collected metrics and traces."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._errors.clear()
+            self._traces.clear()
+
+    def metrics(self) -> dict:
+        """Return a JSON-serializable dump: per-series count, percentiles, counters and recent traces."""
+        with self._lock:
+            series = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                series.append({
+                    "stage": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "errors": self._errors.get((name, labels), 0),
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.percentile(0.50),
+                    "p95": histogram.percentile(0.95),
+                    "p99": histogram.percentile(0.99),
+                    "counters": dict(self._counters.get((name, labels), {})),
+                })
+            traces = [span.to_dict() for span in self._traces]
+        return {"stages": series, "recent_traces": traces}
+
+    def metrics_json(self) -> str:
+        return json.dumps(self.metrics(), indent=2)
+
+    @staticmethod
+    def _format_labels(labels, **extra) -> str:
+        pairs = list(labels) + list(extra.items())
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+    def prometheus_text(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP rag_stage_duration_seconds Duration of RAG pipeline stages.",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                series_labels = (("stage", name),) + labels
+                cumulative = 0
+                for bound, bucket_count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"rag_stage_duration_seconds_bucket{self._format_labels(series_labels, le=bound)} {cumulative}")
+                lines.append(f"rag_stage_duration_seconds_bucket{self._format_labels(series_labels, le='+Inf')} {histogram.count}")
+                lines.append(f"rag_stage_duration_seconds_sum{self._format_labels(series_labels)} {histogram.sum}")
+                lines.append(f"rag_stage_duration_seconds_count{self._format_labels(series_labels)} {histogram.count}")
+
+            lines.append("# HELP rag_stage_errors_total RAG pipeline stages that raised.")
+            lines.append("# TYPE rag_stage_errors_total counter")
+            for (name, labels), errors in sorted(self._errors.items()):
+                lines.append(f"rag_stage_errors_total{self._format_labels((('stage', name),) + labels)} {errors}")
+
+            counter_names = sorted({counter for totals in self._counters.values() for counter in totals})
+            for counter in counter_names:
+                lines.append(f"# TYPE rag_stage_{counter}_total counter")
+                for (name, labels), totals in sorted(self._counters.items()):
+                    if counter in totals:
+                        lines.append(
+                            f"rag_stage_{counter}_total{self._format_labels((('stage', name),) + labels)} {totals[counter]}"
+                        )
+        return "\n".join(lines) + "\n"
+
+tracer = Tracer(enabled=Config.TRACING_ENABLED)
+
+def span(name: str, **labels):
+    """Open a span on the global tracer (see Tracer.span)."""
+    return tracer.span(name, **labels)
+
+def observe(name: str, duration: float, counters: dict = None, **labels):
+    """Record an already-timed stage on the global tracer (see Tracer.observe)."""
+    tracer.observe(name, duration, counters, **labels)
+
+def record(counter: str, amount: float = 1):
+    """Add to a counter on the innermost open span; a no-op outside any span."""
+    current = _current_span.get()
+    if current is not None:
+        current.add(counter, amount)
+
+def current_context() -> contextvars.Context:
+    """Snapshot of the tracing context, for running work on another thread under the current span."""
+    return contextvars.copy_context()
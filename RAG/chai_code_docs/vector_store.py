@@ -1,23 +1,81 @@
+import asyncio
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, models
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config import Config
+from chunker import StructuralChunker
+from embedding_cache import CachedEmbeddings, aembed_queries, embed_queries
+from index_manifest import IndexManifest, chunk_id
+from local_vector_store import LocalVectorStore
+from near_duplicates import NearDuplicateFilter
+from single_flight import AsyncSingleFlight, SingleFlight
+from sqlite_cache import SQLiteCache
+from tracing import record, span
 
 class VectorStoreManager:
     """Manages vector store operations for the ChaiCode RAG system."""
     
-    def __init__(self):
-        self.embeddings = GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Config.CHUNK_SIZE, 
-            chunk_overlap=Config.CHUNK_OVERLAP
-        )
+    def __init__(self, embeddings: Embeddings = None):
+        """
+        Args:
+            embeddings (Embeddings): Embeddings model to use instead of Gemini (e.g. an
+                offline fake for benchmarks)
+        """
+        if embeddings is not None:
+            self.embeddings = embeddings
+            model_name = type(embeddings).__name__
+        else:
+            self.embeddings = GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL)
+            model_name = Config.EMBEDDING_MODEL
+        if Config.EMBEDDING_CACHE_ENABLED:
+            self.embeddings = CachedEmbeddings(
+                self.embeddings,
+                model_name=model_name,
+                cache=SQLiteCache(
+                    Config.EMBEDDING_CACHE_PATH,
+                    max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES,
+                    max_bytes=Config.EMBEDDING_CACHE_MAX_BYTES,
+                ),
+            )
+        if Config.CHUNKER == "structural":
+            self.text_splitter = StructuralChunker()
+        else:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=Config.CHUNK_SIZE, 
+                chunk_overlap=Config.CHUNK_OVERLAP,
+                add_start_index=True,
+            )
+        self.near_duplicate_filter = NearDuplicateFilter.from_config()
+        self.manifest = IndexManifest(Config.INDEX_MANIFEST_PATH)
         self.vector_store = None
+        self._async_client = None
+        self._async_client_loop = None
+        # Concurrent identical embedding/search calls share one request
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
         self._connect_to_vector_store()
     
     def _connect_to_vector_store(self):
-        """Connect to the Qdrant vector store."""
+        """Connect to the configured vector store backend."""
+        if Config.VECTOR_BACKEND == "local":
+            print(f"Opening local {Config.LOCAL_INDEX_MODE} vector index at {Config.LOCAL_INDEX_PATH}...")
+            self.vector_store = LocalVectorStore(
+                embedding=self.embeddings,
+                path=Config.LOCAL_INDEX_PATH,
+                mode=Config.LOCAL_INDEX_MODE,
+                m=Config.HNSW_M,
+                ef_construction=Config.HNSW_EF_CONSTRUCTION,
+                ef_search=Config.HNSW_EF_SEARCH,
+            )
+            print(f"Loaded local vector index with {len(self.vector_store)} vectors")
+            return
+        
         print("Connecting to Qdrant vector store...")
         try:
             self.vector_store = QdrantVectorStore.from_existing_collection(
@@ -33,6 +91,12 @@ class VectorStoreManager:
             print("Also ensure your internet connection is stable and the Qdrant service is accessible")
             raise
     
+    def embedding_cache_stats(self) -> dict:
+        """Return embedding cache hit/miss counters and size (empty if the cache is disabled)."""
+        if isinstance(self.embeddings, CachedEmbeddings):
+            return self.embeddings.stats()
+        return {}
+    
     def search_with_retry(self, query, max_retries=None, delay=None):
         """Search with retry logic for connection issues."""
         if max_retries is None:
@@ -53,7 +117,172 @@ class VectorStoreManager:
                     print(f"Failed to search for query '{query}' after {max_retries} attempts")
                     return []  # Return empty list if all attempts fail
     
-    def upload_batch_with_retry(self, batch, max_retries=None, delay=None):
+    def search_many_with_score(self, queries, k=None, max_retries=None, delay=None, raise_on_failure=False):
+        """
+        Search for several queries with two round-trips in total.
+        
+        All queries are embedded in one batched embedding call and looked up with one
+        batched search request to the backend.
+        
+        Returns:
+            list: One list of (Document, score) pairs per query, in query order. If every
+                attempt fails, empty lists are returned unless raise_on_failure is set.
+        """
+        if k is None:
+            k = Config.SEARCH_K
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        if delay is None:
+            delay = Config.RETRY_DELAY
+        if not queries:
+            return []
+        
+        with span("vector_search", backend=Config.VECTOR_BACKEND):
+            record("queries", len(queries))
+            for attempt in range(max_retries):
+                try:
+                    return self._inflight.do(
+                        ("search", tuple(queries), k),
+                        lambda: self._search_by_vectors(self._embed_queries(queries), k),
+                    )
+                except Exception as e:
+                    print(f"Attempt {attempt + 1} failed for batched search of {len(queries)} queries: {e}")
+                    if attempt < max_retries - 1:
+                        record("retries")
+                        print(f"Retrying in {delay} seconds...")
+                        time.sleep(delay)
+                        delay *= 2  # Exponential backoff
+                    else:
+                        print(f"Failed to search for {len(queries)} queries after {max_retries} attempts")
+                        if raise_on_failure:
+                            raise
+                        return [[] for _ in queries]  # Empty results if all attempts fail
+    
+    def search_many(self, queries, k=None, max_retries=None, raise_on_failure=False):
+        """Search for several queries at once, returning one document list per query."""
+        return [
+            [doc for doc, _ in results]
+            for results in self.search_many_with_score(
+                queries, k, max_retries=max_retries, raise_on_failure=raise_on_failure
+            )
+        ]
+    
+    def _embed_queries(self, queries):
+        """Embed queries in one batched call, shared with identical concurrent calls."""
+        return self._inflight.do(("embed", tuple(queries)), lambda: embed_queries(self.embeddings, list(queries)))
+    
+    async def _aembed_queries(self, queries):
+        """Async version of _embed_queries."""
+        return await self._ainflight.do(("embed", tuple(queries)), lambda: aembed_queries(self.embeddings, list(queries)))
+    
+    async def _asearch_queries(self, queries, k):
+        return await self._asearch_by_vectors(await self._aembed_queries(queries), k)
+    
+    def _search_by_vectors(self, vectors, k):
+        """Run one batched nearest-neighbour request for precomputed query vectors."""
+        if isinstance(self.vector_store, LocalVectorStore):
+            return self.vector_store.similarity_search_with_score_by_vectors(vectors, k)
+        
+        responses = self.vector_store.client.query_batch_points(
+            collection_name=self.vector_store.collection_name,
+            requests=self._query_requests(vectors, k),
+        )
+        return self._scored_documents(responses)
+    
+    def _query_requests(self, vectors, k):
+        return [
+            models.QueryRequest(
+                query=vector,
+                using=self.vector_store.vector_name,
+                limit=k,
+                with_payload=True,
+            )
+            for vector in vectors
+        ]
+    
+    def _scored_documents(self, responses):
+        """Convert Qdrant batch responses into lists of (Document, score) pairs."""
+        return [
+            [
+                (
+                    QdrantVectorStore._document_from_point(
+                        point,
+                        self.vector_store.collection_name,
+                        self.vector_store.content_payload_key,
+                        self.vector_store.metadata_payload_key,
+                    ),
+                    point.score,
+                )
+                for point in response.points
+            ]
+            for response in responses
+        ]
+    
+    def _get_async_client(self) -> AsyncQdrantClient:
+        """Return an async Qdrant client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncQdrantClient(url=Config.QDRANT_API_URL, api_key=Config.QDRANT_API_KEY)
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def _asearch_by_vectors(self, vectors, k):
+        if isinstance(self.vector_store, LocalVectorStore):
+            # In-process search is CPU-bound and sub-millisecond; no need to offload it
+            return self.vector_store.similarity_search_with_score_by_vectors(vectors, k)
+        
+        responses = await self._get_async_client().query_batch_points(
+            collection_name=self.vector_store.collection_name,
+            requests=self._query_requests(vectors, k),
+        )
+        return self._scored_documents(responses)
+    
+    async def asearch_many_with_score(self, queries, k=None, max_retries=None, delay=None, raise_on_failure=False):
+        """Async version of search_many_with_score."""
+        if k is None:
+            k = Config.SEARCH_K
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        if delay is None:
+            delay = Config.RETRY_DELAY
+        if not queries:
+            return []
+        
+        with span("vector_search", backend=Config.VECTOR_BACKEND):
+            record("queries", len(queries))
+            for attempt in range(max_retries):
+                try:
+                    return await self._ainflight.do(
+                        ("search", tuple(queries), k),
+                        lambda: self._asearch_queries(queries, k),
+                    )
+                except Exception as e:
+                    print(f"Attempt {attempt + 1} failed for batched search of {len(queries)} queries: {e}")
+                    if attempt < max_retries - 1:
+                        record("retries")
+                        print(f"Retrying in {delay} seconds...")
+                        await asyncio.sleep(delay)
+                        delay *= 2  # Exponential backoff
+                    else:
+                        print(f"Failed to search for {len(queries)} queries after {max_retries} attempts")
+                        if raise_on_failure:
+                            raise
+                        return [[] for _ in queries]
+    
+    async def asearch_many(self, queries, k=None, max_retries=None, raise_on_failure=False):
+        """Async version of search_many."""
+        return [
+            [doc for doc, _ in results]
+            for results in await self.asearch_many_with_score(
+                queries, k, max_retries=max_retries, raise_on_failure=raise_on_failure
+            )
+        ]
+    
+    async def asearch_with_retry(self, query, k=None):
+        """Async single-query search with retry logic."""
+        return (await self.asearch_many([query], k))[0]
+    
+    def upload_batch_with_retry(self, batch, ids=None, max_retries=None, delay=None):
         """Upload a batch of documents with retry logic."""
         if max_retries is None:
             max_retries = Config.MAX_RETRIES
@@ -62,7 +291,7 @@ class VectorStoreManager:
             
         for attempt in range(max_retries):
             try:
-                self.vector_store.add_documents(documents=batch)
+                self.vector_store.add_documents(documents=batch, ids=ids)
                 return True
             except Exception as e:
                 print(f"Attempt {attempt + 1} failed: {e}")
@@ -75,29 +304,326 @@ class VectorStoreManager:
                     return False
     
     def split_documents(self, documents):
-        """Split documents into chunks."""
-        return self.text_splitter.split_documents(documents=documents)
+        """Split documents into chunks, keeping one chunk per group of near-duplicates."""
+        chunks = self.text_splitter.split_documents(documents=documents)
+        if self.near_duplicate_filter is not None:
+            chunks = self.near_duplicate_filter.filter(chunks)
+        return chunks
+    
+    @staticmethod
+    def get_chunk_id(chunk) -> str:
+        """Return the deterministic point ID for a split chunk."""
+        return chunk_id(
+            chunk.metadata.get("source", ""),
+            chunk.metadata.get("start_index", 0),
+            chunk.page_content,
+        )
     
     def upload_documents_batch(self, documents):
         """Upload documents in batches to avoid timeout."""
         split_docs = self.split_documents(documents)
         print(f"Split documents into {len(split_docs)} chunks")
         
-        total_chunks = len(split_docs)
-        successful_uploads = 0
+        ids = [self.get_chunk_id(chunk) for chunk in split_docs]
+        uploaded_ids = self.upload_chunks(split_docs, ids)
+        self.persist()
+        return len(uploaded_ids)
+    
+    def persist(self):
+        """Flush the local index to disk (Qdrant persists server-side)."""
+        if isinstance(self.vector_store, LocalVectorStore):
+            self.vector_store.save()
+    
+    def upload_chunks(self, chunks, ids):
+        """
+        Upload already-split chunks under the given point IDs.
+        
+        Returns:
+            list: IDs of the chunks that were uploaded successfully
+        """
+        if Config.PIPELINED_INGEST:
+            return self.upload_chunks_pipelined(chunks, ids)
+        
+        total_chunks = len(chunks)
+        uploaded_ids = []
         
         for i in range(0, total_chunks, Config.BATCH_SIZE):
-            batch = split_docs[i:i + Config.BATCH_SIZE]
+            batch = chunks[i:i + Config.BATCH_SIZE]
+            batch_ids = ids[i:i + Config.BATCH_SIZE]
             batch_num = i//Config.BATCH_SIZE + 1
             total_batches = (total_chunks + Config.BATCH_SIZE - 1)//Config.BATCH_SIZE
             
             print(f"Uploading batch {batch_num}/{total_batches} ({len(batch)} chunks)")
             
-            if self.upload_batch_with_retry(batch):
-                successful_uploads += len(batch)
+            if self.upload_batch_with_retry(batch, batch_ids):
+                uploaded_ids.extend(batch_ids)
                 print(f"Successfully uploaded batch {batch_num}")
             else:
                 print(f"Failed to upload batch {batch_num}")
         
-        print(f"Upload complete: {successful_uploads}/{total_chunks} chunks uploaded successfully")
-        return successful_uploads 
\ No newline at end of file
+        print(f"Upload complete: {len(uploaded_ids)}/{total_chunks} chunks uploaded successfully")
+        return uploaded_ids
+    
+    def delete_with_retry(self, ids, max_retries=None, delay=None):
+        """Delete points by ID with retry logic."""
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        if delay is None:
+            delay = Config.RETRY_DELAY
+        
+        for attempt in range(max_retries):
+            try:
+                self.vector_store.delete(ids=list(ids))
+                return True
+            except Exception as e:
+                print(f"Delete attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    print(f"Retrying in {delay} seconds...")
+                    time.sleep(delay)
+                    delay *= 2  # Exponential backoff
+                else:
+                    print(f"Failed to delete {len(ids)} points after {max_retries} attempts")
+                    return False
+    
+    def index_documents(self, documents, remove_missing_sources: bool = False):
+        """
+        Incrementally index documents against the local manifest.
+        
+        Only chunks whose deterministic ID is not yet indexed are embedded and
+        upserted, and chunks that disappeared from a re-loaded source are deleted.
+        
+        Args:
+            documents (list): Loaded documents (one or more per source URL)
+            remove_missing_sources (bool): Also delete every indexed source that is
+                not part of this load, for full refreshes
+        
+        Returns:
+            dict: Counts of uploaded, unchanged and deleted chunks
+        """
+        split_docs = self.split_documents(documents)
+        print(f"Split documents into {len(split_docs)} chunks")
+        
+        chunks_by_source = {}
+        for chunk in split_docs:
+            source_chunks = chunks_by_source.setdefault(chunk.metadata.get("source", ""), {})
+            source_chunks[self.get_chunk_id(chunk)] = chunk
+        
+        new_chunks = []
+        new_ids = []
+        new_ids_by_source = {}
+        stale_ids = {}
+        unchanged = 0
+        for source, chunks in chunks_by_source.items():
+            indexed_ids = self.manifest.chunk_ids(source)
+            for point_id, chunk in chunks.items():
+                if point_id in indexed_ids:
+                    unchanged += 1
+                else:
+                    new_chunks.append(chunk)
+                    new_ids.append(point_id)
+                    new_ids_by_source.setdefault(source, set()).add(point_id)
+            stale = indexed_ids - chunks.keys()
+            if stale:
+                stale_ids[source] = stale
+        
+        if remove_missing_sources:
+            for source in list(self.manifest.sources):
+                if source not in chunks_by_source:
+                    stale_ids[source] = self.manifest.chunk_ids(source)
+        
+        print(f"{len(new_chunks)} new or changed chunks, {unchanged} unchanged, "
+              f"{sum(len(ids) for ids in stale_ids.values())} stale")
+        
+        uploaded_ids = set(self.upload_chunks(new_chunks, new_ids)) if new_chunks else set()
+        
+        deleted = 0
+        for source, ids in stale_ids.items():
+            if not new_ids_by_source.get(source, set()) <= uploaded_ids:
+                # The replacement chunks did not all make it; keep the old ones searchable
+                print(f"Keeping {len(ids)} stale chunks of {source} until its new chunks are uploaded")
+                continue
+            if not self.delete_with_retry(ids):
+                # Keep them in the manifest so the next run retries the delete
+                continue
+            deleted += len(ids)
+            if source in chunks_by_source:
+                self.manifest.set_chunk_ids(source, self.manifest.chunk_ids(source) - ids)
+            else:
+                self.manifest.remove_source(source)
+        
+        for source, chunks in chunks_by_source.items():
+            indexed_ids = self.manifest.chunk_ids(source)
+            indexed_ids.update(point_id for point_id in chunks if point_id in uploaded_ids)
+            self.manifest.set_chunk_ids(source, indexed_ids)
+        
+        if uploaded_ids or deleted:
+            self.manifest.bump_version()
+        self.persist()
+        self.manifest.save()
+        
+        print(f"Index update complete: {len(uploaded_ids)} uploaded, {deleted} deleted")
+        return {"uploaded": len(uploaded_ids), "unchanged": unchanged, "deleted": deleted}
+    
+    @staticmethod
+    def _is_rate_limit_error(error: Exception) -> bool:
+        """Check whether an error is the upstream API pushing back (HTTP 429 / quota)."""
+        message = str(error).lower()
+        return "429" in message or "resource exhausted" in message or "quota" in message
+    
+    def embed_batch_with_retry(self, batch, max_retries=None, delay=None):
+        """
+        Embed a batch of chunks with retry logic.
+        
+        Returns:
+            tuple: (vectors or None on failure, seconds spent, whether a rate limit was hit)
+        """
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        if delay is None:
+            delay = Config.RETRY_DELAY
+        
+        start = time.perf_counter()
+        rate_limited = False
+        texts = [doc.page_content for doc in batch]
+        
+        for attempt in range(max_retries):
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                return vectors, time.perf_counter() - start, rate_limited
+            except Exception as e:
+                rate_limited = rate_limited or self._is_rate_limit_error(e)
+                print(f"Embedding attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    print(f"Retrying in {delay} seconds...")
+                    time.sleep(delay)
+                    delay *= 2  # Exponential backoff
+                else:
+                    print(f"Failed to embed batch after {max_retries} attempts")
+        
+        return None, time.perf_counter() - start, rate_limited
+    
+    def _upsert_embeddings(self, batch, vectors, ids):
+        """Write already-embedded chunks to the vector store."""
+        if isinstance(self.vector_store, LocalVectorStore):
+            self.vector_store.add_embeddings(ids, vectors, batch)
+            return
+        
+        payloads = QdrantVectorStore._build_payloads(
+            [doc.page_content for doc in batch],
+            [doc.metadata for doc in batch],
+            self.vector_store.content_payload_key,
+            self.vector_store.metadata_payload_key,
+        )
+        points = [
+            models.PointStruct(id=point_id, vector={self.vector_store.vector_name: vector}, payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        self.vector_store.client.upsert(
+            collection_name=self.vector_store.collection_name,
+            points=points,
+        )
+    
+    def upsert_embeddings_with_retry(self, batch, vectors, ids, max_retries=None, delay=None):
+        """Upsert already-embedded chunks with retry logic."""
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        if delay is None:
+            delay = Config.RETRY_DELAY
+        
+        for attempt in range(max_retries):
+            try:
+                self._upsert_embeddings(batch, vectors, ids)
+                return True
+            except Exception as e:
+                print(f"Upsert attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    print(f"Retrying in {delay} seconds...")
+                    time.sleep(delay)
+                    delay *= 2  # Exponential backoff
+                else:
+                    print(f"Failed to upsert batch after {max_retries} attempts")
+                    return False
+    
+    @staticmethod
+    def _next_batch_size(batch_size: int, elapsed: float, rate_limited: bool) -> int:
+        """Grow the batch size while batches are fast, back off on latency or 429s."""
+        if rate_limited:
+            return max(Config.MIN_BATCH_SIZE, batch_size // 2)
+        if elapsed > Config.TARGET_BATCH_LATENCY:
+            return max(Config.MIN_BATCH_SIZE, int(batch_size * 0.75))
+        return min(Config.MAX_BATCH_SIZE, int(batch_size * 1.5) + 1)
+    
+    def upload_chunks_pipelined(self, chunks, ids):
+        """
+        Upload already-split chunks through a two-stage pipeline.
+        
+        Up to Config.EMBED_CONCURRENCY batches are embedded at once while a separate
+        thread upserts finished batches, so embedding and upserting overlap instead
+        of alternating. The batch size adapts to observed latency and rate limits.
+        
+        Args:
+            chunks (list): Documents to upload
+            ids (list): Point IDs, one per chunk
+        
+        Returns:
+            list: IDs of the chunks that were uploaded successfully
+        """
+        total_chunks = len(chunks)
+        uploaded_ids = []
+        upsert_queue = queue.Queue(maxsize=Config.MAX_PENDING_UPSERTS)
+        
+        def upsert_worker():
+            while True:
+                item = upsert_queue.get()
+                if item is None:
+                    break
+                batch_num, batch, batch_ids, vectors = item
+                try:
+                    uploaded = self.upsert_embeddings_with_retry(batch, vectors, batch_ids)
+                except Exception as e:
+                    # Keep draining the queue, otherwise the embedding stage blocks on put()
+                    print(f"Error uploading batch {batch_num}: {e}")
+                    uploaded = False
+                if uploaded:
+                    uploaded_ids.extend(batch_ids)
+                    print(f"Successfully uploaded batch {batch_num} ({len(batch)} chunks)")
+                else:
+                    print(f"Failed to upload batch {batch_num}")
+        
+        upsert_thread = threading.Thread(target=upsert_worker, daemon=True)
+        upsert_thread.start()
+        
+        batch_size = Config.BATCH_SIZE
+        position = 0
+        batch_num = 0
+        in_flight = {}
+        
+        try:
+            with ThreadPoolExecutor(max_workers=Config.EMBED_CONCURRENCY) as executor:
+                while position < total_chunks or in_flight:
+                    while position < total_chunks and len(in_flight) < Config.EMBED_CONCURRENCY:
+                        batch = chunks[position:position + batch_size]
+                        batch_ids = ids[position:position + batch_size]
+                        position += len(batch)
+                        batch_num += 1
+                        print(f"Embedding batch {batch_num} ({len(batch)} chunks, {position}/{total_chunks})")
+                        future = executor.submit(self.embed_batch_with_retry, batch)
+                        in_flight[future] = (batch_num, batch, batch_ids)
+                    
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        done_num, batch, batch_ids = in_flight.pop(future)
+                        vectors, elapsed, rate_limited = future.result()
+                        batch_size = self._next_batch_size(batch_size, elapsed, rate_limited)
+                        
+                        if vectors is None:
+                            print(f"Failed to upload batch {done_num}")
+                            continue
+                        # Blocks when the upsert stage falls behind, bounding memory
+                        upsert_queue.put((done_num, batch, batch_ids, vectors))
+        finally:
+            upsert_queue.put(None)
+            upsert_thread.join()
+        
+        print(f"Upload complete: {len(uploaded_ids)}/{total_chunks} chunks uploaded successfully")
+        return uploaded_ids
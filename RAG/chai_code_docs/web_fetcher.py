@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, List, Optional
+import aiohttp
+from config import Config
+from sqlite_cache import SQLiteCache
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class FetchResult:
+    """Outcome of fetching one URL."""
+
+    def __init__(self, url: str, status: int = None, body: bytes = None, encoding: str = None,
+                 from_cache: bool = False, error: str = None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.encoding = encoding or "utf-8"
+        self.from_cache = from_cache
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.body is not None
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+class WebFetcher:
+    """
+    Async page fetcher with bounded concurrency and an HTTP conditional-request cache.
+
+    One aiohttp session (and connection pool) is shared by all requests, with at
+    most `per_host_concurrency` connections to any host. Bodies are stored on disk
+    together with their ETag and Last-Modified values; later fetches send
+    If-None-Match / If-Modified-Since, and a 304 is answered from the cache. If a
+    page cannot be fetched but a cached copy exists, the cached copy is returned.
+    """
+
+    def __init__(self, cache: SQLiteCache = None, concurrency: int = None, per_host_concurrency: int = None,
+                 timeout: float = None, verify_ssl: bool = None):
+        self.cache = cache
+        self.concurrency = concurrency or Config.FETCH_CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or Config.FETCH_PER_HOST_CONCURRENCY
+        self.timeout = timeout or Config.FETCH_TIMEOUT
+        self.verify_ssl = verify_ssl if verify_ssl is not None else Config.FETCH_VERIFY_SSL
+        self.stats = {"fetched": 0, "not_modified": 0, "stale": 0, "failed": 0}
+
+    @classmethod
+    def from_config(cls) -> "WebFetcher":
+        """Build a fetcher with the cache described by Config."""
+        cache = None
+        if Config.FETCH_CACHE_ENABLED:
+            cache = SQLiteCache(Config.FETCH_CACHE_PATH, max_entries=Config.FETCH_CACHE_MAX_ENTRIES)
+        return cls(cache)
+
+    def _cached(self, url: str) -> Optional[dict]:
+        """Return the cached validators and body for url, or None."""
+        if self.cache is None:
+            return None
+        found = self.cache.get_many(["meta:" + url, "body:" + url])
+        if len(found) < 2:
+            # Never cached, or one half was evicted
+            return None
+        entry = json.loads(found["meta:" + url])
+        entry["body"] = found["body:" + url]
+        return entry
+
+    def _store(self, url: str, body: bytes, encoding: str, headers):
+        if self.cache is None:
+            return
+        meta = {
+            "encoding": encoding,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        self.cache.set_many({"meta:" + url: json.dumps(meta).encode("utf-8"), "body:" + url: body})
+
+    @staticmethod
+    def _from_entry(url: str, entry: dict, status: int = None, error: str = None) -> FetchResult:
+        return FetchResult(url, status, entry["body"], entry["encoding"], from_cache=True, error=error)
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> FetchResult:
+        entry = self._cached(url)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        delay = Config.FETCH_RETRY_DELAY
+        error = None
+        for attempt in range(Config.MAX_RETRIES):
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and entry is not None:
+                        self.stats["not_modified"] += 1
+                        return self._from_entry(url, entry, status=304)
+
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        body = await response.read()
+                        encoding = response.get_encoding()
+                        self._store(url, body, encoding, response.headers)
+                        self.stats["fetched"] += 1
+                        return FetchResult(url, response.status, body, encoding)
+
+                    error = f"HTTP {response.status}"
+            except aiohttp.ClientResponseError as e:
+                # 4xx other than 429: retrying will not help
+                error = f"HTTP {e.status}"
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < Config.MAX_RETRIES - 1:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        if entry is not None:
+            print(f"Fetching {url} failed ({error}), using the cached copy")
+            self.stats["stale"] += 1
+            return self._from_entry(url, entry, error=error)
+
+        self.stats["failed"] += 1
+        return FetchResult(url, error=error)
+
+    @asynccontextmanager
+    async def _session(self):
+        """One pooled session for a fetch run, capped in total and per host."""
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host_concurrency,
+            ssl=self.verify_ssl,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {"User-Agent": Config.FETCH_USER_AGENT}
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            yield session
+
+    async def afetch_many(self, urls: List[str]) -> List[FetchResult]:
+        """
+        Fetch all URLs concurrently.
+
+        Args:
+            urls (list): Page URLs
+
+        Returns:
+            list: One FetchResult per URL, in input order; failed fetches have ok == False
+        """
+        async with self._session() as session:
+            return await asyncio.gather(*(self._fetch(session, url) for url in urls))
+
+    async def aiter_fetch(self, urls: Iterable[str], window: int = None) -> AsyncIterator[FetchResult]:
+        """
+        Fetch URLs concurrently and yield each result as soon as it completes.
+
+        At most `window` fetches (default twice the connection limit) are pending at
+        once, so a long URL stream is never held in memory.
+        """
+        window = window or self.concurrency * 2
+        urls = iter(urls)
+        async with self._session() as session:
+            pending = set()
+            while True:
+                for url in urls:
+                    pending.add(asyncio.ensure_future(self._fetch(session, url)))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+
+    def fetch_many(self, urls: List[str]) -> List[FetchResult]:
+        """Synchronous wrapper around afetch_many."""
+        return asyncio.run(self.afetch_many(urls))
+
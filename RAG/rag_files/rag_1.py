@@ -7,6 +7,7 @@ from langchain_qdrant import QdrantVectorStore
 
 from qdrant_client import QdrantClient
 import os
+import tiktoken
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -59,10 +60,36 @@ vector_store = QdrantVectorStore.from_existing_collection(
 
 user_query = input("Enter yur query in here: ")
 
-relevant_chunks = vector_store.similarity_search(
+relevant_chunks = vector_store.similarity_search_with_score(
     query=user_query
 )
 
+# Whole chunks, best match first, until CONTEXT_MAX_TOKENS is spent. With the default
+# 4 chunks of 1000 characters this keeps the full context; it only caps unusually long ones.
+CONTEXT_MAX_TOKENS = 6000
+encoder = tiktoken.get_encoding("o200k_base")
+
+blocks = []
+seen_texts = set()
+remaining_tokens = CONTEXT_MAX_TOKENS
+for doc, _ in sorted(relevant_chunks, key=lambda pair: pair[1], reverse=True):
+    text = doc.page_content.strip()
+    if not text or text in seen_texts:
+        continue
+    seen_texts.add(text)
+    block = f"[{len(blocks) + 1}] page {doc.metadata.get('page', 0) + 1}\n{text}"
+    tokens = encoder.encode(block)
+    if len(tokens) > remaining_tokens:
+        if not blocks:
+            # Never send an empty context: keep as much of the best chunk as fits
+            blocks.append(encoder.decode(tokens[:remaining_tokens]))
+        break
+    blocks.append(block)
+    remaining_tokens -= len(tokens)
+
+# Compact context instead of the list's repr
+context = "\n\n".join(blocks)
+
 SYSTEM_PROMPT = '''
 You are a helpful assistant who responds based on the available context.
 Give your response in the same language as the question. Do not answer the user if the question is not related to the context. If the question is not related to the context, say "I don't know" or "I don't have information about that".
@@ -79,7 +106,7 @@ llm = ChatGoogleGenerativeAI(
 messages = [
     (
         "system",
-        SYSTEM_PROMPT.format(relevant_chunks=relevant_chunks)
+        SYSTEM_PROMPT.format(relevant_chunks=context)
     ),
     ("user", user_query)
 ]
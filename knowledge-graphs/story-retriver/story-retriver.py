@@ -176,10 +176,11 @@ def enhanced_retrieval_with_structure(user_query: str, vector_top_k: int = 5):
     Enhanced retrieval using both vector similarity and graph traversal with structured output
     """
     # Vector-based retrieval
-    relevant_chunks = vector_store.similarity_search(
+    scored_chunks = vector_store.similarity_search_with_score(
         query=user_query,
         k=vector_top_k
     )
+    relevant_chunks = [doc for doc, _ in scored_chunks]
     
     # Graph-based retrieval using GraphCypherQAChain
     try:
@@ -189,9 +190,11 @@ def enhanced_retrieval_with_structure(user_query: str, vector_top_k: int = 5):
         print(f"Graph query error: {e}")
         graph_answer = "Graph information unavailable."
     
-    # Prepare vector context summary
-    vector_context = "\n".join([f"Chunk {i+1}: {doc.page_content[:200]}..." 
-                               for i, doc in enumerate(relevant_chunks)])
+    # Prepare vector context summary (deduplicated, best match first, tagged with the source page)
+    ranked_chunks = [doc for doc, _ in sorted(scored_chunks, key=lambda pair: pair[1], reverse=True)]
+    unique_chunks = list({doc.page_content: doc for doc in ranked_chunks}.values())
+    vector_context = "\n".join([f"[{i+1}] page {doc.metadata.get('page', 0) + 1}: {doc.page_content[:200]}..." 
+                               for i, doc in enumerate(unique_chunks)])
     
     return {
         "vector_chunks": relevant_chunks,